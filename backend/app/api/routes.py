@@ -1,18 +1,28 @@
+import asyncio
+import json
 import logging
 import os
 
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Query, Header, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import selectinload
 from hashids import Hashids
 from pydantic import BaseModel, EmailStr, field_validator
-from typing import List
+from typing import List, Optional
+from datetime import date
 import httpx
 from dotenv import load_dotenv
 
-from app.database import get_session
-from app.models import SessionModel, EventModel, ContactSubmission
-from app.utils import parse_ics
+from app import instrumentation, jobs, response_cache
+from app.database import get_async_session, insert_pending_session, set_session_status
+from app.models import SessionModel, EventSeriesModel, ContactSubmission
+from app.ics_stream import NoEvents, UploadTooLarge, read_chunks, read_ics_stream, store_upload
+from app.distance_matrix import DISTANCE_MATRIX_MAX_LOCATIONS, MapsAPIError, get_matrix
+from app.responses import DistanceMatrix, Event, MsgspecResponse, SessionEvents, encoder, hhmm
+from app.travel_estimate import TRAVEL_MODELS, estimate_matrix
+from app.utils import expand_series
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -67,82 +77,223 @@ class DistanceMatrixRequest(BaseModel):
     origins: List[LatLng]
     destinations: List[LatLng]
     mode: str = "walking"
+    # "google", "local" (offline estimate) or "auto" (google, falling back to local)
+    engine: str = "auto"
 
 
 @router.post("/sessions")
-async def create_session(file: UploadFile = File(...), school_location: str = Form(None)):
+async def create_session(
+    file: UploadFile = File(...),
+    school_location: str = Form(None),
+    prefer: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_session),
+):
     # Validate content type
     if file.content_type and file.content_type not in ["text/calendar", "application/octet-stream"]:
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload an ICS file.")
 
-    # Read with size limit
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="File too large. Maximum size is 5MB.")
+    # Clients that can poll ask for background processing (RFC 7240)
+    queue = jobs.get_queue()
+    if queue and prefer and "respond-async" in prefer.lower():
+        return await _queue_upload(file, queue, db)
 
+    # Stream the upload, rejecting it as soon as it passes the size limit
     try:
-        events_data = parse_ics(content.decode("utf-8"), school_location)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid calendar format")
+        upload = await read_ics_stream(read_chunks(file, MAX_FILE_SIZE))
+    except UploadTooLarge:
+        raise HTTPException(status_code=400, detail="File too large. Maximum size is 5MB.")
     except UnicodeDecodeError:
         raise HTTPException(status_code=400, detail="File encoding not supported")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid calendar format")
     except Exception as e:
         logger.exception("Failed to parse ICS file")
         raise HTTPException(status_code=400, detail="Failed to parse calendar file")
 
-    if not events_data:
-        raise HTTPException(status_code=400, detail="No events found in file")
+    try:
+        stored = await store_upload(db, upload)
+    except NoEvents as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    short_id = hashids.encode(stored.session_id)
+
+    # Shared links are read far more than written, so serialize the default view now
+    if stored.shared_from_id:
+        cached = response_cache.cache.get(hashids.encode(stored.shared_from_id))
+        if cached:
+            body = cached[0]
+        else:
+            body = await asyncio.to_thread(_expanded_body, [], await _load_series(db, stored.shared_from_id))
+    else:
+        with instrumentation.stage("expand"):
+            body, occurrences = await asyncio.to_thread(_series_body, stored.series)
+        instrumentation.record_counts(occurrences=occurrences)
+    response_cache.cache.put(short_id, body)
+
+    return {"session_id": stored.session_uuid, "short_id": short_id}
+
+
+async def _queue_upload(file: UploadFile, queue: jobs.JobQueue, db: AsyncSession) -> JSONResponse:
+    """Read the upload and hand it to the background workers, returning a pending session."""
+    busy = HTTPException(
+        status_code=503,
+        detail="Too many uploads in progress. Please try again shortly.",
+        headers={"Retry-After": str(jobs.JOB_RETRY_AFTER)},
+    )
+    if queue.full():
+        raise busy
+
+    try:
+        data = b"".join([chunk async for chunk in read_chunks(file, MAX_FILE_SIZE)])
+    except UploadTooLarge:
+        raise HTTPException(status_code=400, detail="File too large. Maximum size is 5MB.")
+
+    session_id, session_uuid = await insert_pending_session(db)
+    try:
+        queue.submit(jobs.Job(session_id, data))
+    except asyncio.QueueFull:
+        # Filled up while the file was being read
+        await set_session_status(db, [session_id], "failed")
+        raise busy
+
+    content = {"session_id": session_uuid, "short_id": hashids.encode(session_id), "status": "pending"}
+    return JSONResponse(status_code=202, content=content)
+
+
+@router.get("/sessions/{short_id}/status")
+async def get_session_status(short_id: str, db: AsyncSession = Depends(get_async_session)):
+    """Progress of a session's background job, or just its status once the job is gone."""
+    session_id = _decode_short_id(short_id)
+    queue = jobs.get_queue()
+    state = queue and queue.status(session_id)
+    return state or await _stored_status(db, session_id)
 
-    session = SessionModel()
-    with get_session() as db:
-        db.add(session)
-        db.commit()
-        db.refresh(session)
 
-        for e in events_data:
-            event = EventModel(session_id=session.id, **e)
-            db.add(event)
-        db.commit()
+@router.get("/sessions/{short_id}/status/stream")
+async def stream_session_status(short_id: str, db: AsyncSession = Depends(get_async_session)):
+    """Server-sent events with a session's progress, ending when it is ready or failed."""
+    session_id = _decode_short_id(short_id)
+    queue = jobs.get_queue()
+    if queue and queue.status(session_id):
+        states = queue.watch(session_id)
+    else:
+        states = _single(await _stored_status(db, session_id))
 
-        short_id = hashids.encode(session.id)
+    async def events():
+        async for state in states:
+            yield f"data: {json.dumps(state)}\n\n"
 
-    return {"session_id": session.uuid, "short_id": short_id}
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+async def _stored_status(db: AsyncSession, session_id: int) -> dict:
+    status = (await db.exec(select(SessionModel.status).where(SessionModel.id == session_id))).first()
+    if status is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"status": status}
+
+
+async def _single(state: dict):
+    yield state
+
+
+def _decode_short_id(short_id: str) -> int:
+    try:
+        return hashids.decode(short_id)[0]
+    except IndexError:
+        raise HTTPException(status_code=400, detail="Invalid session link")
 
 
 @router.get("/sessions/{short_id}")
-def get_session_events(short_id: str):
-    with get_session() as db:
-        try:
-            real_id = hashids.decode(short_id)[0]
-        except IndexError:
-            raise HTTPException(status_code=400, detail="Invalid session link")
-
-        # Eager load events to avoid N+1 queries
-        stmt = select(SessionModel).where(SessionModel.id == real_id).options(selectinload(SessionModel.events))
-        session = db.exec(stmt).first()
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-
-        return {
-            "events": [
-                {
-                    "title": e.title,
-                    "location": e.location,
-                    "start": e.start_time.strftime("%H:%M") if e.start_time else None,
-                    "end": e.end_time.strftime("%H:%M") if e.end_time else None,
-                    "start_date": e.start_date.isoformat() if e.start_date else None,
-                    "end_date": e.end_date.isoformat() if e.end_date else None,
-                    "dayOfWeek": e.day_of_week,
-                    "latitude": e.latitude,
-                    "longitude": e.longitude,
-                }
-                for e in session.events
-            ]
-        }
+async def get_session_events(
+    short_id: str,
+    window_start: Optional[date] = Query(None, alias="from"),
+    window_end: Optional[date] = Query(None, alias="to"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """Return a session's events, optionally limited to days in [from, to)."""
+    if window_start and window_end and window_start >= window_end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+
+    # Sessions are immutable, so a cached body never needs the database. Only the
+    # default view is cached; windows are client-chosen and would crowd it out.
+    windowed = window_start or window_end
+    cached = None if windowed else response_cache.cache.get(short_id)
+    if cached:
+        body, etag = cached
+        return _cached_response(body, etag, if_none_match)
+
+    real_id = _decode_short_id(short_id)
+
+    # Eager load events to avoid N+1 queries (lazy loads cannot run on an AsyncSession)
+    stmt = select(SessionModel).where(SessionModel.id == real_id).options(selectinload(SessionModel.events))
+    session = (await db.exec(stmt)).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if session.status != "ready":
+        raise HTTPException(status_code=409, detail=f"Session is {session.status}")
+
+    # Deduplicated uploads read the series of the session they were shared from
+    series = await _load_series(db, session.shared_from_id or session.id)
+
+    # Expanding and serializing is CPU work, so keep it off the event loop
+    body = await asyncio.to_thread(_expanded_body, session.events, series, window_start, window_end)
+    etag = response_cache.make_etag(body) if windowed else response_cache.cache.put(short_id, body)
+    return _cached_response(body, etag, if_none_match)
+
+
+async def _load_series(db: AsyncSession, session_id: int) -> list:
+    return (await db.exec(select(EventSeriesModel).where(EventSeriesModel.session_id == session_id))).all()
+
+
+def _expanded_body(rows: list, series: list, window_start: date = None, window_end: date = None) -> bytes:
+    # Sessions created before recurrence storage have one row per occurrence
+    events = [
+        e.model_dump() for e in rows
+        if (not window_start or (e.start_date and e.start_date >= window_start))
+        and (not window_end or (e.start_date and e.start_date < window_end))
+    ]
+    for s in series:
+        events.extend(expand_series(s.model_dump(), window_start, window_end))
+    return _session_body(events)
+
+
+def _series_body(series_data: list) -> tuple:
+    """Expand and serialize freshly parsed series, returning the body and its event count."""
+    events = [event for s in series_data for event in expand_series(s)]
+    return _session_body(events), len(events)
+
+
+def _session_body(events: list) -> bytes:
+    """Serialize events in one pass, as compact UTF-8 JSON."""
+    return encoder.encode(SessionEvents([_serialize_event(e) for e in events]))
+
+
+def _cached_response(body: bytes, etag: str, if_none_match: Optional[str]) -> Response:
+    # no-cache lets clients store the body but revalidate it with If-None-Match
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if response_cache.etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _serialize_event(e: dict) -> Event:
+    """Format a stored or expanded event for the API response."""
+    return Event(
+        e["title"],
+        e["location"],
+        hhmm(e["start_time"]),
+        hhmm(e["end_time"]),
+        e["start_date"],
+        e["end_date"],
+        e["day_of_week"],
+        e["latitude"],
+        e["longitude"],
+    )
 
 
 @router.post("/contact")
-async def submit_contact(request: ContactRequest):
+async def submit_contact(request: ContactRequest, db: AsyncSession = Depends(get_async_session)):
     """Store contact form submission."""
     submission = ContactSubmission(
         name=request.name,
@@ -151,68 +302,68 @@ async def submit_contact(request: ContactRequest):
         message=request.message,
     )
 
-    with get_session() as db:
-        db.add(submission)
-        db.commit()
+    db.add(submission)
+    await db.commit()
 
     return {"success": True, "message": "Thank you for your feedback!"}
 
 
-@router.post("/distance-matrix")
+@router.post("/distance-matrix", response_class=MsgspecResponse)
 async def get_distance_matrix(request: DistanceMatrixRequest):
-    """Get travel times from Google Maps Distance Matrix API."""
+    """Get travel times from Google Maps Distance Matrix API, or estimate them offline."""
     # Validate request parameters first (before checking API key)
     # This ensures validation errors return 400 even in test environments
     valid_modes = ["walking", "driving", "bicycling", "transit"]
     if request.mode not in valid_modes:
         raise HTTPException(status_code=400, detail=f"Invalid mode. Use: {', '.join(valid_modes)}")
 
-    if len(request.origins) > 25 or len(request.destinations) > 25:
-        raise HTTPException(status_code=400, detail="Maximum 25 origins/destinations allowed")
+    valid_engines = ["auto", "google", "local"]
+    if request.engine not in valid_engines:
+        raise HTTPException(status_code=400, detail=f"Invalid engine. Use: {', '.join(valid_engines)}")
+
+    can_estimate = request.mode in TRAVEL_MODELS
+    if request.engine == "local" and not can_estimate:
+        raise HTTPException(status_code=400, detail=f"Local estimates are not available for {request.mode}")
+
+    if len(request.origins) > DISTANCE_MATRIX_MAX_LOCATIONS or len(request.destinations) > DISTANCE_MATRIX_MAX_LOCATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum {DISTANCE_MATRIX_MAX_LOCATIONS} origins/destinations allowed",
+        )
+
+    origins = [(o.lat, o.lng) for o in request.origins]
+    destinations = [(d.lat, d.lng) for d in request.destinations]
+
+    def local_estimate():
+        return MsgspecResponse(DistanceMatrix(estimate_matrix(origins, destinations, request.mode), [], "local"))
+
+    if request.engine == "local":
+        return local_estimate()
 
     if not GOOGLE_MAPS_KEY:
+        if request.engine == "auto" and can_estimate:
+            return local_estimate()
         raise HTTPException(status_code=500, detail="Maps API not configured")
 
-    origins = "|".join(f"{o.lat},{o.lng}" for o in request.origins)
-    destinations = "|".join(f"{d.lat},{d.lng}" for d in request.destinations)
-
-    url = "https://maps.googleapis.com/maps/api/distancematrix/json"
-    params = {
-        "origins": origins,
-        "destinations": destinations,
-        "mode": request.mode,
-        "key": GOOGLE_MAPS_KEY,
-    }
+    fallback = request.engine == "auto" and can_estimate
 
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(url, params=params)
-            data = response.json()
-
-        if data.get("status") != "OK":
-            raise HTTPException(status_code=502, detail=f"Maps API error: {data.get('status')}")
-
-        results = []
-        for i, row in enumerate(data.get("rows", [])):
-            row_results = []
-            for j, element in enumerate(row.get("elements", [])):
-                if element.get("status") == "OK":
-                    row_results.append({
-                        "duration_seconds": element["duration"]["value"],
-                        "duration_text": element["duration"]["text"],
-                        "distance_meters": element["distance"]["value"],
-                        "distance_text": element["distance"]["text"],
-                    })
-                else:
-                    row_results.append(None)
-            results.append(row_results)
-
-        return {"results": results}
-
+        results, errors = await get_matrix(origins, destinations, request.mode, GOOGLE_MAPS_KEY)
+        # errors lists tiles that failed after retries; their cells are None
+        return MsgspecResponse(DistanceMatrix(results, errors, "google"))
+
+    except MapsAPIError as e:
+        if fallback:
+            logger.warning(f"Maps API error {e.status}; using local estimates")
+            return local_estimate()
+        raise HTTPException(status_code=502, detail=f"Maps API error: {e.status}")
     except httpx.TimeoutException:
+        if fallback:
+            logger.warning("Maps API timed out; using local estimates")
+            return local_estimate()
         raise HTTPException(status_code=504, detail="Request timeout. Please try again.")
-    except HTTPException:
-        raise
     except Exception as e:
         logger.exception("Distance matrix API error")
+        if fallback:
+            return local_estimate()
         raise HTTPException(status_code=500, detail="Failed to calculate travel times")
@@ -1,5 +1,13 @@
-from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel import SQLModel, create_engine, select, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event, exc, inspect, insert, text, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
+import threading
+import time
+import uuid
+import weakref
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -19,12 +27,360 @@ def _resolve_database_url() -> str:
 
 DB_URL = _resolve_database_url()
 
-connect_args = {"check_same_thread": False} if DB_URL.startswith("sqlite") else {}
+# Connection pool (timeouts and recycle in seconds)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Server-side limit per statement on Postgres (0 disables)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# PgBouncer (transaction pooling) rejects startup options and breaks
+# server-side prepared statements, so those are turned off in this mode
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
 
-engine = create_engine(DB_URL, echo=False, connect_args=connect_args)
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records checkout wait times and connection ages."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._records = weakref.WeakSet()
+        self._stats_lock = threading.Lock()
+        self.wait_stats = {"checkouts": 0, "timeouts": 0, "wait_total": 0.0, "wait_max": 0.0}
+
+    def _create_connection(self):
+        record = super()._create_connection()
+        self._records.add(record)
+        return record
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                stats = self.wait_stats
+                stats["checkouts"] += 1
+                stats["timeouts"] += timed_out
+                stats["wait_total"] += waited
+                stats["wait_max"] = max(stats["wait_max"], waited)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+    def connection_ages(self) -> list:
+        """Seconds since each open connection was established."""
+        now = time.time()
+        return [now - r.starttime for r in list(self._records) if r.dbapi_connection is not None]
+
+
+class TimedAsyncQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    """TimedQueuePool for async engines."""
+
+
+def _connect_args(url: str, statement_timeout_ms: int, pgbouncer: bool) -> dict:
+    if url.startswith("sqlite"):
+        return {"check_same_thread": False}
+    if url.startswith("postgresql") and statement_timeout_ms and not pgbouncer:
+        return {"options": f"-c statement_timeout={statement_timeout_ms}"}
+    return {}
+
+
+def _async_url(url: str) -> str:
+    """Swap a sync database URL's driver for its asyncio counterpart."""
+    scheme, sep, rest = url.partition("://")
+    backend = scheme.split("+")[0]
+    if backend == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if backend in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    return url
+
+
+def _async_connect_args(url: str, statement_timeout_ms: int, pgbouncer: bool) -> dict:
+    if not url.startswith("postgresql+asyncpg"):
+        return {}
+    if pgbouncer:
+        # Statements must not outlive the transaction that prepared them
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    if statement_timeout_ms:
+        return {"server_settings": {"statement_timeout": str(statement_timeout_ms)}}
+    return {}
+
+
+def _pool_kwargs(url: str, poolclass, pool_size, max_overflow, pool_timeout, pool_recycle, pool_pre_ping) -> dict:
+    # In-memory SQLite keeps one connection per thread and has no pool to tune
+    if ":memory:" in url or (url.startswith("sqlite") and url.split("://")[-1] in ("", "/")):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": pool_timeout,
+        "pool_recycle": pool_recycle,
+        "pool_pre_ping": pool_pre_ping,
+    }
+
+
+def _set_local_statement_timeout(sync_engine, statement_timeout_ms: int):
+    # Session settings would leak between clients, so set it per transaction
+    @event.listens_for(sync_engine, "begin")
+    def set_statement_timeout(conn):
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(statement_timeout_ms)}")
+
+
+def create_db_engine(
+    url: str,
+    pool_size: int = DB_POOL_SIZE,
+    max_overflow: int = DB_MAX_OVERFLOW,
+    pool_timeout: float = DB_POOL_TIMEOUT,
+    pool_recycle: int = DB_POOL_RECYCLE,
+    pool_pre_ping: bool = DB_POOL_PRE_PING,
+    statement_timeout_ms: int = DB_STATEMENT_TIMEOUT_MS,
+    pgbouncer: bool = DB_PGBOUNCER,
+):
+    """Build the sync engine with pool settings from the environment."""
+    db_engine = create_engine(
+        url,
+        echo=False,
+        connect_args=_connect_args(url, statement_timeout_ms, pgbouncer),
+        **_pool_kwargs(url, TimedQueuePool, pool_size, max_overflow, pool_timeout, pool_recycle, pool_pre_ping),
+    )
+    if url.startswith("postgresql") and statement_timeout_ms and pgbouncer:
+        _set_local_statement_timeout(db_engine, statement_timeout_ms)
+    return db_engine
+
+
+def create_async_db_engine(
+    url: str,
+    pool_size: int = DB_POOL_SIZE,
+    max_overflow: int = DB_MAX_OVERFLOW,
+    pool_timeout: float = DB_POOL_TIMEOUT,
+    pool_recycle: int = DB_POOL_RECYCLE,
+    pool_pre_ping: bool = DB_POOL_PRE_PING,
+    statement_timeout_ms: int = DB_STATEMENT_TIMEOUT_MS,
+    pgbouncer: bool = DB_PGBOUNCER,
+):
+    """Build the asyncio engine (asyncpg or aiosqlite) used by request handlers."""
+    url = _async_url(url)
+    db_engine = create_async_engine(
+        url,
+        echo=False,
+        connect_args=_async_connect_args(url, statement_timeout_ms, pgbouncer),
+        **_pool_kwargs(url, TimedAsyncQueuePool, pool_size, max_overflow, pool_timeout, pool_recycle, pool_pre_ping),
+    )
+    if url.startswith("postgresql") and statement_timeout_ms and pgbouncer:
+        _set_local_statement_timeout(db_engine.sync_engine, statement_timeout_ms)
+    return db_engine
+
+
+def create_async_sessionmaker(db_engine):
+    # Handlers read attributes after commit, so loaded objects must not expire
+    return async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+engine = create_db_engine(DB_URL)
+async_engine = create_async_db_engine(DB_URL)
+async_session = create_async_sessionmaker(async_engine)
+
+
+def pool_stats(db_engine=None) -> dict:
+    """Report pool configuration and usage for an engine (the sync one by default)."""
+    db_engine = db_engine or engine
+    pool = db_engine.pool
+    stats = {"pool": type(pool).__name__, "pgbouncer": DB_PGBOUNCER}
+    if not isinstance(pool, QueuePool):
+        return stats
+
+    stats.update(
+        size=pool.size(),
+        max_overflow=pool._max_overflow,
+        checked_out=pool.checkedout(),
+        checked_in=pool.checkedin(),
+        overflow=max(0, pool.overflow()),
+    )
+    stats["saturation"] = stats["checked_out"] / max(1, pool.size() + pool._max_overflow)
+
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            waits = dict(pool.wait_stats)
+        checkouts = waits["checkouts"]
+        stats.update(
+            checkouts=checkouts,
+            timeouts=waits["timeouts"],
+            wait_avg_ms=waits["wait_total"] / checkouts * 1000 if checkouts else 0.0,
+            wait_max_ms=waits["wait_max"] * 1000,
+        )
+        ages = pool.connection_ages()
+        stats["open_connections"] = len(ages)
+        stats["connection_age_max_s"] = max(ages) if ages else 0.0
+        stats["connection_age_avg_s"] = sum(ages) / len(ages) if ages else 0.0
+
+    return stats
 
 def init_db():
     SQLModel.metadata.create_all(engine)
+    add_missing_columns(engine)
+
+def _literal(value) -> str:
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+def add_missing_columns(bind=engine) -> list:
+    """
+    Add model columns that existing tables do not have yet.
+    create_all only creates missing tables, so columns added to a model later
+    are added here as nullable columns, with the model's scalar default
+    filled in for existing rows, along with any index on them. Foreign key
+    constraints are not added. Safe to run on every start.
+    Returns the "table.column" names that were added.
+    """
+    inspector = inspect(bind)
+    preparer = bind.dialect.identifier_preparer
+    added = []
+
+    with bind.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            new_columns = set()
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = (
+                    f"ALTER TABLE {preparer.quote(table.name)} "
+                    f"ADD COLUMN {preparer.quote(column.name)} {column.type.compile(dialect=bind.dialect)}"
+                )
+                default = column.default
+                if default is not None and default.is_scalar and default.arg is not None:
+                    ddl += f" DEFAULT {_literal(default.arg)}"
+                conn.execute(text(ddl))
+                new_columns.add(column.name)
+                added.append(f"{table.name}.{column.name}")
+            for index in table.indexes:
+                if new_columns.intersection(column.name for column in index.columns):
+                    index.create(conn)
+
+    return added
 
 def get_session():
+    """Sync session, for scripts and tests."""
     return Session(engine)
+
+
+async def get_async_session():
+    """FastAPI dependency that yields an AsyncSession for one request."""
+    async with async_session() as session:
+        yield session
+
+
+def insert_session_with_events(db: Session, series: list, fingerprint: str = None) -> tuple:
+    """
+    Insert a session and all of its event series in one transaction.
+    Event rows go through a single executemany, which SQLAlchemy batches into
+    multi-row INSERTs on both Postgres and SQLite.
+    Returns (session_id, session_uuid).
+    """
+    from app.models import SessionModel, EventSeriesModel
+
+    session = SessionModel(fingerprint=fingerprint)
+    db.add(session)
+    db.flush()  # assigns session.id without committing
+    session_id, session_uuid = session.id, session.uuid
+
+    if series:
+        db.execute(insert(EventSeriesModel), [{**s, "session_id": session_id} for s in series])
+    db.commit()
+
+    return session_id, session_uuid
+
+
+async def insert_session_with_events_async(db: AsyncSession, series: list, fingerprint: str = None) -> tuple:
+    """insert_session_with_events on an AsyncSession. Returns (session_id, session_uuid)."""
+    return await db.run_sync(insert_session_with_events, series, fingerprint)
+
+
+async def find_shared_session(db: AsyncSession, fingerprint: str):
+    """Id of the earliest session that owns series rows for this fingerprint, or None."""
+    from app.models import SessionModel
+
+    stmt = (
+        select(SessionModel.id)
+        .where(SessionModel.fingerprint == fingerprint, SessionModel.shared_from_id.is_(None))
+        .order_by(SessionModel.id)
+        .limit(1)
+    )
+    return (await db.exec(stmt)).first()
+
+
+async def insert_shared_session(db: AsyncSession, owner_id: int, fingerprint: str) -> tuple:
+    """
+    Insert a session that reuses owner_id's series instead of copying them.
+    Sessions are never modified after creation, so sharing needs no copy-on-write.
+    Returns (session_id, session_uuid).
+    """
+    from app.models import SessionModel
+
+    session = SessionModel(fingerprint=fingerprint, shared_from_id=owner_id)
+    db.add(session)
+    await db.commit()
+    return session.id, session.uuid
+
+
+async def insert_pending_session(db: AsyncSession) -> tuple:
+    """Insert an empty session for a background job to fill. Returns (session_id, session_uuid)."""
+    from app.models import SessionModel
+
+    session = SessionModel(status="pending")
+    db.add(session)
+    await db.commit()
+    return session.id, session.uuid
+
+
+def complete_session(db: Session, session_id: int, fingerprint: str, series: list = (), shared_from_id: int = None) -> tuple:
+    """
+    Fill a pending session with its series (or point it at a shared one) and mark it ready.
+    Returns (session_id, session_uuid).
+    """
+    from app.models import SessionModel, EventSeriesModel
+
+    session = db.get(SessionModel, session_id)
+    session.fingerprint = fingerprint
+    session.shared_from_id = shared_from_id
+    session.status = "ready"
+    session_uuid = session.uuid
+    if series:
+        db.execute(insert(EventSeriesModel), [{**s, "session_id": session_id} for s in series])
+    db.commit()
+
+    return session_id, session_uuid
+
+
+async def complete_session_async(
+    db: AsyncSession, session_id: int, fingerprint: str, series: list = (), shared_from_id: int = None
+) -> tuple:
+    """complete_session on an AsyncSession. Returns (session_id, session_uuid)."""
+    return await db.run_sync(complete_session, session_id, fingerprint, series, shared_from_id)
+
+
+async def set_session_status(db: AsyncSession, session_ids: list, status: str):
+    from app.models import SessionModel
+
+    await db.exec(update(SessionModel).where(SessionModel.id.in_(session_ids)).values(status=status))
+    await db.commit()
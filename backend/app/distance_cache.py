@@ -0,0 +1,94 @@
+"""
+Cache of distance-matrix elements keyed by (origin, destination, mode).
+
+Coordinates are quantized so the same building requested with slightly
+different floats shares an entry. Each mode has its own TTL because transit
+times depend on the time of day while walking times barely change.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DISTANCE_CACHE_SIZE = int(os.getenv("DISTANCE_CACHE_SIZE", "50000"))
+# Decimal places kept when quantizing coordinates (4 is ~11m)
+DISTANCE_CACHE_PRECISION = int(os.getenv("DISTANCE_CACHE_PRECISION", "4"))
+
+# Seconds each mode's elements stay fresh
+DISTANCE_CACHE_TTLS = {
+    "walking": int(os.getenv("DISTANCE_CACHE_TTL_WALKING", str(30 * 24 * 3600))),
+    "bicycling": int(os.getenv("DISTANCE_CACHE_TTL_BICYCLING", str(30 * 24 * 3600))),
+    "driving": int(os.getenv("DISTANCE_CACHE_TTL_DRIVING", str(24 * 3600))),
+    "transit": int(os.getenv("DISTANCE_CACHE_TTL_TRANSIT", str(15 * 60))),
+}
+
+# Returned by get() on a miss, since None is a valid cached element
+MISSING = object()
+
+
+def quantize(lat: float, lng: float, precision: int = DISTANCE_CACHE_PRECISION) -> tuple:
+    return (round(lat, precision), round(lng, precision))
+
+
+class DistanceCache:
+    """LRU of per-pair elements with mode-specific TTLs."""
+
+    def __init__(
+        self,
+        max_entries: int = DISTANCE_CACHE_SIZE,
+        precision: int = DISTANCE_CACHE_PRECISION,
+        ttls: dict = None,
+    ):
+        self.max_entries = max_entries
+        self.precision = precision
+        self.ttls = ttls or DISTANCE_CACHE_TTLS
+
+        self._entries: OrderedDict[tuple, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _key(self, origin: tuple, destination: tuple, mode: str) -> tuple:
+        return (quantize(*origin, self.precision), quantize(*destination, self.precision), mode)
+
+    def get(self, origin: tuple, destination: tuple, mode: str):
+        """Return the cached element (possibly None) or MISSING."""
+        key = self._key(origin, destination, mode)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > time.time():
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[0]
+            if entry:
+                del self._entries[key]
+            self._stats["misses"] += 1
+            return MISSING
+
+    def set(self, origin: tuple, destination: tuple, mode: str, element):
+        ttl = self.ttls.get(mode, 0)
+        if ttl <= 0:
+            return
+        key = self._key(origin, destination, mode)
+        with self._lock:
+            self._entries[key] = (element, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+cache = DistanceCache()
@@ -0,0 +1,231 @@
+"""
+Travel-time grids from the Google Maps Distance Matrix API.
+
+Cached pairs are answered locally; only the rows and columns that still
+have missing pairs are sent upstream. Grids larger than one upstream
+request are split into tiles that are fetched concurrently under an
+elements-per-second budget and stitched back together.
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+
+import httpx
+
+from app import distance_cache, http_client, metrics
+
+logger = logging.getLogger(__name__)
+
+DISTANCE_MATRIX_URL = "https://maps.googleapis.com/maps/api/distancematrix/json"
+
+# Upstream limits for a single request
+MAX_TILE_ORIGINS = 25
+MAX_TILE_DESTINATIONS = 25
+MAX_TILE_ELEMENTS = 100
+
+# Largest grid side we accept from clients. The endpoint is public and each element
+# is billed, so larger grids (up to 100, i.e. 10,000 elements) are opt-in
+DISTANCE_MATRIX_MAX_LOCATIONS = int(os.getenv("DISTANCE_MATRIX_MAX_LOCATIONS", "25"))
+DISTANCE_MATRIX_CONCURRENCY = int(os.getenv("DISTANCE_MATRIX_CONCURRENCY", "10"))
+DISTANCE_MATRIX_ELEMENTS_PER_SECOND = float(os.getenv("DISTANCE_MATRIX_ELEMENTS_PER_SECOND", "1000"))
+DISTANCE_MATRIX_TILE_RETRIES = int(os.getenv("DISTANCE_MATRIX_TILE_RETRIES", "2"))
+RETRY_BACKOFF_SECONDS = 0.25
+
+# Top-level statuses worth retrying
+TRANSIENT_STATUSES = {"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"}
+
+
+class MapsAPIError(Exception):
+    """Upstream returned a non-OK top-level status."""
+
+    def __init__(self, status: str):
+        super().__init__(f"Maps API error: {status}")
+        self.status = status
+
+
+def parse_element(element: dict):
+    """Convert one upstream element to our result format (None if not routable)."""
+    if element.get("status") != "OK":
+        return None
+    return {
+        "duration_seconds": element["duration"]["value"],
+        "duration_text": element["duration"]["text"],
+        "distance_meters": element["distance"]["value"],
+        "distance_text": element["distance"]["text"],
+    }
+
+
+async def fetch_matrix(origins: list, destinations: list, mode: str, api_key: str) -> list:
+    """Request one grid from the Distance Matrix API. Origins/destinations are (lat, lng) tuples."""
+    params = {
+        "origins": "|".join(f"{lat},{lng}" for lat, lng in origins),
+        "destinations": "|".join(f"{lat},{lng}" for lat, lng in destinations),
+        "mode": mode,
+        "key": api_key,
+    }
+    started = time.perf_counter()
+    try:
+        response = await http_client.get_client().get(DISTANCE_MATRIX_URL, params=params)
+        data = response.json()
+    except Exception as e:
+        metrics.observe_google("distancematrix", metrics.google_status(e), time.perf_counter() - started)
+        raise
+    metrics.observe_google("distancematrix", data.get("status") or "ERROR", time.perf_counter() - started)
+
+    if data.get("status") != "OK":
+        raise MapsAPIError(data.get("status"))
+
+    return [
+        [parse_element(element) for element in row.get("elements", [])]
+        for row in data.get("rows", [])
+    ]
+
+
+class ElementBudget:
+    """Token bucket that paces upstream calls to an elements-per-second rate."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    async def acquire(self, elements: int):
+        # No await between the refill and the spend, so this is safe without a lock
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= elements or self.tokens >= self.rate:
+                self.tokens -= elements
+                return
+            await asyncio.sleep((elements - self.tokens) / self.rate)
+
+
+budget = ElementBudget(DISTANCE_MATRIX_ELEMENTS_PER_SECOND)
+
+
+def plan_tiles(n_origins: int, n_destinations: int) -> list:
+    """
+    Split an n_origins x n_destinations grid into upstream-legal tiles.
+    Picks the tile shape that needs the fewest requests.
+    Returns a list of (origin_range, destination_range).
+    """
+    best = None
+    for rows in range(1, min(n_origins, MAX_TILE_ORIGINS) + 1):
+        cols = min(n_destinations, MAX_TILE_DESTINATIONS, MAX_TILE_ELEMENTS // rows)
+        count = math.ceil(n_origins / rows) * math.ceil(n_destinations / cols)
+        if best is None or count < best[0]:
+            best = (count, rows, cols)
+
+    _, rows, cols = best
+    return [
+        (range(r, min(r + rows, n_origins)), range(c, min(c + cols, n_destinations)))
+        for r in range(0, n_origins, rows)
+        for c in range(0, n_destinations, cols)
+    ]
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, MapsAPIError):
+        return error.status in TRANSIENT_STATUSES
+    return isinstance(error, (httpx.TimeoutException, httpx.TransportError))
+
+
+async def _fetch_tile(origins: list, destinations: list, mode: str, api_key: str) -> list:
+    """Fetch one tile, retrying transient failures with exponential backoff."""
+    for attempt in range(DISTANCE_MATRIX_TILE_RETRIES + 1):
+        await budget.acquire(len(origins) * len(destinations))
+        try:
+            return await fetch_matrix(origins, destinations, mode, api_key)
+        except Exception as e:
+            if attempt == DISTANCE_MATRIX_TILE_RETRIES or not _is_transient(e):
+                raise
+            logger.debug(f"Distance matrix tile failed ({e!r}), retry {attempt + 1}")
+            await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+
+
+async def fetch_tiled(origins: list, destinations: list, mode: str, api_key: str) -> tuple:
+    """
+    Fetch a grid of any size as concurrent tiles.
+    Returns (grid, failures); cells of failed tiles are left as MISSING and
+    each failure is an (origin_range, destination_range, exception) entry.
+    """
+    grid = [[distance_cache.MISSING] * len(destinations) for _ in origins]
+    failures = []
+    semaphore = asyncio.Semaphore(DISTANCE_MATRIX_CONCURRENCY)
+
+    async def run_tile(origin_range, dest_range):
+        async with semaphore:
+            try:
+                tile = await _fetch_tile(
+                    [origins[i] for i in origin_range],
+                    [destinations[j] for j in dest_range],
+                    mode,
+                    api_key,
+                )
+            except Exception as e:
+                failures.append((origin_range, dest_range, e))
+                return
+
+        for a, i in enumerate(origin_range):
+            row = tile[a] if a < len(tile) else []
+            for b, j in enumerate(dest_range):
+                grid[i][j] = row[b] if b < len(row) else distance_cache.MISSING
+
+    await asyncio.gather(*(run_tile(o, d) for o, d in plan_tiles(len(origins), len(destinations))))
+    return grid, failures
+
+
+async def get_matrix(origins: list, destinations: list, mode: str, api_key: str) -> tuple:
+    """
+    Resolve a full grid, going upstream only for pairs that are not cached.
+    Returns (results, errors) where errors describes tiles that failed. If
+    every tile fails, the first failure is raised instead.
+    """
+    cache = distance_cache.cache
+    results = [[cache.get(o, d, mode) for d in destinations] for o in origins]
+
+    missing = [
+        (i, j)
+        for i, row in enumerate(results)
+        for j, element in enumerate(row)
+        if element is distance_cache.MISSING
+    ]
+    if not missing:
+        return results, []
+
+    # Request the smallest sub-grid covering every missing pair
+    origin_idx = sorted({i for i, _ in missing})
+    dest_idx = sorted({j for _, j in missing})
+    logger.debug(f"Distance matrix: {len(missing)} uncached pairs, requesting {len(origin_idx)}x{len(dest_idx)}")
+
+    grid, failures = await fetch_tiled(
+        [origins[i] for i in origin_idx],
+        [destinations[j] for j in dest_idx],
+        mode,
+        api_key,
+    )
+    if failures and len(failures) == len(plan_tiles(len(origin_idx), len(dest_idx))):
+        raise failures[0][2]
+
+    for a, i in enumerate(origin_idx):
+        for b, j in enumerate(dest_idx):
+            element = grid[a][b]
+            if element is distance_cache.MISSING:
+                element = None  # Failed tile or short response; leave uncached
+            else:
+                cache.set(origins[i], destinations[j], mode, element)
+            if results[i][j] is distance_cache.MISSING:
+                results[i][j] = element
+
+    errors = [
+        {
+            "origins": [origin_idx[k] for k in o],
+            "destinations": [dest_idx[k] for k in d],
+            "error": str(e) or e.__class__.__name__,
+        }
+        for o, d, e in failures
+    ]
+    return results, errors
@@ -0,0 +1,405 @@
+"""
+Local gazetteer of campus buildings, consulted before any geocoding call.
+
+Entries are bulk-loaded from CSV or GeoJSON files and learned from
+high-confidence Google results, which expire after GEOCODE_CACHE_TTL like
+any cached geocode. Names and aliases are indexed by their
+location_key, so an exact match is a dict lookup; otherwise candidates
+sharing a token are scored by IDF-weighted token overlap, which tolerates
+word order, missing words and leftover abbreviations. A name found on
+more than one campus only resolves when a bias point picks the campus.
+"""
+import csv
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from app import utils
+from app.geocode_cache import GEOCODE_CACHE_TTL
+from app.locations import location_key
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_PATHS = os.getenv("GAZETTEER_PATHS", "")  # comma-separated CSV/GeoJSON files
+GAZETTEER_RADIUS_KM = float(os.getenv("GAZETTEER_RADIUS_KM", "5"))
+GAZETTEER_MATCH_THRESHOLD = float(os.getenv("GAZETTEER_MATCH_THRESHOLD", "0.75"))
+GAZETTEER_LEARN = os.getenv("GAZETTEER_LEARN", "false").lower() == "true"
+GAZETTEER_LEARN_CONFIDENCE = float(os.getenv("GAZETTEER_LEARN_CONFIDENCE", "0.9"))
+GAZETTEER_LEARNED_PATH = os.getenv("GAZETTEER_LEARNED_PATH")  # CSV that learned entries are appended to
+# Learned entries kept, including those reloaded from GAZETTEER_LEARNED_PATH; later results are not learned
+GAZETTEER_MAX_LEARNED = int(os.getenv("GAZETTEER_MAX_LEARNED", "10000"))
+
+CSV_FIELDS = ["name", "lat", "lng", "campus", "aliases", "learned_at"]
+KM_PER_DEGREE = 111.0  # of latitude
+FUZZY_MEMO_SIZE = 10_000
+
+
+def _aliases(value) -> list:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [a.strip() for a in value.split("|") if a.strip()]
+    return [str(a) for a in value]
+
+
+def read_csv(path) -> list:
+    """
+    Entries from a CSV with name, lat, lng and optional campus, aliases ("|"-separated)
+    and learned_at (Unix time, set on learned entries) columns.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        return [
+            {
+                "name": row["name"],
+                "lat": float(row["lat"]),
+                "lng": float(row["lng"]),
+                "campus": row.get("campus") or None,
+                "aliases": _aliases(row.get("aliases")),
+                "learned_at": float(row["learned_at"]) if row.get("learned_at") else None,
+            }
+            for row in csv.DictReader(f)
+            if row.get("name") and row.get("lat") and row.get("lng")
+        ]
+
+
+def _centroid(geometry: dict):
+    """(lat, lng) of a Point, or the vertex average of a Polygon's outer ring."""
+    kind, coords = geometry.get("type"), geometry.get("coordinates")
+    if kind == "Point":
+        return coords[1], coords[0]
+    if kind == "Polygon":
+        ring = coords[0][:-1] or coords[0]
+    elif kind == "MultiPolygon":
+        ring = coords[0][0][:-1] or coords[0][0]
+    else:
+        return None
+    return sum(p[1] for p in ring) / len(ring), sum(p[0] for p in ring) / len(ring)
+
+
+def read_geojson(path) -> list:
+    """Entries from a FeatureCollection of Point or Polygon features with a name property."""
+    with open(path, encoding="utf-8") as f:
+        collection = json.load(f)
+
+    entries = []
+    for feature in collection.get("features", []):
+        props = feature.get("properties") or {}
+        center = _centroid(feature.get("geometry") or {})
+        if not props.get("name") or center is None:
+            continue
+        entries.append({
+            "name": props["name"],
+            "lat": center[0],
+            "lng": center[1],
+            "campus": props.get("campus"),
+            "aliases": _aliases(props.get("aliases")),
+            "learned_at": None,
+        })
+    return entries
+
+
+def read_file(path) -> list:
+    suffix = Path(path).suffix.lower()
+    if suffix in (".geojson", ".json"):
+        return read_geojson(path)
+    return read_csv(path)
+
+
+class Gazetteer:
+    """In-memory index of named points with exact and fuzzy-token lookup."""
+
+    def __init__(
+        self,
+        radius_km: float = GAZETTEER_RADIUS_KM,
+        match_threshold: float = GAZETTEER_MATCH_THRESHOLD,
+        learn_confidence: float = GAZETTEER_LEARN_CONFIDENCE,
+        learned_path: str = None,
+        max_learned: int = GAZETTEER_MAX_LEARNED,
+        learned_ttl: int = GEOCODE_CACHE_TTL,
+    ):
+        self.radius_km = radius_km
+        self.match_threshold = match_threshold
+        self.learn_confidence = learn_confidence
+        self.learned_path = learned_path
+        self.max_learned = max_learned
+        self.learned_ttl = learned_ttl
+
+        self._entries = []  # dicts with name, lat, lng, campus, confidence, learned_at; None once expired
+        self._keys = defaultdict(list)  # location_key of a name or alias -> entry indexes
+        self._cells = defaultdict(list)  # (key, lat cell, lng cell) -> entry indexes
+        self._cell_deg = max(radius_km, 0.1) / KM_PER_DEGREE
+        self._tokens = defaultdict(set)  # token -> keys containing it
+        self._fuzzy = {}  # query key -> best fuzzy key
+        self._fuzzy_tokens = defaultdict(set)  # token -> memoized query keys containing it
+        self._learned = 0
+        self._expired = 0
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "fuzzy_hits": 0, "misses": 0, "unresolved": 0, "learned": 0, "expired": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries) - self._expired
+
+    def add(self, name: str, lat: float, lng: float, campus: str = None, aliases=(), confidence: float = 1.0, learned_at: float = None):
+        """Index a point; entries with learned_at were learned and expire learned_ttl seconds after it."""
+        with self._lock:
+            self._add(name, lat, lng, campus, aliases, confidence, learned_at)
+
+    def _add(self, name, lat, lng, campus, aliases, confidence, learned_at):
+        index = len(self._entries)
+        self._entries.append({
+            "name": name, "lat": lat, "lng": lng, "campus": campus,
+            "confidence": confidence, "learned_at": learned_at,
+        })
+        for label in [name, *aliases]:
+            key = location_key(label)
+            if not key or index in self._keys[key]:
+                continue
+            self._keys[key].append(index)
+            self._cells[(key, *self._cell(lat, lng))].append(index)
+            for token in key.split():
+                self._tokens[token].add(key)
+                # Only queries sharing a token can match the new key. Others keep their
+                # answer, though IDF weights shift slightly with every key added.
+                self._forget_fuzzy(token)
+        if learned_at is not None:
+            self._learned += 1
+
+    def _forget_fuzzy(self, token: str):
+        for query in self._fuzzy_tokens.pop(token, ()):
+            self._fuzzy.pop(query, None)
+
+    def _is_expired(self, entry: dict, now: float) -> bool:
+        return entry["learned_at"] is not None and now - entry["learned_at"] >= self.learned_ttl
+
+    def _drop_expired(self, ids) -> bool:
+        """Remove the learned entries among ids that have outlived learned_ttl. Returns whether any were."""
+        now = time.time()
+        expired = [i for i in ids if self._is_expired(self._entries[i], now)]
+        for i in expired:
+            # Learned entries are indexed under their name only
+            entry = self._entries[i]
+            key = location_key(entry["name"])
+            cell = (key, *self._cell(entry["lat"], entry["lng"]))
+            self._keys[key].remove(i)
+            self._cells[cell].remove(i)
+            if not self._cells[cell]:
+                del self._cells[cell]
+            if not self._keys[key]:
+                del self._keys[key]
+                for token in key.split():
+                    self._tokens[token].discard(key)
+                    self._forget_fuzzy(token)
+            self._entries[i] = None
+            self._learned -= 1
+            self._expired += 1
+            self._stats["expired"] += 1
+        return bool(expired)
+
+    def _cell(self, lat: float, lng: float) -> tuple:
+        return math.floor(lat / self._cell_deg), math.floor(lng / self._cell_deg)
+
+    def load(self, path, learned: bool = False) -> int:
+        """
+        Add every entry in a CSV or GeoJSON file. Returns how many were added.
+        A learned file keeps only rows still within learned_ttl, up to max_learned;
+        when it is learned_path, the rows dropped are removed from the file too.
+        """
+        entries = read_file(path)
+        confidence = self.learn_confidence if learned else 1.0
+        with self._lock:
+            if learned:
+                now = time.time()
+                # Rows without learned_at predate expiry and are refreshed from the geocoder
+                kept = [e for e in entries if e["learned_at"] is not None and not self._is_expired(e, now)]
+                kept = kept[:max(0, self.max_learned - self._learned)]
+                if len(kept) < len(entries) and self.learned_path and Path(path) == Path(self.learned_path):
+                    self._rewrite_learned(kept)
+                entries = kept
+            for e in entries:
+                self._add(e["name"], e["lat"], e["lng"], e["campus"], e["aliases"], confidence, e["learned_at"])
+        logger.info(f"Loaded {len(entries)} gazetteer entries from {path}")
+        return len(entries)
+
+    def lookup(self, address: str, bias_coords: dict = None):
+        """
+        Resolve an address to a geocode result, or None to fall through to the geocoder.
+        With bias_coords, only entries within radius_km of it are considered.
+        """
+        key = location_key(address or "")
+        if not key:
+            return None
+
+        with self._lock:
+            ids = self._keys.get(key)
+            if ids and self._drop_expired(ids):
+                ids = self._keys.get(key)
+            kind = "exact"
+            if not ids:
+                if key not in self._fuzzy:
+                    if len(self._fuzzy) >= FUZZY_MEMO_SIZE:
+                        self._fuzzy.clear()
+                        self._fuzzy_tokens.clear()
+                    self._fuzzy[key] = self._fuzzy_key(key)
+                    for token in key.split():
+                        self._fuzzy_tokens[token].add(key)
+                key = self._fuzzy[key]
+                ids = self._keys.get(key) if key else None
+                if ids and self._drop_expired(ids):
+                    ids = self._keys.get(key)
+                kind = "fuzzy"
+            if not ids:
+                self._stats["misses"] += 1
+                return None
+
+            entry = self._pick(key, ids, bias_coords)
+            if entry is None:
+                # Known name, but not near the bias point or on several campuses
+                self._stats["unresolved"] += 1
+                return None
+            self._stats[f"{kind}_hits"] += 1
+
+        return {
+            "lat": entry["lat"],
+            "lng": entry["lng"],
+            "confidence": entry["confidence"],
+            "raw": {"gazetteer": entry["name"], "campus": entry["campus"], "match": kind},
+        }
+
+    def _fuzzy_key(self, key: str):
+        """Best indexed key by IDF-weighted Jaccard overlap of tokens, if above the threshold."""
+        tokens = set(key.split())
+        total = len(self._keys)
+
+        def weight(token):
+            return math.log(1 + total / max(1, len(self._tokens.get(token, ()))))
+
+        candidates = set()
+        for token in tokens:
+            candidates.update(self._tokens.get(token, ()))
+
+        best, best_score = None, self.match_threshold
+        for candidate in candidates:
+            other = set(candidate.split())
+            shared = sum(weight(t) for t in tokens & other)
+            score = shared / sum(weight(t) for t in tokens | other)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def _pick(self, key: str, ids: list, bias_coords: dict):
+        if bias_coords:
+            ids = self._near(key, bias_coords)
+        entries = [self._entries[i] for i in ids]
+        if bias_coords:
+            entries = [e for e in entries if self._distance(e, bias_coords) <= self.radius_km]
+        if not entries:
+            return None
+        # The same name on several campuses needs a bias point to choose between them
+        if any(self._distance(entries[0], e) > self.radius_km for e in entries[1:]):
+            return None
+        return max(entries, key=lambda e: (e["learned_at"] is None, e["confidence"]))
+
+    def _near(self, key: str, point: dict) -> list:
+        """Entries for key in the grid cells within radius_km of point."""
+        lat_cell, lng_cell = self._cell(point["lat"], point["lng"])
+        # Degrees of longitude shrink towards the poles, so widen the lng span
+        lng_span = math.ceil(1 / max(math.cos(math.radians(point["lat"])), 0.01))
+        ids = []
+        for i in range(lat_cell - 1, lat_cell + 2):
+            for j in range(lng_cell - lng_span, lng_cell + lng_span + 1):
+                ids.extend(self._cells.get((key, i, j), ()))
+        return ids
+
+    @staticmethod
+    def _distance(a: dict, b: dict) -> float:
+        return utils.haversine_distance(a["lat"], a["lng"], b["lat"], b["lng"])
+
+    def learn(self, address: str, result: dict):
+        """
+        Remember a successful geocode so later uploads skip the external call.
+        Only results at or above learn_confidence are kept, a name already
+        known within radius_km is left alone, and nothing more is learned once
+        max_learned entries are. Learned entries expire after learned_ttl.
+        """
+        if result.get("lat") is None or result.get("confidence", 0) < self.learn_confidence:
+            return
+        key = location_key(address or "")
+        if not key:
+            return
+
+        learned_at = time.time()
+        with self._lock:
+            if self._learned >= self.max_learned:
+                # Make room from entries that have expired without being looked up again
+                self._drop_expired([i for i, e in enumerate(self._entries) if e is not None])
+                if self._learned >= self.max_learned:
+                    return
+            near = self._near(key, result)
+            if self._drop_expired(near):
+                near = self._near(key, result)
+            if any(self._distance(self._entries[i], result) <= self.radius_km for i in near):
+                return
+            self._add(address, result["lat"], result["lng"], None, (), result["confidence"], learned_at)
+            self._stats["learned"] += 1
+
+        if self.learned_path:
+            self._append_learned(address, result, learned_at)
+
+    def _append_learned(self, address: str, result: dict, learned_at: float):
+        path = Path(self.learned_path)
+        try:
+            is_new = not path.exists()
+            with open(path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+                if is_new:
+                    writer.writeheader()
+                writer.writerow(_learned_row(address, result, learned_at))
+        except OSError as e:
+            logger.debug(f"Could not record learned gazetteer entry '{address}': {e}")
+
+    def _rewrite_learned(self, entries: list):
+        """Replace the learned file with entries, dropping expired and over-cap rows."""
+        path = Path(self.learned_path)
+        temp = path.with_name(path.name + ".tmp")
+        try:
+            with open(temp, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+                writer.writeheader()
+                writer.writerows(_learned_row(e["name"], e, e["learned_at"]) for e in entries)
+            os.replace(temp, path)
+        except OSError as e:
+            logger.debug(f"Could not compact learned gazetteer file {path}: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries) - self._expired
+        lookups = stats["exact_hits"] + stats["fuzzy_hits"] + stats["misses"] + stats["unresolved"]
+        stats["hit_ratio"] = (stats["exact_hits"] + stats["fuzzy_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+def _learned_row(name: str, point: dict, learned_at: float) -> dict:
+    return {"name": name, "lat": point["lat"], "lng": point["lng"], "campus": "", "aliases": "", "learned_at": f"{learned_at:.0f}"}
+
+
+def build_index(paths: str = GAZETTEER_PATHS, learned_path: str = GAZETTEER_LEARNED_PATH) -> Gazetteer:
+    """Gazetteer loaded from the configured files, including previously learned entries."""
+    gazetteer = Gazetteer(learned_path=learned_path if GAZETTEER_LEARN else None)
+    files = [(p.strip(), False) for p in paths.split(",") if p.strip()]
+    if learned_path and Path(learned_path).exists():
+        files.append((learned_path, True))
+    for path, learned in files:
+        try:
+            gazetteer.load(path, learned=learned)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Skipping gazetteer file {path}: {e}")
+    return gazetteer
+
+
+index = build_index()
@@ -0,0 +1,191 @@
+"""
+Two-tier cache for geocoding results.
+
+An in-process LRU sits in front of a durable table in the app database, so
+repeat uploads from the same school skip Google almost entirely.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import select
+
+from app.locations import location_key
+from app.models import GeocodeCacheEntry
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", "5000"))
+GEOCODE_CACHE_TTL = int(os.getenv("GEOCODE_CACHE_TTL", str(30 * 24 * 3600)))  # 30 days
+GEOCODE_CACHE_NEGATIVE_TTL = int(os.getenv("GEOCODE_CACHE_NEGATIVE_TTL", str(24 * 3600)))  # 1 day
+GEOCODE_CACHE_DURABLE = os.getenv("GEOCODE_CACHE_DURABLE", "true").lower() == "true"
+
+# Bias coordinates are rounded to ~11m so nearby anchors share a bias box
+BIAS_PRECISION = 4
+
+
+def make_cache_key(address: str, bias_coords: dict = None) -> str:
+    """Build a cache key from the canonical address and bias box."""
+    normalized = location_key(address)
+    if not bias_coords:
+        return normalized
+    return f"{normalized}|{bias_coords['lat']:.{BIAS_PRECISION}f},{bias_coords['lng']:.{BIAS_PRECISION}f}"
+
+
+class GeocodeCache:
+    """
+    LRU + database cache for geocode_location results.
+    Results with lat=None are cached as negatives with a shorter TTL.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = GEOCODE_CACHE_SIZE,
+        ttl: int = GEOCODE_CACHE_TTL,
+        negative_ttl: int = GEOCODE_CACHE_NEGATIVE_TTL,
+        durable: bool = GEOCODE_CACHE_DURABLE,
+        session_factory=None,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.durable = durable
+        self._session_factory = session_factory
+
+        self._entries: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "memory_hits": 0,
+            "durable_hits": 0,
+            "negative_hits": 0,
+            "evictions": 0,
+            "writes": 0,
+        }
+
+    def _open_session(self):
+        if self._session_factory:
+            return self._session_factory()
+        from app import database
+        return database.get_session()
+
+    def _ttl_for(self, result: dict) -> int:
+        return self.negative_ttl if result["lat"] is None else self.ttl
+
+    def _remember(self, key: str, result: dict, expires_at: float):
+        """Insert into the LRU tier. Caller must hold the lock."""
+        self._entries[key] = (result, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _record_hit(self, result: dict, tier: str):
+        self._stats["hits"] += 1
+        self._stats[f"{tier}_hits"] += 1
+        if result["lat"] is None:
+            self._stats["negative_hits"] += 1
+
+    def get(self, address: str, bias_coords: dict = None):
+        """Return a cached geocode result, or None on a miss."""
+        key = make_cache_key(address, bias_coords)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                result, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._record_hit(result, "memory")
+                    return dict(result)
+                del self._entries[key]
+
+        result = self._load_durable(key, now)
+
+        with self._lock:
+            if result is None:
+                self._stats["misses"] += 1
+                return None
+            stored_at, result = result
+            self._remember(key, result, stored_at + self._ttl_for(result))
+            self._record_hit(result, "durable")
+            return dict(result)
+
+    def set(self, address: str, bias_coords: dict, result: dict):
+        """Store a geocode result in both tiers."""
+        key = make_cache_key(address, bias_coords)
+        result = {
+            "lat": result["lat"],
+            "lng": result["lng"],
+            "confidence": result["confidence"],
+            "raw": result.get("raw"),
+        }
+        now = time.time()
+
+        with self._lock:
+            self._remember(key, result, now + self._ttl_for(result))
+            self._stats["writes"] += 1
+
+        self._store_durable(key, result)
+
+    def _load_durable(self, key: str, now: float):
+        if not self.durable:
+            return None
+        try:
+            with self._open_session() as db:
+                entry = db.exec(select(GeocodeCacheEntry).where(GeocodeCacheEntry.cache_key == key)).first()
+        except SQLAlchemyError as e:
+            logger.debug(f"Geocode cache lookup failed for '{key}': {e}")
+            return None
+
+        if not entry:
+            return None
+
+        result = {"lat": entry.lat, "lng": entry.lng, "confidence": entry.confidence, "raw": entry.raw}
+        age = (datetime.utcnow() - entry.created_at).total_seconds()
+        if age >= self._ttl_for(result):
+            return None
+        return now - age, result
+
+    def _store_durable(self, key: str, result: dict):
+        if not self.durable:
+            return
+        try:
+            with self._open_session() as db:
+                entry = db.exec(select(GeocodeCacheEntry).where(GeocodeCacheEntry.cache_key == key)).first()
+                if not entry:
+                    entry = GeocodeCacheEntry(cache_key=key)
+                entry.lat = result["lat"]
+                entry.lng = result["lng"]
+                entry.confidence = result["confidence"]
+                entry.raw = result["raw"]
+                entry.created_at = datetime.utcnow()
+                db.add(entry)
+                db.commit()
+        except SQLAlchemyError as e:
+            # Another worker may have inserted the same key; the LRU still has it
+            logger.debug(f"Geocode cache write failed for '{key}': {e}")
+
+    def clear(self):
+        """Drop the in-process tier and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+cache = GeocodeCache()
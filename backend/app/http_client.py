@@ -0,0 +1,119 @@
+"""
+Application-scoped HTTP client for upstream Google Maps calls.
+
+One pooled httpx.AsyncClient is opened by the FastAPI lifespan and reused
+by every request, so connections (and their TLS sessions) stay warm.
+"""
+import logging
+import os
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))  # seconds
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))  # seconds
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "5"))  # seconds to wait for a free connection
+
+# HTTP/2 needs the optional h2 package
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+HTTP2_ENABLED = HTTP2_AVAILABLE and os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+
+class PooledAsyncClient(httpx.AsyncClient):
+    """AsyncClient that tracks in-flight requests for pool saturation metrics."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = {
+            "requests": 0,
+            "in_flight": 0,
+            "peak_in_flight": 0,
+            "errors": 0,
+            "pool_timeouts": 0,
+        }
+
+    async def send(self, request, **kwargs):
+        self.stats["requests"] += 1
+        self.stats["in_flight"] += 1
+        self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+        try:
+            return await super().send(request, **kwargs)
+        except httpx.PoolTimeout:
+            self.stats["pool_timeouts"] += 1
+            self.stats["errors"] += 1
+            raise
+        except httpx.HTTPError:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.stats["in_flight"] -= 1
+
+
+_client: PooledAsyncClient = None
+
+
+def create_client() -> PooledAsyncClient:
+    return PooledAsyncClient(
+        http2=HTTP2_ENABLED,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(HTTP_TIMEOUT, pool=HTTP_POOL_TIMEOUT),
+    )
+
+
+async def start():
+    """Open the shared client. Called from the app lifespan."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_client()
+        logger.info(f"HTTP client started (http2={HTTP2_ENABLED}, max_connections={HTTP_MAX_CONNECTIONS})")
+
+
+async def close():
+    """Close the shared client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> PooledAsyncClient:
+    """Return the shared client, creating it if the lifespan has not run (scripts, tests)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_client()
+    return _client
+
+
+def pool_stats() -> dict:
+    """Report pool configuration and usage for the shared client."""
+    stats = {
+        "http2": HTTP2_ENABLED,
+        "max_connections": HTTP_MAX_CONNECTIONS,
+        "max_keepalive_connections": HTTP_MAX_KEEPALIVE,
+        "started": _client is not None and not _client.is_closed,
+    }
+    if not stats["started"]:
+        return stats
+
+    stats.update(_client.stats)
+    stats["saturation"] = _client.stats["in_flight"] / HTTP_MAX_CONNECTIONS
+
+    # httpcore does not expose pool state publicly; report it when we can
+    pool = getattr(_client._transport, "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is not None:
+        stats["open_connections"] = len(connections)
+        stats["idle_connections"] = sum(1 for c in connections if c.is_idle())
+
+    return stats
@@ -0,0 +1,255 @@
+"""
+Line-oriented parser for the subset of iCalendar we use.
+
+ics.Calendar builds a full object tree through a generic grammar, but we
+only read each VEVENT's start, end, summary, location and recurrence
+properties. This parser reads exactly those from unfolded content lines.
+Events it cannot handle are parsed with ics instead.
+"""
+import logging
+import re
+from datetime import datetime, timedelta
+
+from ics import Calendar
+
+from app.utils import (
+    clean_location,
+    event_record,
+    parse_ical_date,
+    recurrence_fields,
+)
+
+logger = logging.getLogger(__name__)
+
+# Components we keep; everything else (VTODO, VJOURNAL, ...) is skipped
+COMPONENTS = {"VEVENT", "VTIMEZONE"}
+
+ESCAPE_RE = re.compile(r"\\([\\;,nN])")
+DURATION_RE = re.compile(
+    r"^\+?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$"
+)
+
+
+class UnsupportedEvent(Exception):
+    """The event uses something this parser does not handle."""
+
+
+class ComponentTokenizer:
+    """
+    Split iCalendar text into components as it arrives.
+    feed() returns the (name, lines) of every VEVENT and VTIMEZONE completed
+    by the new text, with folded lines already joined.
+    """
+
+    def __init__(self):
+        self._partial = ""     # Physical line still waiting for its newline
+        self._logical = None   # Unfolded line that may still get continuations
+        self._component = None
+        self._depth = 0
+        self._lines = []
+        self.saw_calendar = False
+
+    def feed(self, text: str) -> list:
+        completed = []
+        physical = (self._partial + text).split("\n")
+        self._partial = physical.pop()
+        for line in physical:
+            self._physical_line(line.rstrip("\r"), completed)
+        return completed
+
+    def close(self) -> list:
+        """Flush the final line; raises ValueError if the text was not a calendar."""
+        completed = []
+        if self._partial:
+            self._physical_line(self._partial.rstrip("\r"), completed)
+            self._partial = ""
+        if self._logical is not None:
+            self._content_line(self._logical, completed)
+            self._logical = None
+        if not self.saw_calendar:
+            raise ValueError("Not an iCalendar file")
+        return completed
+
+    def _physical_line(self, line: str, completed: list):
+        if line[:1] in (" ", "\t"):
+            # Continuation of a folded line (RFC 5545 3.1)
+            if self._logical is not None:
+                self._logical += line[1:]
+            return
+        if self._logical is not None:
+            self._content_line(self._logical, completed)
+        self._logical = line if line else None
+
+    def _content_line(self, line: str, completed: list):
+        upper = line.upper()
+        if upper.startswith("BEGIN:"):
+            name = upper[6:].strip()
+            if name == "VCALENDAR":
+                self.saw_calendar = True
+            elif self._component is None and name in COMPONENTS:
+                self._component, self._depth, self._lines = name, 0, []
+            if self._component is not None:
+                self._depth += 1
+        elif upper.startswith("END:") and self._component is not None:
+            self._depth -= 1
+            if self._depth == 0:
+                self._lines.append(line)
+                completed.append((self._component, self._lines))
+                self._component, self._lines = None, []
+                return
+
+        if self._component is not None:
+            self._lines.append(line)
+
+
+def unescape(value: str) -> str:
+    """Undo TEXT escaping (backslash, semicolon, comma and newline)."""
+    if "\\" not in value:
+        return value
+    return ESCAPE_RE.sub(lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def split_content_line(line: str) -> tuple:
+    """Split a content line into (NAME, params, value)."""
+    colon = line.find(":")
+    if colon < 0:
+        raise UnsupportedEvent(f"Malformed line: {line[:40]!r}")
+    if '"' in line[:colon]:
+        # A quoted parameter value may itself contain ':'
+        quoted = False
+        for colon, char in enumerate(line):
+            if char == '"':
+                quoted = not quoted
+            elif char == ":" and not quoted:
+                break
+    head, value = line[:colon], line[colon + 1:]
+    semicolon = head.find(";")
+    if semicolon < 0:
+        return head.upper(), "", value
+    return head[:semicolon].upper(), head[semicolon + 1:], value
+
+
+def parse_datetime(value: str) -> datetime:
+    """
+    Parse a DATE or DATE-TIME value as wall-clock time. TZID and UTC markers
+    are not applied; we keep times as they appear in the calendar.
+    """
+    value = value.strip()
+    try:
+        if len(value) == 8:
+            return datetime(int(value[:4]), int(value[4:6]), int(value[6:8]))
+        if len(value) in (15, 16) and value[8] == "T":
+            return datetime(
+                int(value[:4]), int(value[4:6]), int(value[6:8]),
+                int(value[9:11]), int(value[11:13]), int(value[13:15]),
+            )
+    except ValueError:
+        pass
+    raise UnsupportedEvent(f"Unsupported date value: {value!r}")
+
+
+def parse_duration(value: str) -> timedelta:
+    match = DURATION_RE.match(value.strip())
+    if not match:
+        raise UnsupportedEvent(f"Unsupported duration: {value!r}")
+    weeks, days, hours, minutes, seconds = (int(g or 0) for g in match.groups())
+    return timedelta(weeks=weeks, days=days, hours=hours, minutes=minutes, seconds=seconds)
+
+
+def parse_event(lines: list) -> dict:
+    """Build the intermediate record for one VEVENT from its unfolded lines."""
+    begin = end = duration = None
+    summary = location = ""
+    rrules = []
+    exdates = set()
+    rdates = set()
+    depth = 0
+
+    for line in lines[1:-1]:
+        name, params, value = split_content_line(line)
+        # Skip nested components such as VALARM
+        if name == "BEGIN":
+            depth += 1
+            continue
+        if name == "END":
+            depth -= 1
+            continue
+        if depth:
+            continue
+
+        if name == "DTSTART":
+            begin = parse_datetime(value)
+        elif name == "DTEND":
+            end = parse_datetime(value)
+        elif name == "DURATION":
+            duration = parse_duration(value)
+        elif name == "SUMMARY":
+            summary = unescape(value)
+        elif name == "LOCATION":
+            location = unescape(value)
+        elif name == "RRULE":
+            rrules.append(value)
+        elif name == "EXDATE":
+            for part in value.split(","):
+                exdate = parse_ical_date(part)
+                if exdate:
+                    exdates.add(exdate)
+        elif name == "RDATE":
+            for part in value.split(","):
+                # PERIOD values are start/end or start/duration
+                rdate = parse_ical_date(part.split("/")[0])
+                if rdate:
+                    rdates.add(rdate)
+
+    if begin is None:
+        raise UnsupportedEvent("Event has no DTSTART")
+    if end is None:
+        end = begin + duration if duration is not None else begin
+
+    return {
+        "name": summary or "Untitled",
+        "original_location": location,
+        "cleaned_location": clean_location(location),
+        "start_date": begin.date(),
+        **recurrence_fields(rrules, begin.date()),
+        "exdates": sorted(exdates),
+        "rdates": sorted(rdates),
+        "start_time": begin.time(),
+        "end_time": end.time(),
+    }
+
+
+def parse_event_with_ics(lines: list, timezones: list) -> list:
+    """Fallback: wrap one VEVENT (and the calendar's timezones) for ics."""
+    text = "\r\n".join(
+        ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//routify//stream//EN"]
+        + [line for tz in timezones for line in tz]
+        + lines
+        + ["END:VCALENDAR"]
+    )
+    return [event_record(event) for event in Calendar(text).events]
+
+
+def event_records(components: list, timezones: list) -> list:
+    """
+    Turn completed components into event records.
+    VTIMEZONE lines are remembered in timezones for events that need ics.
+    """
+    records = []
+    for name, lines in components:
+        if name == "VTIMEZONE":
+            timezones.append(lines)
+            continue
+        try:
+            records.append(parse_event(lines))
+        except UnsupportedEvent as e:
+            logger.debug(f"Falling back to ics for event: {e}")
+            records.extend(parse_event_with_ics(lines, timezones))
+    return records
+
+
+def parse_calendar(text: str) -> list:
+    """Parse a whole calendar into event records."""
+    tokenizer = ComponentTokenizer()
+    components = tokenizer.feed(text) + tokenizer.close()
+    return event_records(components, [])
@@ -0,0 +1,236 @@
+"""
+Streaming ICS ingestion.
+
+Uploads are read in chunks, decoded incrementally and split into one
+calendar component at a time, so memory tracks the largest event rather
+than the whole file. First-pass geocodes start as soon as an event with a
+new location is parsed; the anchor pass and persistence still wait for
+the full set of locations, since they depend on all of them.
+
+Once the whole calendar is parsed its schedule is fingerprinted, so an
+upload identical to an earlier one can reuse that session's events and
+skip the remaining geocoding. store_upload does that lookup and the save
+for both the upload route and background jobs.
+"""
+import asyncio
+import codecs
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import NamedTuple, Optional
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import instrumentation
+from app.database import (
+    complete_session_async,
+    find_shared_session,
+    insert_session_with_events_async,
+    insert_shared_session,
+)
+from app.ics_parser import ComponentTokenizer, event_records
+from app.utils import (
+    GEOCODE_CONCURRENCY,
+    build_series,
+    expand_series,
+    geocode_concurrently,
+    geocode_limited,
+    refine_locations,
+)
+
+logger = logging.getLogger(__name__)
+
+ICS_CHUNK_SIZE = int(os.getenv("ICS_CHUNK_SIZE", str(64 * 1024)))  # bytes
+
+
+class UploadTooLarge(Exception):
+    """The upload passed the size limit while it was being read."""
+
+
+class NoEvents(Exception):
+    """The calendar parsed, but none of its events has an occurrence."""
+
+
+class StoredUpload(NamedTuple):
+    session_id: int
+    session_uuid: str
+    shared_from_id: Optional[int]  # session whose series are reused, or None
+    series: list  # series saved for this session; empty when shared
+
+
+async def read_chunks(file, max_size: int, chunk_size: int = ICS_CHUNK_SIZE):
+    """Yield an UploadFile's bytes in chunks, raising UploadTooLarge past max_size."""
+    total = 0
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            return
+        total += len(chunk)
+        if total > max_size:
+            raise UploadTooLarge(f"Upload exceeds {max_size} bytes")
+        yield chunk
+
+
+async def decode_chunks(chunks, encoding: str = "utf-8"):
+    """Decode a byte stream incrementally, so multi-byte characters may span chunks."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+# Bump when the parsed record layout changes, so old fingerprints stop matching
+FINGERPRINT_VERSION = "1"
+
+
+def schedule_fingerprint(event_data: list) -> str:
+    """
+    Hash of the parsed events, independent of their order in the file.
+    Only fields that end up in the stored series are included, so exports
+    that differ in DTSTAMP, UID or DESCRIPTION still match.
+    """
+    lines = sorted(json.dumps(record, sort_keys=True, default=str) for record in event_data)
+    digest = hashlib.blake2b(FINGERPRINT_VERSION.encode(), digest_size=20)
+    for line in lines:
+        digest.update(b"\n" + line.encode())
+    return digest.hexdigest()
+
+
+class ParsedUpload:
+    """A fully parsed calendar whose first-pass geocodes may still be running."""
+
+    def __init__(self, event_data: list, first_pass: dict, fingerprint: str):
+        self.event_data = event_data
+        self.first_pass = first_pass  # cleaned location -> geocode task
+        self.fingerprint = fingerprint
+
+    async def series(self, attempts: int = 1, backoff: float = 0.5) -> list:
+        """
+        Finish geocoding and return one record per event series.
+        First-pass geocodes that failed transiently are retried up to
+        attempts - 1 more times, with exponential backoff in seconds.
+        """
+        with instrumentation.stage("geocode", locations=len(self.first_pass)):
+            results = await asyncio.gather(*self.first_pass.values())
+        geocoded = dict(zip(self.first_pass, results))
+        for attempt in range(1, attempts):
+            failed = [loc for loc, result in geocoded.items() if result.get("transient")]
+            if not failed:
+                break
+            await asyncio.sleep(backoff * 2 ** (attempt - 1))
+            logger.debug(f"Retrying {len(failed)} geocodes (attempt {attempt + 1} of {attempts})")
+            instrumentation.geocode_retries.labels(reason="transient").inc(len(failed))
+            with instrumentation.stage("geocode_retry", attempt=attempt + 1):
+                geocoded.update(await geocode_concurrently(failed))
+        geocoded = await refine_locations(geocoded)
+        with instrumentation.stage("build_series"):
+            series = build_series(self.event_data, geocoded)
+        instrumentation.record_counts(events=len(self.event_data), locations=len(self.first_pass), series=len(series))
+        return series
+
+    def cancel(self):
+        """Abandon geocoding, e.g. when an identical schedule already exists."""
+        for task in self.first_pass.values():
+            task.cancel()
+
+
+async def read_ics_stream(chunks) -> ParsedUpload:
+    """
+    Parse an ICS byte stream, starting a geocode for each new location as it appears.
+    Each batch of components is parsed in a worker thread as it arrives.
+    """
+    tokenizer = ComponentTokenizer()
+    timezones = []
+    event_data = []
+    first_pass = {}  # cleaned location -> geocode task
+    semaphore = asyncio.Semaphore(GEOCODE_CONCURRENCY)
+    parse_seconds = 0.0  # Parsing is interleaved with reading, so it is summed per batch
+
+    async def ingest(components: list):
+        nonlocal parse_seconds
+        if not components:
+            return
+        started = time.perf_counter()
+        records = await asyncio.to_thread(event_records, components, timezones)
+        parse_seconds += time.perf_counter() - started
+        for record in records:
+            location = record["cleaned_location"]
+            if location and location not in first_pass:
+                first_pass[location] = asyncio.create_task(geocode_limited(location, None, semaphore))
+        event_data.extend(records)
+
+    try:
+        with instrumentation.stage("read"):
+            async for text in decode_chunks(chunks):
+                await ingest(tokenizer.feed(text))
+            await ingest(tokenizer.close())
+        instrumentation.observe_stage("parse", parse_seconds)
+        with instrumentation.stage("fingerprint"):
+            fingerprint = await asyncio.to_thread(schedule_fingerprint, event_data)
+    except BaseException:
+        for task in first_pass.values():
+            task.cancel()
+        raise
+
+    logger.debug(f"Streamed {len(event_data)} events with {len(first_pass)} unique locations")
+    return ParsedUpload(event_data, first_pass, fingerprint)
+
+
+async def parse_ics_stream(chunks) -> list:
+    """Parse and geocode an ICS byte stream, returning one record per event series."""
+    upload = await read_ics_stream(chunks)
+    return await upload.series()
+
+
+async def store_upload(
+    db: AsyncSession,
+    upload: ParsedUpload,
+    pending_id: int = None,
+    attempts: int = 1,
+    backoff: float = 0.5,
+    on_saving=None,
+) -> StoredUpload:
+    """
+    Save an upload as a session, reusing an identical earlier session's series if there is one.
+    Fills the pending session pending_id when given, otherwise inserts a new one. Geocodes
+    still running are cancelled if saving fails. Raises NoEvents if nothing ever occurs.
+    """
+    try:
+        # Students in one section upload the same export; reuse the first copy's events
+        with instrumentation.stage("db_lookup"):
+            owner_id = await find_shared_session(db, upload.fingerprint)
+        if owner_id:
+            upload.cancel()
+            with instrumentation.stage("db_insert", shared=True):
+                if pending_id is None:
+                    session_id, session_uuid = await insert_shared_session(db, owner_id, upload.fingerprint)
+                else:
+                    session_id, session_uuid = await complete_session_async(
+                        db, pending_id, upload.fingerprint, shared_from_id=owner_id
+                    )
+            return StoredUpload(session_id, session_uuid, owner_id, [])
+
+        # End the lookup's transaction, returning its connection to the pool while geocoding finishes
+        await db.rollback()
+
+        series = await upload.series(attempts=attempts, backoff=backoff)
+        if not any(next(expand_series(s), None) for s in series):
+            raise NoEvents("No events found in file")
+
+        if on_saving:
+            on_saving()
+        with instrumentation.stage("db_insert", series=len(series)):
+            if pending_id is None:
+                session_id, session_uuid = await insert_session_with_events_async(db, series, upload.fingerprint)
+            else:
+                session_id, session_uuid = await complete_session_async(db, pending_id, upload.fingerprint, series)
+        return StoredUpload(session_id, session_uuid, None, series)
+    finally:
+        # A no-op once series() has finished
+        upload.cancel()
@@ -0,0 +1,82 @@
+"""
+Per-stage timing and counts for the upload pipeline.
+
+Each stage of an upload (reading and parsing the file, the first geocode
+pass, transient retries, anchor refinement, building series, expansion
+and the database phases) is observed in one Prometheus histogram labelled
+by stage. Stages do not overlap, except that "read" covers streaming the
+upload and includes the "parse" time spent on it.
+
+With OTEL_TRACING=true and opentelemetry-api installed, each stage is also
+an OpenTelemetry span, exported by whatever tracer provider the deployment
+configures (e.g. opentelemetry-instrument).
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+from prometheus_client import Counter, Histogram
+
+try:
+    from opentelemetry import trace
+except ImportError:  # Tracing is optional
+    trace = None
+
+logger = logging.getLogger(__name__)
+
+OTEL_TRACING = os.getenv("OTEL_TRACING", "false").lower() == "true"
+
+# Seconds; parsing is milliseconds, geocoding waits on Google
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+stage_seconds = Histogram(
+    "routify_upload_stage_seconds",
+    "Time spent in each stage of processing an upload",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+upload_items = Histogram(
+    "routify_upload_items",
+    "Per-upload counts of events parsed, unique locations, series stored and occurrences emitted",
+    ["kind"],
+    buckets=COUNT_BUCKETS,
+)
+geocode_lookups = Counter(
+    "routify_geocode_lookups",
+    "Geocode lookups by where the answer came from (gazetteer, cache, google or error)",
+    ["source"],
+)
+geocode_retries = Counter(
+    "routify_geocode_retries",
+    "Geocodes repeated after a transient failure or biased toward the anchor",
+    ["reason"],
+)
+
+tracer = trace.get_tracer(__name__) if trace and OTEL_TRACING else None
+if OTEL_TRACING and trace is None:
+    logger.warning("OTEL_TRACING is set but opentelemetry-api is not installed; spans are disabled")
+
+
+@contextmanager
+def stage(name: str, **attributes):
+    """Time a block as one pipeline stage, and trace it as a span when tracing is on."""
+    span = tracer.start_as_current_span(f"upload.{name}", attributes=attributes) if tracer else nullcontext()
+    started = time.perf_counter()
+    try:
+        with span:
+            yield
+    finally:
+        stage_seconds.labels(stage=name).observe(time.perf_counter() - started)
+
+
+def observe_stage(name: str, seconds: float):
+    """Record a stage whose time was accumulated across several blocks."""
+    stage_seconds.labels(stage=name).observe(seconds)
+
+
+def record_counts(**counts: int):
+    """Record per-upload counts, e.g. record_counts(events=40, locations=12)."""
+    for kind, value in counts.items():
+        upload_items.labels(kind=kind).observe(value)
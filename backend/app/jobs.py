@@ -0,0 +1,196 @@
+"""
+Background processing of calendar uploads.
+
+Clients that send "Prefer: respond-async" get a pending session back as
+soon as the file is read; a pool of worker tasks in this process runs the
+parse, geocode and save pipeline and records progress. The queue is
+bounded so a burst of uploads is turned away with a 503 instead of piling
+up. Progress is kept in memory for the status endpoint and SSE stream;
+the session row's status column is the fallback for other workers.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import NamedTuple
+
+from app import database
+from app.database import set_session_status
+from app.ics_stream import NoEvents, read_ics_stream, store_upload
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # 0 disables background processing
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "50"))
+JOB_RETRY_ATTEMPTS = int(os.getenv("JOB_RETRY_ATTEMPTS", "3"))  # geocode tries per location
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "1"))  # seconds, doubled per retry
+JOB_RETRY_AFTER = int(os.getenv("JOB_RETRY_AFTER", "5"))  # seconds, sent with 503s
+JOB_DRAIN_TIMEOUT = float(os.getenv("JOB_DRAIN_TIMEOUT", "10"))  # seconds to finish jobs on shutdown
+JOB_PROGRESS_TTL = float(os.getenv("JOB_PROGRESS_TTL", "600"))  # seconds finished jobs stay visible
+
+
+class Job(NamedTuple):
+    session_id: int
+    data: bytes
+
+
+class JobFailed(Exception):
+    """A job failed for a reason worth showing to the client."""
+
+
+class JobQueue:
+    """Bounded asyncio.Queue drained by a fixed pool of worker tasks."""
+
+    def __init__(self, handler, workers: int = JOB_WORKERS, max_depth: int = JOB_QUEUE_SIZE):
+        self.handler = handler
+        self.workers = workers
+        self.queue = asyncio.Queue(maxsize=max_depth)
+        self.progress = {}  # session id -> progress dict
+        self._changed = asyncio.Event()
+        self._tasks = []
+        self._running = set()
+
+    async def start(self):
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = JOB_DRAIN_TIMEOUT) -> list:
+        """Let queued jobs finish for up to timeout seconds. Returns ids of jobs left unfinished."""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        unfinished = list(self._running)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        while not self.queue.empty():
+            unfinished.append(self.queue.get_nowait().session_id)
+        return unfinished
+
+    def full(self) -> bool:
+        return self.queue.full()
+
+    def submit(self, job: Job):
+        """Queue a job, raising asyncio.QueueFull when the queue is at capacity."""
+        self._forget_finished()
+        self.queue.put_nowait(job)
+        self.progress[job.session_id] = {"status": "pending", "stage": "queued", "error": None}
+        self._notify()
+
+    def update(self, session_id: int, **fields):
+        state = self.progress.get(session_id)
+        if state is None:
+            return
+        state.update(fields)
+        if state["status"] != "pending":
+            state["finished_at"] = time.monotonic()
+        self._notify()
+
+    def status(self, session_id: int):
+        """A job's progress, or None if this process is not tracking it."""
+        state = self.progress.get(session_id)
+        if state is None:
+            return None
+        return {k: v for k, v in state.items() if k != "finished_at"}
+
+    async def watch(self, session_id: int):
+        """Yield a job's progress each time it changes, ending once it is ready or failed."""
+        while True:
+            changed = self._changed
+            state = self.status(session_id)
+            if state is None:
+                return
+            yield state
+            if state["status"] != "pending":
+                return
+            await changed.wait()
+
+    def _notify(self):
+        # Wake every watcher; each one checks whether its own job changed
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def _forget_finished(self):
+        cutoff = time.monotonic() - JOB_PROGRESS_TTL
+        for session_id in [i for i, s in self.progress.items() if s.get("finished_at", cutoff + 1) < cutoff]:
+            del self.progress[session_id]
+
+    async def _work(self):
+        while True:
+            job = await self.queue.get()
+            self._running.add(job.session_id)
+            try:
+                await self.handler(job, lambda **fields: self.update(job.session_id, **fields))
+            except JobFailed as e:
+                await self._fail(job.session_id, str(e))
+            except Exception:
+                logger.exception(f"Job for session {job.session_id} failed")
+                await self._fail(job.session_id, "Failed to parse calendar file")
+            finally:
+                self._running.discard(job.session_id)
+                self.queue.task_done()
+
+    async def _fail(self, session_id: int, error: str):
+        self.update(session_id, status="failed", stage="done", error=error)
+        try:
+            async with database.async_session() as db:
+                await set_session_status(db, [session_id], "failed")
+        except Exception:
+            logger.exception(f"Could not mark session {session_id} failed")
+
+
+async def _one_chunk(data: bytes):
+    yield data
+
+
+async def process_upload(job: Job, update):
+    """Run the upload pipeline for a pending session."""
+    update(stage="parsing")
+    try:
+        upload = await read_ics_stream(_one_chunk(job.data))
+    except UnicodeDecodeError:
+        raise JobFailed("File encoding not supported")
+    except ValueError:
+        raise JobFailed("Invalid calendar format")
+
+    update(stage="geocoding", events=len(upload.event_data), locations=len(upload.first_pass))
+    try:
+        async with database.async_session() as db:
+            await store_upload(
+                db, upload, job.session_id,
+                attempts=JOB_RETRY_ATTEMPTS, backoff=JOB_RETRY_BACKOFF,
+                on_saving=lambda: update(stage="saving"),
+            )
+    except NoEvents as e:
+        raise JobFailed(str(e))
+    update(status="ready", stage="done")
+
+
+_queue: JobQueue = None
+
+
+async def start():
+    """Start the worker pool. Called from the FastAPI lifespan."""
+    global _queue
+    if JOB_WORKERS > 0:
+        _queue = JobQueue(process_upload)
+        await _queue.start()
+        logger.info(f"Started {JOB_WORKERS} upload workers (queue depth {JOB_QUEUE_SIZE})")
+
+
+async def close():
+    """Drain and stop the worker pool, marking jobs that did not finish as failed."""
+    global _queue
+    if _queue is None:
+        return
+    unfinished = await _queue.stop()
+    _queue = None
+    if unfinished:
+        logger.warning(f"Stopping with {len(unfinished)} unfinished upload jobs")
+        async with database.async_session() as db:
+            await set_session_status(db, unfinished, "failed")
+
+
+def get_queue() -> JobQueue:
+    """The running job queue, or None when background processing is off."""
+    return _queue
@@ -0,0 +1,81 @@
+"""
+Location name normalization.
+
+All abbreviations are compiled into one case-insensitive alternation and
+expanded in a single pass through a lookup table, and results are
+memoized since schedules repeat the same handful of buildings.
+"""
+import re
+from functools import lru_cache
+
+# Common abbreviations in building/location names, matched as whole words in any case
+LOCATION_ABBREVIATIONS = {
+    'Bldg': 'Building',
+    'Blg': 'Building',
+    'Eng': 'Engineering',
+    'Engr': 'Engineering',
+    'Mech': 'Mechanical',
+    'Elec': 'Electrical',
+    'Chem': 'Chemistry',
+    'Phys': 'Physics',
+    'Bio': 'Biology',
+    'Sci': 'Science',
+    'Lab': 'Laboratory',
+    'Ctr': 'Center',
+    'Cntr': 'Center',
+    'Lib': 'Library',
+    'Aud': 'Auditorium',
+    'Rm': 'Room',
+    'St': 'Street',
+    'Ave': 'Avenue',
+    'Dr': 'Drive',
+    'Univ': 'University',
+    'Admin': 'Administration',
+    'Comm': 'Communication',
+    'Comp': 'Computer',
+    'Info': 'Information',
+    'Tech': 'Technology',
+    'Mgmt': 'Management',
+    'Bus': 'Business',
+    'Ed': 'Education',
+    'Med': 'Medical',
+    'Hlth': 'Health',
+    'Arts': 'Arts',
+    'Soc': 'Social',
+    'Psych': 'Psychology',
+    'Math': 'Mathematics',
+    'Stat': 'Statistics',
+    'Econ': 'Economics',
+    'Hum': 'Humanities',
+    'Res': 'Research',
+    'Dev': 'Development',
+    'Svcs': 'Services',
+    'Svc': 'Service',
+}
+
+# Longest first so a shorter abbreviation never shadows a longer one
+ABBREVIATION_RE = re.compile(
+    r"\b(?:" + "|".join(re.escape(a) for a in sorted(LOCATION_ABBREVIATIONS, key=len, reverse=True)) + r")\b",
+    re.IGNORECASE,
+)
+_EXPANSIONS = {abbrev.lower(): full for abbrev, full in LOCATION_ABBREVIATIONS.items()}
+
+
+def _expand_match(match: re.Match) -> str:
+    return _EXPANSIONS[match.group(0).lower()]
+
+
+@lru_cache(maxsize=8192)
+def expand_abbreviations(text: str) -> str:
+    """Expand common abbreviations in location names."""
+    return ABBREVIATION_RE.sub(_expand_match, text)
+
+
+@lru_cache(maxsize=8192)
+def location_key(text: str) -> str:
+    """
+    Canonical form of a location for cache lookups: abbreviations expanded,
+    lowercased and whitespace collapsed, so "Mech Engr  Bldg" and
+    "mechanical engineering building" share a key.
+    """
+    return " ".join(expand_abbreviations(text).lower().split())
@@ -1,11 +1,27 @@
 import os
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from app import database, http_client, jobs, metrics
 from app.database import init_db
 from app.api import routes
+from app.middleware.metrics import MetricsMiddleware
 from app.middleware.rate_limit import RateLimitMiddleware
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await http_client.start()
+    await jobs.start()
+    await metrics.start()
+    yield
+    await metrics.close()
+    await jobs.close()
+    await http_client.close()
+    await database.async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Rate limiting middleware (before CORS)
 app.add_middleware(
@@ -34,6 +50,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so latency includes the other middleware and rate-limited requests are counted
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(routes.router, prefix="/api")
 
 # Health check endpoint (excluded from rate limiting)
@@ -41,5 +60,19 @@ app.include_router(routes.router, prefix="/api")
 async def health_check():
     return {"status": "healthy"}
 
+
+# Probe endpoint (excluded from rate limiting)
+@app.get("/health/pools", include_in_schema=False)
+async def pool_health():
+    """Connection pool usage, for spotting saturation under load."""
+    return {"http": http_client.pool_stats(), "database": database.pool_stats(database.async_engine.sync_engine)}
+
+
+# Prometheus scrape endpoint (excluded from rate limiting)
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
 if os.getenv("TESTING") != "true":
     init_db()
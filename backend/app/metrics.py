@@ -0,0 +1,181 @@
+"""
+Prometheus metrics for the /metrics endpoint.
+
+Request latency per route, rate-limit rejections per window and Google
+call counts and latency are recorded as they happen. Database pool usage
+and cache hit ratios live in their own objects, so they are copied into
+gauges by refresh(): on every scrape and, when several workers share
+PROMETHEUS_MULTIPROC_DIR, every METRICS_REFRESH_SECONDS in each worker.
+
+With PROMETHEUS_MULTIPROC_DIR set (before any worker starts, and emptied
+between runs), every worker writes its samples there and a scrape of any
+one worker aggregates them all: counters and histograms are summed, pool
+and cache gauges are summed over live workers, and per-worker values
+such as hit ratios carry a pid label.
+"""
+import asyncio
+import logging
+import os
+
+import googlemaps
+import httpx
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+METRICS_REFRESH_SECONDS = float(os.getenv("METRICS_REFRESH_SECONDS", "10"))
+
+# Seconds; covers cached reads (sub-millisecond) up to uploads waiting on Google
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+http_requests = Histogram(
+    "routify_http_request_duration_seconds",
+    "Time to respond to a request, by route template, method and status",
+    ["route", "method", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+rate_limit_rejections = Counter(
+    "routify_rate_limit_rejections",
+    "Requests rejected by RateLimitMiddleware, by the window that was exceeded",
+    ["window"],
+)
+google_requests = Counter(
+    "routify_google_requests",
+    "Calls to Google Maps APIs by API and response status (OK, ZERO_RESULTS, an error status, TIMEOUT or ERROR)",
+    ["api", "status"],
+)
+google_request_seconds = Histogram(
+    "routify_google_request_duration_seconds",
+    "Time taken by calls to Google Maps APIs",
+    ["api"],
+    buckets=LATENCY_BUCKETS,
+)
+
+db_pool_connections = Gauge(
+    "routify_db_pool_connections",
+    "Database pool connections by state (checked_out, checked_in, overflow, capacity)",
+    ["engine", "state"],
+    multiprocess_mode="livesum",
+)
+db_pool_checkouts = Gauge(
+    "routify_db_pool_checkouts",
+    "Connection checkouts and pool timeouts since the worker started",
+    ["engine", "result"],
+    multiprocess_mode="livesum",
+)
+db_pool_wait_max = Gauge(
+    "routify_db_pool_wait_max_seconds",
+    "Longest wait for a pooled connection since the worker started",
+    ["engine"],
+    multiprocess_mode="livemax",
+)
+cache_lookups = Gauge(
+    "routify_cache_lookups",
+    "Cache lookups since the worker started, by cache and result (hit or miss)",
+    ["cache", "result"],
+    multiprocess_mode="livesum",
+)
+cache_hit_ratio = Gauge(
+    "routify_cache_hit_ratio",
+    "Share of lookups answered by each cache since the worker started",
+    ["cache"],
+    multiprocess_mode="liveall",
+)
+
+
+def google_status(error: Exception) -> str:
+    """Status label for a failed Google call."""
+    if isinstance(error, googlemaps.exceptions.ApiError):
+        return error.status
+    if isinstance(error, (googlemaps.exceptions.Timeout, httpx.TimeoutException, asyncio.TimeoutError)):
+        return "TIMEOUT"
+    return "ERROR"
+
+
+def observe_google(api: str, status: str, seconds: float):
+    google_requests.labels(api=api, status=status).inc()
+    google_request_seconds.labels(api=api).observe(seconds)
+
+
+def _refresh_pool(name: str, stats: dict):
+    if "size" not in stats:
+        return  # Not a queue pool (e.g. in-memory SQLite)
+    for state in ("checked_out", "checked_in", "overflow"):
+        db_pool_connections.labels(engine=name, state=state).set(stats[state])
+    db_pool_connections.labels(engine=name, state="capacity").set(stats["size"] + stats["max_overflow"])
+    if "checkouts" in stats:
+        db_pool_checkouts.labels(engine=name, result="checkout").set(stats["checkouts"])
+        db_pool_checkouts.labels(engine=name, result="timeout").set(stats["timeouts"])
+        db_pool_wait_max.labels(engine=name).set(stats["wait_max_ms"] / 1000)
+
+
+def _refresh_cache(name: str, hits: int, misses: int, hit_ratio: float):
+    cache_lookups.labels(cache=name, result="hit").set(hits)
+    cache_lookups.labels(cache=name, result="miss").set(misses)
+    cache_hit_ratio.labels(cache=name).set(hit_ratio)
+
+
+def refresh():
+    """Copy pool and cache statistics from this worker into their gauges."""
+    # Imported here to avoid a cycle: gazetteer imports utils, which imports this module
+    from app import database, distance_cache, gazetteer, geocode_cache, response_cache
+
+    _refresh_pool("async", database.pool_stats(database.async_engine.sync_engine))
+    _refresh_pool("sync", database.pool_stats(database.engine))
+
+    for name, module in (("geocode", geocode_cache), ("response", response_cache), ("distance", distance_cache)):
+        stats = module.cache.stats()
+        _refresh_cache(name, stats["hits"], stats["misses"], stats["hit_ratio"])
+    stats = gazetteer.index.stats()
+    hits = stats["exact_hits"] + stats["fuzzy_hits"]
+    _refresh_cache("gazetteer", hits, stats["misses"] + stats["unresolved"], stats["hit_ratio"])
+
+
+def render() -> tuple:
+    """The exposition body and its content type, aggregated over workers in multiprocess mode."""
+    refresh()
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+async def _refresh_periodically():
+    while True:
+        await asyncio.sleep(METRICS_REFRESH_SECONDS)
+        try:
+            refresh()
+        except Exception:
+            logger.exception("Could not refresh metrics")
+
+
+_refresher: asyncio.Task = None
+
+
+async def start():
+    """In multiprocess mode, keep this worker's gauges fresh for scrapes served by other workers."""
+    global _refresher
+    if PROMETHEUS_MULTIPROC_DIR and _refresher is None:
+        _refresher = asyncio.create_task(_refresh_periodically())
+
+
+async def close():
+    """Stop refreshing and drop this worker's live gauges from the aggregate."""
+    global _refresher
+    if _refresher is not None:
+        _refresher.cancel()
+        _refresher = None
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,121 @@
+"""
+Fixed-memory sliding-window rate limiting engine and its in-process backend.
+
+Each client keeps two counters per window (current and previous bucket), and
+the sliding count is approximated as
+    previous * (1 - elapsed fraction of current bucket) + current
+so every check is O(1) and memory per client is constant regardless of
+traffic. Clients are spread across lock-striped shards by key hash so
+unrelated clients never wait on each other.
+"""
+import threading
+import time
+from typing import NamedTuple
+
+
+class RateLimit(NamedTuple):
+    name: str
+    limit: int
+    window_seconds: int
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    # Window that rejected the request (None when allowed)
+    window: RateLimit = None
+    # Remaining requests in each window after this request, by window name
+    remaining: dict = None
+
+
+def advance_and_check(limits: list, state: list, now: float) -> RateLimitResult:
+    """
+    Roll a client's counters forward to now and record the request if every
+    window allows it. state holds [bucket, current, previous] per limit and
+    is updated in place; callers must hold whatever lock guards it.
+    """
+    estimates = []
+    for i, limit in enumerate(limits):
+        offset = 3 * i
+        bucket = int(now // limit.window_seconds)
+        if state[offset] != bucket:
+            # Roll forward; anything older than one bucket counts as zero
+            state[offset + 2] = state[offset + 1] if state[offset] == bucket - 1 else 0
+            state[offset + 1] = 0
+            state[offset] = bucket
+
+        elapsed = (now % limit.window_seconds) / limit.window_seconds
+        estimate = state[offset + 2] * (1 - elapsed) + state[offset + 1]
+        if estimate >= limit.limit:
+            return RateLimitResult(False, limit)
+        estimates.append(estimate)
+
+    for i in range(len(limits)):
+        state[3 * i + 1] += 1
+
+    return RateLimitResult(True, None, {
+        limit.name: max(0, int(limit.limit - estimate - 1))
+        for limit, estimate in zip(limits, estimates)
+    })
+
+
+class LimiterStorage:
+    """
+    Where rate-limit counters live.
+    Backends implement check() as one atomic check-and-increment.
+    """
+
+    def __init__(self, limits: list):
+        self.limits = [RateLimit(*limit) for limit in limits]
+
+    async def check(self, key: str, now: float = None) -> RateLimitResult:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class SlidingWindowLimiter(LimiterStorage):
+    """In-process backend: per-worker dicts of counters, lock-striped by key hash."""
+
+    def __init__(self, limits: list, shards: int = 16, cleanup_interval: int = 300):
+        super().__init__(limits)
+        self.cleanup_interval = cleanup_interval
+        # Index of the longest window; a client is stale once that window has aged out
+        self._longest = max(range(len(self.limits)), key=lambda i: self.limits[i].window_seconds)
+        # Each shard: (lock, {key: [bucket, current, previous] * len(limits)}, last_cleanup)
+        self._shards = [[threading.Lock(), {}, time.time()] for _ in range(shards)]
+
+    def _shard(self, key: str):
+        return self._shards[hash(key) % len(self._shards)]
+
+    def hit(self, key: str, now: float = None) -> RateLimitResult:
+        """Record a request for key if every window allows it."""
+        now = time.time() if now is None else now
+        shard = self._shard(key)
+        lock, states, last_cleanup = shard
+
+        with lock:
+            if now - last_cleanup > self.cleanup_interval:
+                self._cleanup(states, now)
+                shard[2] = now
+
+            state = states.get(key)
+            if state is None:
+                state = [0] * (3 * len(self.limits))
+                states[key] = state
+
+            return advance_and_check(self.limits, state, now)
+
+    async def check(self, key: str, now: float = None) -> RateLimitResult:
+        return self.hit(key, now)
+
+    def _cleanup(self, states: dict, now: float):
+        """Drop clients whose counters have all aged out. Caller holds the shard lock."""
+        window = self.limits[self._longest].window_seconds
+        oldest_live = int(now // window) - 1
+        stale = [key for key, state in states.items() if state[3 * self._longest] < oldest_live]
+        for key in stale:
+            del states[key]
+
+    def __len__(self):
+        return sum(len(states) for _, states, _ in self._shards)
@@ -0,0 +1,357 @@
+"""
+Rate-limit counter backends shared between workers.
+
+- memory: per-process counters (SlidingWindowLimiter); each worker limits on its own
+- shm: counters in a memory-mapped file, shared by every worker on one host
+- redis: counters in Redis (or anything speaking its protocol), shared across hosts
+
+Without RATE_LIMIT_BACKEND, a process that is one of several workers uses shm,
+since per-worker counters would let each worker allow the full limit.
+
+Every backend does the check and the increment in one atomic step: a striped
+file lock around an in-place update for shm, a single Lua script round trip
+for redis.
+"""
+import asyncio
+import hashlib
+import logging
+import mmap
+import multiprocessing
+import os
+import struct
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+from app.middleware.limiter import (
+    LimiterStorage,
+    RateLimitResult,
+    SlidingWindowLimiter,
+    advance_and_check,
+)
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND")  # unset: see default_backend()
+RATE_LIMIT_SHM_PATH = os.getenv("RATE_LIMIT_SHM_PATH")
+RATE_LIMIT_SHM_SLOTS = int(os.getenv("RATE_LIMIT_SHM_SLOTS", "65536"))
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_REDIS_TIMEOUT = float(os.getenv("RATE_LIMIT_REDIS_TIMEOUT", "0.5"))  # seconds
+# Connections per worker; checks beyond this wait for a free one
+RATE_LIMIT_REDIS_POOL_SIZE = int(os.getenv("RATE_LIMIT_REDIS_POOL_SIZE", "4"))
+# After a Redis failure, requests are allowed without trying Redis for this long
+RATE_LIMIT_REDIS_RETRY = float(os.getenv("RATE_LIMIT_REDIS_RETRY", "5"))  # seconds
+
+
+def default_backend() -> str:
+    """shm when this process is one of several workers on a POSIX host, memory otherwise."""
+    # uvicorn --workers spawns each worker through multiprocessing; WEB_CONCURRENCY
+    # is the worker count uvicorn and gunicorn read when --workers is not given
+    several = int(os.getenv("WEB_CONCURRENCY", "1")) > 1 or multiprocessing.parent_process() is not None
+    return "shm" if several and os.name == "posix" else "memory"
+
+
+def _default_shm_path() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "routify-ratelimit")
+
+
+class SharedMemoryStorage(LimiterStorage):
+    """
+    Counters in a fixed-size table of slots in a memory-mapped file.
+
+    Slots are grouped into stripes, each guarded by a byte-range lock on a
+    sidecar .lock file (and a thread lock within the process). A key hashes
+    to one stripe and probes a few slots inside it; when none is free the
+    stalest probed slot is reused, so memory never grows.
+    """
+
+    PROBES = 8
+
+    def __init__(self, limits: list, path: str = None, slots: int = RATE_LIMIT_SHM_SLOTS, stripes: int = 64):
+        super().__init__(limits)
+        self.path = path or RATE_LIMIT_SHM_PATH or _default_shm_path()
+        self.stripes = stripes
+        self.slots_per_stripe = max(self.PROBES, slots // stripes)
+        # Key hash, then (bucket, current, previous) per window
+        self._slot = struct.Struct("<Q" + "qii" * len(self.limits))
+        self._longest = max(range(len(self.limits)), key=lambda i: self.limits[i].window_seconds)
+
+        size = self._slot.size * self.slots_per_stripe * stripes
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        import fcntl  # POSIX only, so imported here rather than for every backend
+
+        self._fcntl = fcntl
+        self._lock_fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        self._thread_locks = [threading.Lock() for _ in range(stripes)]
+
+    def _hash(self, key: str) -> int:
+        # 0 marks an empty slot
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+    def hit(self, key: str, now: float = None) -> RateLimitResult:
+        """Record a request for key if every window allows it."""
+        now = time.time() if now is None else now
+        key_hash = self._hash(key)
+        stripe = key_hash % self.stripes
+        base = stripe * self.slots_per_stripe
+        start = (key_hash // self.stripes) % self.slots_per_stripe
+
+        with self._thread_locks[stripe]:
+            self._fcntl.lockf(self._lock_fd, self._fcntl.LOCK_EX, 1, stripe)
+            try:
+                offset = self._find_slot(key_hash, base, start, now)
+                values = self._slot.unpack_from(self._map, offset)
+                state = list(values[1:]) if values[0] == key_hash else [0] * (3 * len(self.limits))
+                result = advance_and_check(self.limits, state, now)
+                self._slot.pack_into(self._map, offset, key_hash, *state)
+                return result
+            finally:
+                self._fcntl.lockf(self._lock_fd, self._fcntl.LOCK_UN, 1, stripe)
+
+    async def check(self, key: str, now: float = None) -> RateLimitResult:
+        return self.hit(key, now)
+
+    def _find_slot(self, key_hash: int, base: int, start: int, now: float) -> int:
+        """Offset of key_hash's slot, else a free slot, else the stalest probed one."""
+        longest = self.limits[self._longest].window_seconds
+        oldest_live = int(now // longest) - 1
+        bucket_index = 1 + 3 * self._longest
+
+        victim, victim_bucket = None, None
+        for probe in range(self.PROBES):
+            offset = (base + (start + probe) % self.slots_per_stripe) * self._slot.size
+            values = self._slot.unpack_from(self._map, offset)
+            if values[0] == key_hash:
+                return offset
+            bucket = -1 if values[0] == 0 or values[bucket_index] < oldest_live else values[bucket_index]
+            if victim is None or bucket < victim_bucket:
+                victim, victim_bucket = offset, bucket
+        return victim
+
+    async def close(self):
+        self._map.close()
+        os.close(self._lock_fd)
+
+
+class RedisError(Exception):
+    """Error reply from the Redis server."""
+
+
+# Checks every window and, only if all allow the request, counts it in each.
+# KEYS: current bucket per window, then previous bucket per window.
+# ARGV: limit, elapsed fraction of the current bucket and TTL, per window.
+# Returns {1, remaining...} when allowed, {0, window} when rejected.
+CHECK_SCRIPT = """
+local n = #KEYS / 2
+local result = {1}
+for i = 1, n do
+    local current = tonumber(redis.call("GET", KEYS[i]) or "0")
+    local previous = tonumber(redis.call("GET", KEYS[n + i]) or "0")
+    local limit = tonumber(ARGV[3 * i - 2])
+    local estimate = previous * (1 - tonumber(ARGV[3 * i - 1])) + current
+    if estimate >= limit then
+        return {0, i}
+    end
+    result[i + 1] = math.max(0, math.floor(limit - estimate - 1))
+end
+for i = 1, n do
+    redis.call("INCR", KEYS[i])
+    redis.call("EXPIRE", KEYS[i], ARGV[3 * i])
+end
+return result
+"""
+CHECK_SCRIPT_SHA = hashlib.sha1(CHECK_SCRIPT.encode()).hexdigest()
+
+
+class RedisConnection:
+    """One connection to Redis, used by one check at a time."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+
+    async def execute(self, commands: list) -> list:
+        """Send commands as one pipeline and read one reply per command."""
+        payload = bytearray()
+        for command in commands:
+            payload += b"*%d\r\n" % len(command)
+            for arg in command:
+                arg = str(arg).encode()
+                payload += b"$%d\r\n%s\r\n" % (len(arg), arg)
+        self._writer.write(payload)
+        await self._writer.drain()
+        return [await self._read_reply() for _ in commands]
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis closed the connection")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            return RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            length = int(rest)
+            if length < 0:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise ConnectionError(f"Unexpected Redis reply: {line!r}")
+
+    def close(self):
+        try:
+            self._writer.close()
+        except RuntimeError:
+            pass  # Its event loop is already closed
+
+
+class RedisStorage(LimiterStorage):
+    """
+    Counters in Redis as one key per window bucket: rl:<window>:<client>:<bucket>.
+
+    Each check is one EVALSHA of CHECK_SCRIPT, which reads every window and
+    counts the request only if all of them allow it, atomically and in a
+    single round trip. Checks run concurrently over a pool of up to
+    pool_size connections. If Redis is unreachable, requests are allowed.
+    """
+
+    def __init__(
+        self,
+        limits: list,
+        url: str = RATE_LIMIT_REDIS_URL,
+        timeout: float = RATE_LIMIT_REDIS_TIMEOUT,
+        pool_size: int = RATE_LIMIT_REDIS_POOL_SIZE,
+    ):
+        super().__init__(limits)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self.pool_size = pool_size
+
+        self._idle: list = []
+        self._slots: asyncio.Semaphore = None
+        self._loop = None
+        self._retry_at = 0.0
+
+    async def _connect(self) -> RedisConnection:
+        connection = RedisConnection(*await asyncio.open_connection(self.host, self.port))
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        setup.append(("SCRIPT", "LOAD", CHECK_SCRIPT))
+        try:
+            for reply in await connection.execute(setup):
+                if isinstance(reply, RedisError):
+                    raise reply
+        except BaseException:
+            connection.close()
+            raise
+        return connection
+
+    async def _acquire(self) -> RedisConnection:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Streams and semaphores belong to one event loop; start a fresh pool if it changed
+            self._close_idle()
+            self._loop, self._slots = loop, asyncio.Semaphore(self.pool_size)
+        await self._slots.acquire()
+        if self._idle:
+            return self._idle.pop()
+        try:
+            return await self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, connection: RedisConnection, reusable: bool):
+        if reusable:
+            self._idle.append(connection)
+        else:
+            connection.close()  # Its replies may be out of step after an error or cancellation
+        self._slots.release()
+
+    def _close_idle(self):
+        for connection in self._idle:
+            connection.close()
+        self._idle.clear()
+
+    def script_args(self, key: str, now: float) -> tuple:
+        """KEYS and ARGV for CHECK_SCRIPT."""
+        current, previous, args = [], [], []
+        for limit in self.limits:
+            bucket = int(now // limit.window_seconds)
+            current.append(f"rl:{limit.name}:{key}:{bucket}")
+            previous.append(f"rl:{limit.name}:{key}:{bucket - 1}")
+            args.extend((limit.limit, (now % limit.window_seconds) / limit.window_seconds, 2 * limit.window_seconds))
+        return current + previous, args
+
+    async def check(self, key: str, now: float = None) -> RateLimitResult:
+        now = time.time() if now is None else now
+        if time.monotonic() < self._retry_at:
+            return self._fail_open()
+
+        keys, args = self.script_args(key, now)
+        connection, reusable = None, False
+        try:
+            connection = await asyncio.wait_for(self._acquire(), self.timeout)
+            (reply,) = await asyncio.wait_for(
+                connection.execute([("EVALSHA", CHECK_SCRIPT_SHA, len(keys), *keys, *args)]), self.timeout
+            )
+            if isinstance(reply, RedisError) and str(reply).startswith("NOSCRIPT"):
+                # The server's script cache was flushed; EVAL runs and reloads it
+                (reply,) = await asyncio.wait_for(
+                    connection.execute([("EVAL", CHECK_SCRIPT, len(keys), *keys, *args)]), self.timeout
+                )
+            if not isinstance(reply, list):
+                raise RedisError(f"Unexpected script reply: {reply}")
+            reusable = True
+        except (OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError, RedisError) as e:
+            logger.warning(f"Rate limit store unavailable ({e!r}); allowing requests for {RATE_LIMIT_REDIS_RETRY}s")
+            self._retry_at = time.monotonic() + RATE_LIMIT_REDIS_RETRY
+            return self._fail_open()
+        finally:
+            if connection is not None:
+                self._release(connection, reusable)
+
+        if not reply[0]:
+            return RateLimitResult(False, self.limits[reply[1] - 1])
+        return RateLimitResult(True, None, {limit.name: remaining for limit, remaining in zip(self.limits, reply[1:])})
+
+    def _fail_open(self) -> RateLimitResult:
+        return RateLimitResult(True, None, {limit.name: limit.limit for limit in self.limits})
+
+    async def close(self):
+        self._close_idle()
+
+
+def create_storage(limits: list, backend: str = None, **kwargs) -> LimiterStorage:
+    """Build the backend named by RATE_LIMIT_BACKEND (memory, shm or redis), or default_backend()."""
+    backend = (backend or RATE_LIMIT_BACKEND or default_backend()).lower()
+    if backend == "memory":
+        return SlidingWindowLimiter(limits, **kwargs)
+    if backend == "shm":
+        return SharedMemoryStorage(limits)
+    if backend == "redis":
+        return RedisStorage(limits)
+    raise ValueError(f"Unknown rate limit backend: {backend}")
@@ -0,0 +1,50 @@
+"""
+Request latency metrics, as plain ASGI middleware.
+
+Requests are labelled by route template (e.g. /api/sessions/{short_id}),
+so one histogram series covers every session link. The router records
+the matched route in the scope; requests answered before routing, such as
+rate-limit rejections, are matched against the app's routes here.
+"""
+import time
+
+from starlette.routing import Match
+
+from app import metrics
+
+UNMATCHED = "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500  # Reported if the app raises before responding
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.http_requests.labels(
+                route=self._route(scope), method=scope["method"], status=str(status)
+            ).observe(time.perf_counter() - started)
+
+    @staticmethod
+    def _route(scope) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        for route in scope["app"].router.routes:
+            if route.matches(scope)[0] == Match.FULL:
+                return route.path
+        return UNMATCHED
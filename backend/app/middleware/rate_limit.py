@@ -1,21 +1,87 @@
 """
-Simple in-memory rate limiter for FastAPI.
-For production with multiple workers, use Redis instead.
+Rate limiter for FastAPI.
+Counters live in the backend chosen by RATE_LIMIT_BACKEND: per-process
+memory by default, shm to share limits between workers on one host, or
+redis to share them across hosts.
+
+Both middlewares are plain ASGI rather than BaseHTTPMiddleware, so a
+request costs one counter check and a header append: rejections are sent
+from prebuilt messages, and allowed responses (streaming ones included)
+pass through unbuffered.
 """
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
 from collections import defaultdict
 import time
 import asyncio
+import json
 import os
 import ipaddress
 
+from app import metrics
+from app.middleware.limiter import LimiterStorage
+from app.middleware.limiter_storage import create_storage
+
 # Trusted proxy IPs - only trust X-Forwarded-For from these
 TRUSTED_PROXIES = set(
     ip.strip() for ip in os.getenv("TRUSTED_PROXIES", "127.0.0.1").split(",") if ip.strip()
 )
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+# Rejection message and Retry-After per window
+REJECTIONS = {
+    "burst": ("Too many requests. Please slow down.", "1"),
+    "minute": ("Rate limit exceeded. Please wait a minute.", "60"),
+    "hour": ("Hourly rate limit exceeded. Please try again later.", "3600"),
+}
+
+# Not rate limited: health probes and scrapes
+EXEMPT_PATHS = {"/health", "/api/health", "/health/pools", "/metrics"}
+
+
+def _rejection(detail: str, retry_after: str) -> tuple:
+    """Headers and body of a 429, encoded the way JSONResponse would."""
+    body = json.dumps({"detail": detail}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    headers = [
+        (b"content-length", str(len(body)).encode()),
+        (b"content-type", b"application/json"),
+        (b"retry-after", retry_after.encode()),
+    ]
+    return headers, body
+
+
+def _is_valid_ip(ip: str) -> bool:
+    """Validate IP address format."""
+    try:
+        ipaddress.ip_address(ip)
+        return True
+    except ValueError:
+        return False
+
+
+def get_client_ip(scope) -> str:
+    """Get client IP, only trusting proxy headers from known proxies."""
+    client = scope.get("client")
+    direct_ip = client[0] if client else "unknown"
+
+    # Only trust X-Forwarded-For if request comes from trusted proxy
+    if direct_ip in TRUSTED_PROXIES:
+        forwarded = real_ip = None
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for" and forwarded is None:
+                forwarded = value.decode("latin-1")
+            elif name == b"x-real-ip" and real_ip is None:
+                real_ip = value.decode("latin-1")
+
+        if forwarded:
+            client_ip = forwarded.split(",")[0].strip()
+            if _is_valid_ip(client_ip):
+                return client_ip
+
+        if real_ip and _is_valid_ip(real_ip):
+            return real_ip
+
+    return direct_ip
+
+
+class RateLimitMiddleware:
     def __init__(
         self,
         app,
@@ -23,155 +89,90 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         requests_per_hour: int = 1000,
         burst_limit: int = 10,
         cleanup_interval: int = 300,
+        shards: int = 16,
+        storage: LimiterStorage = None,
     ):
-        super().__init__(app)
+        self.app = app
         self.requests_per_minute = requests_per_minute
         self.requests_per_hour = requests_per_hour
         self.burst_limit = burst_limit
         self.cleanup_interval = cleanup_interval
 
-        self.minute_tracker: dict[str, list] = defaultdict(list)
-        self.hour_tracker: dict[str, list] = defaultdict(list)
-        self.second_tracker: dict[str, list] = defaultdict(list)
-
-        self._lock = asyncio.Lock()
-        self._last_cleanup = time.time()
-
-    def _is_valid_ip(self, ip: str) -> bool:
-        """Validate IP address format."""
-        try:
-            ipaddress.ip_address(ip)
-            return True
-        except ValueError:
-            return False
-
-    def _get_client_ip(self, request: Request) -> str:
-        """Get client IP, only trusting proxy headers from known proxies."""
-        direct_ip = request.client.host if request.client else "unknown"
-
-        # Only trust X-Forwarded-For if request comes from trusted proxy
-        if direct_ip in TRUSTED_PROXIES:
-            forwarded = request.headers.get("X-Forwarded-For")
-            if forwarded:
-                client_ip = forwarded.split(",")[0].strip()
-                if self._is_valid_ip(client_ip):
-                    return client_ip
-
-            real_ip = request.headers.get("X-Real-IP")
-            if real_ip and self._is_valid_ip(real_ip):
-                return real_ip
-
-        return direct_ip
-
-    def _clean_old_entries(self, tracker: list, window_seconds: int, now: float) -> list:
-        """Remove entries older than the time window."""
-        cutoff = now - window_seconds
-        return [t for t in tracker if t >= cutoff]
-
-    def _cleanup_stale_ips(self):
-        """Remove IPs with empty tracker lists to prevent memory leak."""
-        for tracker in [self.second_tracker, self.minute_tracker, self.hour_tracker]:
-            empty_ips = [ip for ip, timestamps in tracker.items() if not timestamps]
-            for ip in empty_ips:
-                del tracker[ip]
-
-    async def dispatch(self, request: Request, call_next):
+        # Checked in this order, so the shortest window reports first
+        limits = [
+            ("burst", burst_limit, 1),
+            ("minute", requests_per_minute, 60),
+            ("hour", requests_per_hour, 3600),
+        ]
+        self.limiter = storage or create_storage(limits, shards=shards, cleanup_interval=cleanup_interval)
+        self._rejections = {window: _rejection(*rejection) for window, rejection in REJECTIONS.items()}
+        self._limit_header = (b"x-ratelimit-limit", str(requests_per_minute).encode())
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
         if os.getenv("TESTING") == "true":
             print("Testing mode - skipping SlowDownMiddleware")
-            return await call_next(request)
-        
-        # Skip rate limiting for health checks
-        if request.url.path in ["/health", "/api/health"]:
-            return await call_next(request)
+            return await self.app(scope, receive, send)
 
-        client_ip = self._get_client_ip(request)
-        now = time.time()
+        # Skip rate limiting for health checks and scrapes
+        if scope["path"] in EXEMPT_PATHS:
+            return await self.app(scope, receive, send)
+
+        result = await self.limiter.check(get_client_ip(scope))
+
+        if not result.allowed:
+            metrics.rate_limit_rejections.labels(window=result.window.name).inc()
+            headers, body = self._rejections[result.window.name]
+            # Fresh messages each time; outer middleware (CORS) edits headers in place
+            await send({"type": "http.response.start", "status": 429, "headers": list(headers)})
+            await send({"type": "http.response.body", "body": body})
+            return
 
-        async with self._lock:
-            # Periodic cleanup of stale IPs to prevent memory leak
-            if now - self._last_cleanup > self.cleanup_interval:
-                self._cleanup_stale_ips()
-                self._last_cleanup = now
-
-            # Clean old entries
-            self.second_tracker[client_ip] = self._clean_old_entries(
-                self.second_tracker[client_ip], 1, now
-            )
-            self.minute_tracker[client_ip] = self._clean_old_entries(
-                self.minute_tracker[client_ip], 60, now
-            )
-            self.hour_tracker[client_ip] = self._clean_old_entries(
-                self.hour_tracker[client_ip], 3600, now
-            )
-
-            # Check burst limit (per second)
-            if len(self.second_tracker[client_ip]) >= self.burst_limit:
-                raise HTTPException(
-                    status_code=429,
-                    detail="Too many requests. Please slow down.",
-                    headers={"Retry-After": "1"}
-                )
-
-            # Check minute limit
-            if len(self.minute_tracker[client_ip]) >= self.requests_per_minute:
-                raise HTTPException(
-                    status_code=429,
-                    detail="Rate limit exceeded. Please wait a minute.",
-                    headers={"Retry-After": "60"}
-                )
-
-            # Check hour limit
-            if len(self.hour_tracker[client_ip]) >= self.requests_per_hour:
-                raise HTTPException(
-                    status_code=429,
-                    detail="Hourly rate limit exceeded. Please try again later.",
-                    headers={"Retry-After": "3600"}
-                )
-
-            # Record this request
-            self.second_tracker[client_ip].append(now)
-            self.minute_tracker[client_ip].append(now)
-            self.hour_tracker[client_ip].append(now)
-
-        response = await call_next(request)
-        
         # Add rate limit headers to response
-        response.headers["X-RateLimit-Limit"] = str(self.requests_per_minute)
-        response.headers["X-RateLimit-Remaining"] = str(
-            self.requests_per_minute - len(self.minute_tracker[client_ip])
-        )
-        
-        return response
+        rate_headers = [self._limit_header, (b"x-ratelimit-remaining", str(result.remaining["minute"]).encode())]
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *rate_headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
 
 
-class SlowDownMiddleware(BaseHTTPMiddleware):
+class SlowDownMiddleware:
     """
     Additional middleware to slow down suspicious behavior.
     If a user makes too many requests, add artificial delay.
     """
     def __init__(self, app, threshold: int = 30, delay_ms: int = 500):
-        super().__init__(app)
+        self.app = app
         self.threshold = threshold  # Requests per minute before slowing
         self.delay_ms = delay_ms
         self.tracker: dict[str, list] = defaultdict(list)
 
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
         if os.getenv("TESTING") == "true":
             print("Testing mode - skipping SlowDownMiddleware")
-            return await call_next(request) 
-        
-        if request.url.path in ["/health", "/api/health"]:
-            return await call_next(request)
-    
-        client_ip = request.client.host if request.client else "unknown"
+            return await self.app(scope, receive, send)
+
+        if scope["path"] in EXEMPT_PATHS:
+            return await self.app(scope, receive, send)
+
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
         now = time.time()
-        
+
         # Clean old entries (last minute)
         self.tracker[client_ip] = [t for t in self.tracker[client_ip] if t > now - 60]
-        
+
         # Add delay if over threshold
         if len(self.tracker[client_ip]) > self.threshold:
             await asyncio.sleep(self.delay_ms / 1000)
-        
+
         self.tracker[client_ip].append(now)
-        return await call_next(request)
+        await self.app(scope, receive, send)
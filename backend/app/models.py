@@ -9,7 +9,14 @@ class SessionModel(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     uuid: str = Field(default_factory=lambda: str(uuid.uuid4()), index=True)
     created_at: Optional[date] = Field(default_factory=date.today)
+    # Hash of the parsed schedule (see ics_stream.schedule_fingerprint)
+    fingerprint: Optional[str] = Field(default=None, index=True)
+    # Set when an identical upload already existed; series rows are read from that session
+    shared_from_id: Optional[int] = Field(default=None, foreign_key="sessionmodel.id")
+    # "pending" while a background job builds it, then "ready" or "failed"
+    status: str = Field(default="ready")
     events: List["EventModel"] = Relationship(back_populates="session")
+    series: List["EventSeriesModel"] = Relationship(back_populates="session")
 
 
 class EventModel(SQLModel, table=True):
@@ -30,10 +37,45 @@ class EventModel(SQLModel, table=True):
     longitude: Optional[float]
 
 
+class EventSeriesModel(SQLModel, table=True):
+    """One row per calendar event; occurrences are expanded when the session is read."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    session_id: int = Field(foreign_key="sessionmodel.id", index=True)
+    session: Optional[SessionModel] = Relationship(back_populates="series")
+
+    title: str
+    location: str
+    start_time: Optional[time]
+    end_time: Optional[time]
+    start_date: date
+    end_date: date
+
+    day_codes: List[str] = Field(default_factory=list, sa_column=Column(JSON))
+    # RRULE parts; end_date is the last possible occurrence (UNTIL, or derived from COUNT)
+    freq: str = Field(default="WEEKLY")
+    interval: int = Field(default=1)
+    count: Optional[int] = None
+    exdates: List[str] = Field(default_factory=list, sa_column=Column(JSON))
+    rdates: List[str] = Field(default_factory=list, sa_column=Column(JSON))
+
+    latitude: Optional[float]
+    longitude: Optional[float]
+
+
 class ContactSubmission(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     email: str
     subject: str
     message: str
-    created_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    created_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
+
+
+class GeocodeCacheEntry(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    cache_key: str = Field(index=True, unique=True)
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    confidence: float = 0
+    raw: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
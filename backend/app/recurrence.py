@@ -0,0 +1,148 @@
+"""
+Recurrence expansion for event series.
+
+Supports the RRULE parts class schedules use (FREQ=DAILY/WEEKLY, INTERVAL,
+BYDAY, UNTIL, COUNT) plus EXDATE and RDATE; other frequencies occur
+once, on the start date. Instead of testing every
+calendar day, the engine jumps straight to the first period that can
+overlap the requested window and steps from one matching date to the
+next, so the work done is proportional to the occurrences returned.
+"""
+import heapq
+from datetime import date, timedelta
+
+WEEKDAY_CODES = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+WEEKDAY_INDEX = {code: i for i, code in enumerate(WEEKDAY_CODES)}
+
+
+def _weekly(start: date, weekdays: list, interval: int, skip_to: date):
+    """
+    Yield (index, date) for a weekly rule, starting with the first period
+    that can contain skip_to. index counts occurrences from start.
+    """
+    week_start = start - timedelta(days=start.weekday())
+    first_week = [d for d in weekdays if week_start + timedelta(days=d) >= start]
+
+    period = 0
+    index = 0
+    if skip_to > start:
+        period = (skip_to - week_start).days // (7 * interval)
+        if period:
+            index = len(first_week) + (period - 1) * len(weekdays)
+
+    while True:
+        base = week_start + timedelta(weeks=period * interval)
+        for weekday in (first_week if period == 0 else weekdays):
+            yield index, base + timedelta(days=weekday)
+            index += 1
+        period += 1
+
+
+def _daily(start: date, interval: int, skip_to: date):
+    """Yield (index, date) for a daily rule, starting at or just before skip_to."""
+    index = max(0, (skip_to - start).days // interval)
+    while True:
+        yield index, start + timedelta(days=index * interval)
+        index += 1
+
+
+def rule_dates(
+    start: date,
+    until: date = None,
+    count: int = None,
+    freq: str = "WEEKLY",
+    interval: int = 1,
+    day_codes: list = None,
+    window_start: date = None,
+    window_end: date = None,
+):
+    """
+    Yield the dates generated by a rule, in order, within [window_start, window_end).
+    The rule must be bounded by until, count or window_end. Frequencies other than
+    DAILY and WEEKLY yield only start, matching how uploads store them.
+    """
+    if freq not in ("DAILY", "WEEKLY"):
+        if (window_start is None or start >= window_start) and (window_end is None or start < window_end):
+            yield start
+        return
+
+    interval = max(1, interval or 1)
+    weekdays = sorted({WEEKDAY_INDEX[c] for c in (day_codes or []) if c in WEEKDAY_INDEX})
+    if not weekdays:
+        if day_codes:
+            return  # Only codes we do not expand (e.g. 2SU)
+        weekdays = [start.weekday()]
+
+    skip_to = max(start, window_start) if window_start else start
+    last = until
+    if window_end and (last is None or window_end - timedelta(days=1) < last):
+        last = window_end - timedelta(days=1)
+    if last is None and count is None:
+        raise ValueError("Unbounded recurrence needs until, count or window_end")
+
+    if freq == "DAILY" and day_codes and interval == 1:
+        freq = "WEEKLY"  # Every day filtered by BYDAY is the same set of dates
+
+    if freq == "DAILY":
+        allowed = set(weekdays) if day_codes else None
+        if allowed and count is not None:
+            # COUNT only counts days that pass BYDAY, so we cannot skip ahead
+            matching = set(weekdays)
+            candidates = enumerate(d for _, d in _daily(start, interval, start) if d.weekday() in matching)
+            allowed = None
+        else:
+            candidates = _daily(start, interval, skip_to)
+    else:
+        allowed = None
+        candidates = _weekly(start, weekdays, interval, skip_to)
+
+    for index, current in candidates:
+        if count is not None and index >= count:
+            return
+        if last is not None and current > last:
+            return
+        if current < skip_to:
+            continue
+        if allowed is not None and current.weekday() not in allowed:
+            continue
+        yield current
+
+
+def occurrences(
+    start: date,
+    until: date = None,
+    count: int = None,
+    freq: str = "WEEKLY",
+    interval: int = 1,
+    day_codes: list = None,
+    exdates=(),
+    rdates=(),
+    window_start: date = None,
+    window_end: date = None,
+):
+    """
+    Yield every occurrence date of a series in order, within [window_start, window_end).
+    RDATEs are merged in; EXDATEs are removed from both.
+    """
+    exdates = set(exdates)
+    extra = sorted(
+        d for d in set(rdates)
+        if (window_start is None or d >= window_start) and (window_end is None or d < window_end)
+    )
+    generated = rule_dates(start, until, count, freq, interval, day_codes, window_start, window_end)
+
+    previous = None
+    for current in heapq.merge(generated, extra):
+        if current != previous and current not in exdates:
+            yield current
+        previous = current
+
+
+def last_occurrence(
+    start: date, count: int, freq: str = "WEEKLY", interval: int = 1, day_codes: list = None, until: date = None
+) -> date:
+    """Date of the final occurrence of a COUNT-bounded rule, no later than until (start if it yields nothing)."""
+    last = start
+    for current in rule_dates(start, until, count, freq, interval, day_codes):
+        last = current
+    return last
@@ -0,0 +1,203 @@
+"""
+Cache of serialized GET /sessions/{short_id} responses.
+
+Sessions never change after creation, so the JSON body is built once and
+served from memory (size-bounded LRU) or an optional on-disk tier shared by
+all workers on the host. Each body carries a content-derived ETag. Only
+the default (unwindowed) view is cached, so there is at most one entry
+per session.
+
+The disk tier is bounded too: files are touched when read, and once a
+worker has written a tenth of the budget since its last sweep, a
+background sweep deletes the least recently used files until the
+directory fits again.
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # 64MB
+RESPONSE_CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR")  # Unset disables the disk tier
+RESPONSE_CACHE_DIR_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_DIR_MAX_BYTES", str(1024 * 1024 * 1024)))  # 1GB
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag derived from the response body."""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+class ResponseCache:
+    """Size-bounded LRU of response bodies with an optional disk tier."""
+
+    def __init__(
+        self,
+        max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+        directory: str = RESPONSE_CACHE_DIR,
+        disk_max_bytes: int = RESPONSE_CACHE_DIR_MAX_BYTES,
+    ):
+        self.max_bytes = max_bytes
+        self.directory = Path(directory) if directory else None
+        self.disk_max_bytes = disk_max_bytes
+
+        self._entries: OrderedDict[str, tuple[bytes, str]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "disk_hits": 0, "evictions": 0, "disk_evictions": 0}
+        self._disk_written = 0  # bytes this process wrote since its last sweep
+        self._sweeping = False
+
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.sweep()
+
+    def _path_for(self, key: str) -> Path:
+        return self.directory / f"{hashlib.sha256(key.encode()).hexdigest()}.json"
+
+    def _remember(self, key: str, body: bytes, etag: str):
+        """Insert into the memory tier. Caller must hold the lock."""
+        if len(body) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous:
+            self._size -= len(previous[0])
+        self._entries[key] = (body, etag)
+        self._size += len(body)
+        while self._size > self.max_bytes:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self._stats["evictions"] += 1
+
+    def get(self, key: str):
+        """Return (body, etag) for a cached response, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry
+
+        body = self._read_disk(key)
+
+        with self._lock:
+            if body is None:
+                self._stats["misses"] += 1
+                return None
+            etag = make_etag(body)
+            self._remember(key, body, etag)
+            self._stats["hits"] += 1
+            self._stats["disk_hits"] += 1
+            return body, etag
+
+    def put(self, key: str, body: bytes) -> str:
+        """Cache a response body and return its ETag."""
+        etag = make_etag(body)
+        with self._lock:
+            self._remember(key, body, etag)
+        self._write_disk(key, body)
+        return etag
+
+    def _read_disk(self, key: str):
+        if not self.directory:
+            return None
+        path = self._path_for(key)
+        try:
+            body = path.read_bytes()
+            os.utime(path)  # Mark it recently used for the sweep
+            return body
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.debug(f"Response cache read failed for '{key}': {e}")
+            return None
+
+    def _write_disk(self, key: str, body: bytes):
+        if not self.directory:
+            return
+        path = self._path_for(key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            tmp.write_bytes(body)
+            os.replace(tmp, path)  # atomic, so other workers never see a partial file
+        except OSError as e:
+            logger.debug(f"Response cache write failed for '{key}': {e}")
+            return
+
+        with self._lock:
+            self._disk_written += len(body)
+            due = not self._sweeping and self._disk_written >= self.disk_max_bytes // 10
+            if due:
+                self._sweeping = True
+        if due:
+            threading.Thread(target=self._sweep_in_background, daemon=True).start()
+
+    def _sweep_in_background(self):
+        try:
+            self.sweep()
+        finally:
+            with self._lock:
+                self._sweeping = False
+
+    def sweep(self):
+        """Delete the least recently used files until the disk tier is within disk_max_bytes."""
+        with self._lock:
+            self._disk_written = 0
+        files = []
+        for path in self.directory.glob("*.json"):
+            try:
+                info = path.stat()
+            except OSError:
+                continue  # Removed by another worker's sweep
+            files.append((info.st_mtime, info.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                path.unlink()
+                evicted += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.debug(f"Response cache could not remove {path}: {e}")
+                continue
+            total -= size
+
+        with self._lock:
+            self._stats["disk_evictions"] += evicted
+
+    def clear(self):
+        """Drop the memory tier and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._size
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+cache = ResponseCache()
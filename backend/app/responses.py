@@ -0,0 +1,69 @@
+"""
+Response bodies for the hot read paths, encoded with msgspec.
+
+Session events and distance-matrix results are returned as typed structs
+and encoded to JSON in one pass, with dates written natively instead of
+being formatted field by field and walked again by jsonable_encoder. The
+JSON is the same as FastAPI's JSONResponse produced, and as compact.
+"""
+from datetime import date
+from typing import List, Optional, TypedDict
+
+import msgspec
+from fastapi.responses import JSONResponse
+
+# Shared by all requests; encoders are thread-safe
+encoder = msgspec.json.Encoder()
+
+
+class Event(msgspec.Struct):
+    """One occurrence in GET /sessions/{short_id}. Times are "HH:MM"."""
+
+    title: Optional[str]
+    location: Optional[str]
+    start: Optional[str]
+    end: Optional[str]
+    start_date: Optional[date]
+    end_date: Optional[date]
+    day_of_week: Optional[List[str]] = msgspec.field(name="dayOfWeek")
+    latitude: Optional[float]
+    longitude: Optional[float]
+
+
+class SessionEvents(msgspec.Struct):
+    events: List[Event]
+
+
+class TravelElement(TypedDict):
+    """A routable origin/destination pair; unroutable pairs are None."""
+
+    duration_seconds: int
+    duration_text: str
+    distance_meters: int
+    distance_text: str
+
+
+class MatrixError(TypedDict):
+    """Origins and destinations of a tile that failed after retries."""
+
+    origins: List[int]
+    destinations: List[int]
+    error: str
+
+
+class DistanceMatrix(msgspec.Struct):
+    results: List[List[Optional[TravelElement]]]
+    errors: List[MatrixError]
+    engine: str
+
+
+class MsgspecResponse(JSONResponse):
+    """JSONResponse that encodes msgspec structs (and plain JSON types) with msgspec."""
+
+    def render(self, content) -> bytes:
+        return encoder.encode(content)
+
+
+def hhmm(value) -> Optional[str]:
+    """Format a time as "HH:MM", the way the API has always returned it."""
+    return value.isoformat("minutes") if value else None
@@ -0,0 +1,68 @@
+"""
+Offline travel-time estimates from straight-line distance.
+
+Used when the Maps API is not configured or fails, and as a network-free
+engine for tests. Distance is the great-circle distance times a per-mode
+detour factor; duration assumes a constant per-mode speed.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from app.utils import haversine_matrix
+
+# Average speed (km/h) and street-network detour factor per mode
+TRAVEL_MODELS = {
+    "walking": {"speed_kmh": 5.0, "detour": 1.3},
+    "bicycling": {"speed_kmh": 15.0, "detour": 1.25},
+    "driving": {"speed_kmh": 35.0, "detour": 1.4},
+}
+
+
+@lru_cache(maxsize=4096)
+def format_duration(seconds: int) -> str:
+    """Format seconds the way the Distance Matrix API does (e.g. '1 hour 5 mins')."""
+    minutes = max(1, round(seconds / 60))
+    hours, minutes = divmod(minutes, 60)
+    parts = []
+    if hours:
+        parts.append(f"{hours} hour{'s' if hours != 1 else ''}")
+    if minutes or not hours:
+        parts.append(f"{minutes} min{'s' if minutes != 1 else ''}")
+    return " ".join(parts)
+
+
+@lru_cache(maxsize=4096)
+def format_distance(meters: int) -> str:
+    """Format meters the way the Distance Matrix API does (e.g. '850 m', '1.2 km')."""
+    if meters < 1000:
+        return f"{meters} m"
+    return f"{meters / 1000:.1f} km"
+
+
+def estimate_matrix(origins: list, destinations: list, mode: str) -> list:
+    """
+    Estimate a travel-time grid for (lat, lng) origins and destinations.
+    Returns rows of elements in the same format as the Maps-backed results.
+    """
+    model = TRAVEL_MODELS[mode]
+    if not origins or not destinations:
+        return [[] for _ in origins]
+
+    km = haversine_matrix(np.asarray(origins, dtype=float), np.asarray(destinations, dtype=float))
+    km *= model["detour"]
+    meters = np.rint(km * 1000).astype(int).tolist()
+    seconds = np.rint(km / model["speed_kmh"] * 3600).astype(int).tolist()
+
+    return [
+        [
+            {
+                "duration_seconds": s,
+                "duration_text": format_duration(s),
+                "distance_meters": m,
+                "distance_text": format_distance(m),
+            }
+            for s, m in zip(seconds_row, meters_row)
+        ]
+        for seconds_row, meters_row in zip(seconds, meters)
+    ]
@@ -1,95 +1,61 @@
-from ics import Calendar
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+import asyncio
 import calendar
 import googlemaps
 import os
 import re
 import logging
 import math
+import time
+import numpy as np
 from dotenv import load_dotenv
 
+from app import gazetteer, geocode_cache, instrumentation, metrics
+from app.locations import expand_abbreviations
+from app.recurrence import WEEKDAY_CODES, last_occurrence, occurrences
+
 load_dotenv()
 GOOGLE_MAPS_KEY = os.getenv("GOOGLE_MAPS_KEY")
 print("Loaded .env file for configuration.", len(GOOGLE_MAPS_KEY) if GOOGLE_MAPS_KEY else 0)
 
+# Geocoding fan-out settings (concurrent calls, per-call timeout in seconds)
+GEOCODE_CONCURRENCY = int(os.getenv("GEOCODE_CONCURRENCY", "8"))
+GEOCODE_TIMEOUT = float(os.getenv("GEOCODE_TIMEOUT", "5"))
+
+# API statuses worth retrying; others (REQUEST_DENIED, INVALID_REQUEST...) will fail again
+TRANSIENT_API_STATUSES = {"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"}
+
 if GOOGLE_MAPS_KEY:
-    gmaps = googlemaps.Client(key=GOOGLE_MAPS_KEY)
+    gmaps = googlemaps.Client(key=GOOGLE_MAPS_KEY, timeout=GEOCODE_TIMEOUT)
 else:
     gmaps = None
 logger = logging.getLogger(__name__)
 
-ICAL_TO_WEEKDAY = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+ICAL_TO_WEEKDAY = WEEKDAY_CODES
 WEEKDAY_ORDER = list(calendar.day_name)
 
 # Date bounds for validation
 MIN_DATE_YEAR = 2020
 MAX_DATE_YEAR = 2030
 
+# Occurrences kept from a COUNT rule; a term of daily classes is a few hundred
+MAX_RRULE_COUNT = 1000
+
 # Location types that indicate high confidence (Google Maps result types)
 HIGH_CONFIDENCE_TYPES = {"premise", "street_address", "establishment", "point_of_interest", "university"}
 
+EARTH_RADIUS_KM = 6371
+
 # Maximum distance (km) from cluster centroid before considering a location an outlier
 MAX_OUTLIER_DISTANCE_KM = 50
 
-# Common abbreviations in building/location names
-LOCATION_ABBREVIATIONS = {
-    r'\bBldg\b': 'Building',
-    r'\bBlg\b': 'Building',
-    r'\bEng\b': 'Engineering',
-    r'\bEngr\b': 'Engineering',
-    r'\bMech\b': 'Mechanical',
-    r'\bElec\b': 'Electrical',
-    r'\bChem\b': 'Chemistry',
-    r'\bPhys\b': 'Physics',
-    r'\bBio\b': 'Biology',
-    r'\bSci\b': 'Science',
-    r'\bLab\b': 'Laboratory',
-    r'\bCtr\b': 'Center',
-    r'\bCntr\b': 'Center',
-    r'\bLib\b': 'Library',
-    r'\bAud\b': 'Auditorium',
-    r'\bRm\b': 'Room',
-    r'\bSt\b': 'Street',
-    r'\bAve\b': 'Avenue',
-    r'\bDr\b': 'Drive',
-    r'\bUniv\b': 'University',
-    r'\bAdmin\b': 'Administration',
-    r'\bComm\b': 'Communication',
-    r'\bComp\b': 'Computer',
-    r'\bInfo\b': 'Information',
-    r'\bTech\b': 'Technology',
-    r'\bMgmt\b': 'Management',
-    r'\bBus\b': 'Business',
-    r'\bEd\b': 'Education',
-    r'\bMed\b': 'Medical',
-    r'\bHlth\b': 'Health',
-    r'\bArts\b': 'Arts',
-    r'\bSoc\b': 'Social',
-    r'\bPsych\b': 'Psychology',
-    r'\bMath\b': 'Mathematics',
-    r'\bStat\b': 'Statistics',
-    r'\bEcon\b': 'Economics',
-    r'\bHum\b': 'Humanities',
-    r'\bRes\b': 'Research',
-    r'\bDev\b': 'Development',
-    r'\bSvcs\b': 'Services',
-    r'\bSvc\b': 'Service',
-}
-
-
-def expand_abbreviations(text: str) -> str:
-    """Expand common abbreviations in location names."""
-    result = text
-    for abbrev, full in LOCATION_ABBREVIATIONS.items():
-        result = re.sub(abbrev, full, result, flags=re.IGNORECASE)
-    return result
-
 
 def haversine_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
     """
     Calculate the great-circle distance between two points on Earth (in km).
     """
-    R = 6371  # Earth's radius in km
+    R = EARTH_RADIUS_KM
 
     lat1_rad = math.radians(lat1)
     lat2_rad = math.radians(lat2)
@@ -102,6 +68,23 @@ def haversine_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> fl
     return R * c
 
 
+def haversine_matrix(origins: np.ndarray, destinations: np.ndarray) -> np.ndarray:
+    """
+    Vectorized haversine_distance over every origin x destination pair.
+    Takes (n, 2) and (m, 2) arrays of (lat, lng) degrees; returns an (n, m) array in km.
+    """
+    origins = np.radians(origins)
+    destinations = np.radians(destinations)
+    lat1 = origins[:, 0:1]
+    lng1 = origins[:, 1:2]
+    lat2 = destinations[:, 0]
+    lng2 = destinations[:, 1]
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+@lru_cache(maxsize=8192)
 def clean_location(location: str) -> str:
     """Clean and expand location string for geocoding."""
     if not location:
@@ -121,6 +104,18 @@ def geocode_location(address: str, bias_coords: dict = None) -> dict:
     if not address:
         return {"lat": None, "lng": None, "confidence": 0, "raw": None}
 
+    # Known campus buildings resolve locally
+    known = gazetteer.index.lookup(address, bias_coords)
+    if known is not None:
+        instrumentation.geocode_lookups.labels(source="gazetteer").inc()
+        return known
+
+    cache = geocode_cache.cache
+    cached = cache.get(address, bias_coords)
+    if cached is not None:
+        instrumentation.geocode_lookups.labels(source="cache").inc()
+        return cached
+
     # Use a local reference to the global gmaps to make mocking easier
     # Import here so tests can patch app.utils.gmaps
     from app import utils 
@@ -139,9 +134,19 @@ def geocode_location(address: str, bias_coords: dict = None) -> dict:
                 "northeast": {"lat": bias_coords["lat"] + delta, "lng": bias_coords["lng"] + delta},
             }
 
-        results = client.geocode(**params)
+        started = time.perf_counter()
+        try:
+            results = client.geocode(**params)
+        except Exception as e:
+            metrics.observe_google("geocode", metrics.google_status(e), time.perf_counter() - started)
+            raise
+        metrics.observe_google("geocode", "OK" if results else "ZERO_RESULTS", time.perf_counter() - started)
+        instrumentation.geocode_lookups.labels(source="google").inc()
         if not results:
-            return {"lat": None, "lng": None, "confidence": 0, "raw": None}
+            # Cache the miss too so unknown names don't hit Google every upload
+            geocoded = {"lat": None, "lng": None, "confidence": 0, "raw": None}
+            cache.set(address, bias_coords, geocoded)
+            return geocoded
 
         result = results[0]
         location = result["geometry"]["location"]
@@ -149,15 +154,29 @@ def geocode_location(address: str, bias_coords: dict = None) -> dict:
         # Calculate confidence based on result type and location_type
         confidence = calculate_confidence(result)
 
-        return {
+        geocoded = {
             "lat": location["lat"],
             "lng": location["lng"],
             "confidence": confidence,
             "raw": result
         }
+        cache.set(address, bias_coords, geocoded)
+        # Learned entries are name-only, so a result picked by one campus's bounds is not one
+        if gazetteer.GAZETTEER_LEARN and not bias_coords:
+            gazetteer.index.learn(address, geocoded)
+        return geocoded
     except Exception as e:
+        # Errors are not cached; they are usually transient
+        instrumentation.geocode_lookups.labels(source="error").inc()
         logger.debug(f"Geocoding failed for '{address}': {e}")
-        return {"lat": None, "lng": None, "confidence": 0, "raw": None}
+        return {"lat": None, "lng": None, "confidence": 0, "raw": None, "transient": is_transient_error(e)}
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Whether a failed geocode may succeed if tried again later."""
+    if isinstance(error, googlemaps.exceptions.ApiError):
+        return error.status in TRANSIENT_API_STATUSES
+    return True  # Timeouts, transport errors and anything unexpected
 
 
 def calculate_confidence(result: dict) -> float:
@@ -260,72 +279,166 @@ def find_outliers(geocoded_locations: dict, centroid: dict) -> list:
     return outliers
 
 
-def parse_ics(file_content: str, school_location: str = None):
+def parse_ical_date(value: str):
+    """Parse an iCalendar DATE or DATE-TIME value into a date, or None if invalid."""
+    value = value.strip()
+    try:
+        if "T" in value:
+            return datetime.strptime(value[:15], "%Y%m%dT%H%M%S").date()
+        return datetime.strptime(value, "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def parse_rrule(value: str) -> dict:
     """
-    Parse ICS file and geocode locations using anchor detection.
-    school_location parameter is now optional (kept for backwards compatibility).
+    Read the RRULE parts we support into record fields.
+    Only parts present in the rule appear in the result; an UNTIL outside the
+    supported years is dropped (None) and COUNT is capped at MAX_RRULE_COUNT.
+    """
+    parts = dict(x.split("=") for x in value.split(";") if "=" in x)
+    rule = {}
+    if "FREQ" in parts:
+        rule["freq"] = parts["FREQ"].upper()
+    if "UNTIL" in parts:
+        until_date = parse_ical_date(parts["UNTIL"])
+        if until_date and (until_date.year < MIN_DATE_YEAR or until_date.year > MAX_DATE_YEAR):
+            until_date = None
+        rule["until"] = until_date
+    if "COUNT" in parts and parts["COUNT"].isdigit():
+        rule["count"] = min(int(parts["COUNT"]), MAX_RRULE_COUNT)
+    if "INTERVAL" in parts and parts["INTERVAL"].isdigit():
+        rule["interval"] = max(1, int(parts["INTERVAL"]))
+    if "BYDAY" in parts:
+        rule["day_codes"] = parts["BYDAY"].split(",")
+    return rule
+
+
+def recurrence_fields(rrules: list, start_date: date) -> dict:
+    """
+    Turn an event's RRULE values into the record's recurrence fields.
+    Later RRULEs override earlier ones part by part. Only DAILY and WEEKLY
+    rules repeat; other frequencies occur once, on the start date.
+    """
+    rule = {}
+    for value in rrules:
+        rule.update(parse_rrule(value))
+
+    freq = rule.get("freq", "WEEKLY")
+    if freq not in ("DAILY", "WEEKLY"):
+        # Not expanded (e.g. MONTHLY), so keep only the first occurrence
+        rule, freq = {}, "WEEKLY"
+    day_codes = rule.get("day_codes")
+    if not day_codes:
+        day_codes = list(ICAL_TO_WEEKDAY) if freq == "DAILY" else [ICAL_TO_WEEKDAY[start_date.weekday()]]
+    interval = rule.get("interval", 1)
+    count = rule.get("count")
+
+    if rule.get("until"):
+        end_date = rule["until"]
+    elif count is not None:
+        end_date = last_occurrence(start_date, count, freq, interval, day_codes, until=date(MAX_DATE_YEAR, 12, 31))
+    else:
+        end_date = start_date
+
+    return {
+        "end_date": end_date,
+        "day_codes": day_codes,
+        "freq": freq,
+        "interval": interval,
+        "count": count,
+    }
+
+
+def event_record(event) -> dict:
+    """Build the intermediate record for one parsed ics event."""
+    start_date = event.begin.date()
+    rrules = []
+    exdates = set()
+    rdates = set()
+
+    for line in event.extra:
+        if line.name == "RRULE":
+            rrules.append(line.value)
+        elif line.name == "EXDATE":
+            for value in line.value.split(","):
+                exdate = parse_ical_date(value)
+                if exdate:
+                    exdates.add(exdate)
+        elif line.name == "RDATE":
+            for value in line.value.split(","):
+                # PERIOD values are start/end or start/duration
+                rdate = parse_ical_date(value.split("/")[0])
+                if rdate:
+                    rdates.add(rdate)
+
+    original_location = event.location or ""
+    return {
+        "name": event.name or "Untitled",
+        "original_location": original_location,
+        "cleaned_location": clean_location(original_location),
+        "start_date": start_date,
+        **recurrence_fields(rrules, start_date),
+        "exdates": sorted(exdates),
+        "rdates": sorted(rdates),
+        "start_time": event.begin.time(),
+        "end_time": event.end.time(),
+    }
+
+
+def extract_event_data(file_content: str):
+    """
+    Parse the calendar and collect per-event data plus the unique cleaned locations.
+    Returns (event_data, unique_locations).
     """
-    events = []
-    cal = Calendar(file_content)
+    # Imported here because the parser builds on the helpers in this module
+    from app.ics_parser import parse_calendar
 
-    # Step 1: Extract all unique locations
-    unique_locations = {}
-    event_data = []
+    event_data = parse_calendar(file_content)
+    unique_locations = {
+        record["cleaned_location"]: None
+        for record in event_data
+        if record["cleaned_location"]
+    }
 
-    for event in cal.events:
-        start_date = event.begin.date()
-        end_date = start_date
-        day_codes = []
-        until_date = None
-
-        for line in event.extra:
-            if line.name == "RRULE":
-                parts = dict(x.split("=") for x in line.value.split(";") if "=" in x)
-                if "UNTIL" in parts:
-                    until = parts["UNTIL"]
-                    try:
-                        until_date = datetime.strptime(until, "%Y%m%dT%H%M%S").date() if "T" in until else datetime.strptime(until, "%Y%m%d").date()
-                        if until_date.year < MIN_DATE_YEAR or until_date.year > MAX_DATE_YEAR:
-                            until_date = None
-                    except ValueError:
-                        until_date = None
-                if "BYDAY" in parts:
-                    day_codes = parts["BYDAY"].split(",")
-
-        if not day_codes:
-            day_codes = [ICAL_TO_WEEKDAY[event.begin.weekday()]]
-        if until_date:
-            end_date = until_date
-
-        original_location = event.location or ""
-        cleaned_location = clean_location(original_location)
-
-        if cleaned_location:
-            unique_locations[cleaned_location] = None  # Will fill with geocode result
-
-        event_data.append({
-            "name": event.name or "Untitled",
-            "original_location": original_location,
-            "cleaned_location": cleaned_location,
-            "start_date": start_date,
-            "end_date": end_date,
-            "day_codes": day_codes,
-            "start_time": event.begin.time(),
-            "end_time": event.end.time(),
-        })
+    return event_data, list(unique_locations)
 
-    # Step 2: First pass - geocode all unique locations without bias
-    geocoded = {}
-    for loc in unique_locations.keys():
-        geocoded[loc] = geocode_location(loc)
 
-    # Step 3: Find cluster centroid (using median for outlier robustness)
-    centroid = cluster_locations(geocoded)
+async def geocode_concurrently(addresses: list, bias_coords: dict = None) -> dict:
+    """
+    Geocode many addresses at once without blocking the event loop.
+    Calls run in worker threads, at most GEOCODE_CONCURRENCY at a time, and a
+    call that exceeds GEOCODE_TIMEOUT counts as a failed geocode.
+    """
+    semaphore = asyncio.Semaphore(GEOCODE_CONCURRENCY)
+    results = await asyncio.gather(*(geocode_limited(address, bias_coords, semaphore) for address in addresses))
+    return dict(zip(addresses, results))
+
 
-    # Step 4: Detect outliers - locations too far from centroid
-    outliers = find_outliers(geocoded, centroid) if centroid else []
+async def geocode_limited(address: str, bias_coords: dict, semaphore: asyncio.Semaphore) -> dict:
+    """
+    Geocode one address in a worker thread once the semaphore allows it.
+    The slot is held until the thread finishes, even after a timeout, so
+    slow upstream calls still count against the limit.
+    """
+    await semaphore.acquire()
+    call = asyncio.ensure_future(asyncio.to_thread(geocode_location, address, bias_coords))
+
+    def release(call):
+        semaphore.release()
+        if not call.cancelled():
+            call.exception()  # Retrieved so a failure after a timeout is not reported as unhandled
+
+    call.add_done_callback(release)
+    try:
+        return await asyncio.wait_for(asyncio.shield(call), timeout=GEOCODE_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.debug(f"Geocoding timed out for '{address}'")
+        return {"lat": None, "lng": None, "confidence": 0, "raw": None, "transient": True}
 
-    # Step 5: Find anchor (highest confidence non-outlier result)
+
+def select_anchor(geocoded: dict, outliers: list, centroid: dict) -> dict:
+    """Pick the highest confidence non-outlier result, falling back to the centroid."""
     anchor = None
     best_score = 0
     for loc, data in geocoded.items():
@@ -337,55 +450,147 @@ def parse_ics(file_content: str, school_location: str = None):
             best_score = data["confidence"]
             anchor = {"lat": data["lat"], "lng": data["lng"]}
 
-    # If no anchor found, use centroid
+    return anchor or centroid
+
+
+async def resolve_locations(locations: list) -> dict:
+    """
+    Geocode unique locations using anchor detection.
+    Both the first pass and the anchor-biased retries are fanned out concurrently.
+    """
+    # Step 2: First pass - geocode all unique locations without bias
+    with instrumentation.stage("geocode", locations=len(locations)):
+        geocoded = await geocode_concurrently(locations)
+    return await refine_locations(geocoded)
+
+
+async def refine_locations(geocoded: dict) -> dict:
+    """
+    Correct first-pass geocodes using the whole set: drop far outliers and
+    re-geocode them and low-confidence results biased toward an anchor.
+    """
+    with instrumentation.stage("refine"):
+        # Step 3: Find cluster centroid (using median for outlier robustness)
+        centroid = cluster_locations(geocoded)
+
+        # Step 4: Detect outliers - locations too far from centroid
+        outliers = find_outliers(geocoded, centroid) if centroid else []
+
+        # Step 5: Find anchor (highest confidence non-outlier result)
+        anchor = select_anchor(geocoded, outliers, centroid)
     if not anchor:
-        anchor = centroid
+        return geocoded
 
     # Step 6: Re-geocode outliers and low-confidence locations with anchor bias
-    if anchor:
-        # First handle outliers
-        for loc in outliers:
-            retry = geocode_location(loc, bias_coords=anchor)
-            if retry["lat"] is not None:
-                # Verify the retry isn't also an outlier
-                retry_distance = haversine_distance(
-                    anchor["lat"], anchor["lng"],
-                    retry["lat"], retry["lng"]
-                )
-                if retry_distance <= MAX_OUTLIER_DISTANCE_KM:
-                    geocoded[loc] = retry
-                else:
-                    # Still an outlier, set to None
-                    geocoded[loc] = {"lat": None, "lng": None, "confidence": 0, "raw": None}
-
-        # Then handle low-confidence (non-outlier) locations
-        for loc, data in geocoded.items():
-            if loc in outliers:
-                continue
-            if data["lat"] is None or data["confidence"] < 0.5:
-                retry = geocode_location(loc, bias_coords=anchor)
-                if retry["lat"] is not None:
-                    geocoded[loc] = retry
-
-    # Step 5: Build final event list
+    low_confidence = [
+        loc for loc, data in geocoded.items()
+        if loc not in outliers and (data["lat"] is None or data["confidence"] < 0.5)
+    ]
+    instrumentation.geocode_retries.labels(reason="anchor").inc(len(outliers) + len(low_confidence))
+    with instrumentation.stage("regeocode", locations=len(outliers) + len(low_confidence)):
+        retries = await geocode_concurrently(outliers + low_confidence, bias_coords=anchor)
+
+    for loc in outliers:
+        retry = retries[loc]
+        if retry["lat"] is not None:
+            # Verify the retry isn't also an outlier
+            retry_distance = haversine_distance(
+                anchor["lat"], anchor["lng"],
+                retry["lat"], retry["lng"]
+            )
+            if retry_distance <= MAX_OUTLIER_DISTANCE_KM:
+                geocoded[loc] = retry
+            else:
+                # Still an outlier, set to None
+                geocoded[loc] = {"lat": None, "lng": None, "confidence": 0, "raw": None}
+
+    for loc in low_confidence:
+        if retries[loc]["lat"] is not None:
+            geocoded[loc] = retries[loc]
+
+    return geocoded
+
+
+def build_series(event_data: list, geocoded: dict) -> list:
+    """Attach coordinates to each event, keeping its recurrence pattern in one record."""
+    series = []
     for ev in event_data:
         geo = geocoded.get(ev["cleaned_location"], {"lat": None, "lng": None})
+        series.append({
+            "title": ev["name"],
+            "location": ev["original_location"],
+            "start_time": ev["start_time"],
+            "end_time": ev["end_time"],
+            "start_date": ev["start_date"],
+            "end_date": ev["end_date"],
+            "day_codes": ev["day_codes"],
+            "freq": ev["freq"],
+            "interval": ev["interval"],
+            "count": ev["count"],
+            "exdates": [d.isoformat() for d in ev["exdates"]],
+            "rdates": [d.isoformat() for d in ev["rdates"]],
+            "latitude": geo["lat"],
+            "longitude": geo["lng"],
+        })
+
+    return series
+
+
+def expand_series(series: dict, window_start=None, window_end=None):
+    """
+    Yield one event per occurrence of a series.
+    If given, only days in [window_start, window_end) are produced.
+    """
+    dates = occurrences(
+        series["start_date"],
+        until=series["end_date"],
+        count=series.get("count"),
+        freq=series.get("freq") or "WEEKLY",
+        interval=series.get("interval") or 1,
+        day_codes=series["day_codes"],
+        exdates=[date.fromisoformat(d) for d in series["exdates"]],
+        rdates=[date.fromisoformat(d) for d in series.get("rdates") or []],
+        window_start=window_start,
+        window_end=window_end,
+    )
+    for current in dates:
+        yield {
+            "title": series["title"],
+            "location": series["location"],
+            "start_time": series["start_time"],
+            "end_time": series["end_time"],
+            "start_date": current,
+            "end_date": current,
+            "day_codes": [ICAL_TO_WEEKDAY[current.weekday()]],
+            "day_of_week": [calendar.day_name[current.weekday()]],
+            "latitude": series["latitude"],
+            "longitude": series["longitude"],
+        }
+
+
+async def parse_ics_series(file_content: str) -> list:
+    """
+    Parse ICS file and geocode locations, returning one record per event series.
+    CPU-bound parsing runs in a worker thread so the event loop stays free.
+    """
+    with instrumentation.stage("parse"):
+        event_data, locations = await asyncio.to_thread(extract_event_data, file_content)
+    geocoded = await resolve_locations(locations)
+    with instrumentation.stage("build_series"):
+        series = build_series(event_data, geocoded)
+    instrumentation.record_counts(events=len(event_data), locations=len(locations), series=len(series))
+    return series
+
+
+async def parse_ics_async(file_content: str, school_location: str = None):
+    """Parse ICS file and geocode locations, expanding every occurrence."""
+    series = await parse_ics_series(file_content)
+    return [event for s in series for event in expand_series(s)]
+
 
-        current = ev["start_date"]
-        while current <= ev["end_date"]:
-            if ICAL_TO_WEEKDAY[current.weekday()] in ev["day_codes"]:
-                events.append({
-                    "title": ev["name"],
-                    "location": ev["original_location"],
-                    "start_time": ev["start_time"],
-                    "end_time": ev["end_time"],
-                    "start_date": current,
-                    "end_date": current,
-                    "day_codes": [ICAL_TO_WEEKDAY[current.weekday()]],
-                    "day_of_week": [calendar.day_name[current.weekday()]],
-                    "latitude": geo["lat"],
-                    "longitude": geo["lng"],
-                })
-            current += timedelta(days=1)
-
-    return events
+def parse_ics(file_content: str, school_location: str = None):
+    """
+    Synchronous wrapper around parse_ics_async for scripts and tests.
+    school_location parameter is now optional (kept for backwards compatibility).
+    """
+    return asyncio.run(parse_ics_async(file_content, school_location))
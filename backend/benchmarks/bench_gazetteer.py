@@ -0,0 +1,59 @@
+"""
+Benchmark gazetteer lookups against a synthetic multi-campus index.
+
+Every ics_corpus building is placed on each of CAMPUSES campuses, so the
+index holds the same names at several bias points. Exact lookups use the
+registrar's abbreviated spellings; fuzzy ones reorder the words.
+
+Usage (from backend/):
+    python -m benchmarks.bench_gazetteer
+"""
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.gazetteer import Gazetteer
+from benchmarks.ics_corpus import BUILDINGS
+
+CAMPUSES = [1, 20, 200]
+REPEAT = 20_000
+
+
+def build(campuses: int) -> tuple:
+    rng = random.Random(0)
+    gazetteer = Gazetteer()
+    centers = []
+    for c in range(campuses):
+        lat, lng = 30 + c * 0.1, -90 + c * 0.1  # ~14km apart, well outside the bias radius
+        centers.append({"lat": lat, "lng": lng})
+        for name in BUILDINGS:
+            gazetteer.add(name, lat + rng.random() / 100, lng + rng.random() / 100, campus=f"campus-{c}")
+    return gazetteer, centers
+
+
+def main():
+    print(f"{'campuses':>9} {'entries':>8} {'exact us':>9} {'fuzzy us':>9} {'miss us':>8}")
+    for campuses in CAMPUSES:
+        gazetteer, centers = build(campuses)
+        bias = centers[len(centers) // 2]
+        queries = {
+            "exact": "Mechanical Engineering Building",
+            "fuzzy": "Hall New Cabell",
+            "miss": "Student Activities Center",
+        }
+        assert gazetteer.lookup(queries["exact"], bias) and gazetteer.lookup(queries["fuzzy"], bias)
+        timings = {
+            kind: min(timeit.repeat(lambda q=q: gazetteer.lookup(q, bias), number=REPEAT, repeat=3)) / REPEAT
+            for kind, q in queries.items()
+        }
+        print(
+            f"{campuses:>9} {len(gazetteer):>8} {timings['exact'] * 1e6:>9.2f} "
+            f"{timings['fuzzy'] * 1e6:>9.2f} {timings['miss'] * 1e6:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark of the native VEVENT parser against ics.Calendar.
+
+Parses synthetic registrar-style calendars (see ics_corpus) both ways,
+checks that both produce the same event records, and reports the time per
+calendar.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ics_parser
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ics import Calendar
+
+from app.ics_parser import parse_calendar
+from app.utils import event_record
+from benchmarks.ics_corpus import registrar_calendar
+
+SIZES = [5, 40, 200]  # courses per calendar
+
+
+def parse_with_ics(text: str) -> list:
+    return [event_record(event) for event in Calendar(text).events]
+
+
+def best_of(fn, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def sort_key(record: dict) -> tuple:
+    return (record["name"], record["start_date"], record["start_time"], record["original_location"])
+
+
+def main():
+    print(f"{'courses':>8} {'events':>8} {'KiB':>8} {'ics ms':>10} {'native ms':>10} {'speedup':>8}")
+    for courses in SIZES:
+        text = registrar_calendar(courses)
+        expected = sorted(parse_with_ics(text), key=sort_key)
+        actual = sorted(parse_calendar(text), key=sort_key)
+        assert actual == expected, "native parser disagrees with ics"
+
+        repeat = max(3, 200 // courses)
+        ics_time = best_of(parse_with_ics, text, repeat)
+        native_time = best_of(parse_calendar, text, repeat)
+        print(
+            f"{courses:>8} {len(actual):>8} {len(text) / 1024:>8.1f} "
+            f"{ics_time * 1000:>10.2f} {native_time * 1000:>10.2f} {ics_time / native_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Microbenchmark of per-request rate limiter overhead.
+
+Compares the previous list-of-timestamps tracker with SlidingWindowLimiter
+and the shared-memory backend for clients that have already built up an
+hour of history. The shared table lives in the mapped file, so it shows no
+per-client Python memory.
+
+Usage (from backend/):
+    python -m benchmarks.bench_rate_limit
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.middleware.limiter import SlidingWindowLimiter
+from app.middleware.limiter_storage import SharedMemoryStorage
+
+LIMITS = [("burst", 10, 1), ("minute", 60, 60), ("hour", 1000, 3600)]
+CLIENTS = 200
+HISTORY = 900  # requests already in each client's hour window
+REQUESTS = 20_000
+
+
+class ListTracker:
+    """The previous implementation: three timestamp lists per IP, rebuilt on every request."""
+
+    def __init__(self):
+        self.second = defaultdict(list)
+        self.minute = defaultdict(list)
+        self.hour = defaultdict(list)
+
+    def hit(self, ip: str, now: float) -> bool:
+        self.second[ip] = [t for t in self.second[ip] if t >= now - 1]
+        self.minute[ip] = [t for t in self.minute[ip] if t >= now - 60]
+        self.hour[ip] = [t for t in self.hour[ip] if t >= now - 3600]
+        if len(self.second[ip]) >= 10 or len(self.minute[ip]) >= 60 or len(self.hour[ip]) >= 1000:
+            return False
+        self.second[ip].append(now)
+        self.minute[ip].append(now)
+        self.hour[ip].append(now)
+        return True
+
+
+def run(name: str, hit):
+    ips = [f"10.{i // 65536}.{i // 256 % 256}.{i % 256}" for i in range(CLIENTS)]
+
+    tracemalloc.start()
+    # Spread each client's history over the past hour
+    start = 100_000.0
+    for step in range(HISTORY):
+        now = start + step * 3.9
+        for ip in ips:
+            hit(ip, now)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    now = start + HISTORY * 3.9
+    started = time.perf_counter()
+    for i in range(REQUESTS):
+        hit(ips[i % CLIENTS], now + i * 1e-4)
+    elapsed = time.perf_counter() - started
+
+    print(f"{name:<22} {elapsed / REQUESTS * 1e6:>10.2f} {memory / CLIENTS / 1024:>14.1f}")
+
+
+def main():
+    print(f"{CLIENTS} clients with {HISTORY} requests of history each")
+    print(f"{'engine':<22} {'us/request':>10} {'KiB/client':>14}")
+    run("list tracker (old)", ListTracker().hit)
+    limiter = SlidingWindowLimiter(LIMITS)
+    run("sliding window", lambda ip, now: limiter.hit(ip, now).allowed)
+    with tempfile.TemporaryDirectory() as directory:
+        shared = SharedMemoryStorage(LIMITS, path=os.path.join(directory, "rl"), slots=4096)
+        run("shared memory (shm)", lambda ip, now: shared.hit(ip, now).allowed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Requests/sec through the rate limiting middleware.
+
+Compares the previous BaseHTTPMiddleware implementation with the plain
+ASGI one in front of a one-route FastAPI app, calling the ASGI app
+directly so no client or server overhead is counted. Allowed requests
+come from fresh client addresses; rejected ones repeat one address that
+is over its burst limit. The streaming case returns a 16-chunk body.
+
+Usage (from backend/):
+    python -m benchmarks.bench_rate_limit_middleware
+"""
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ["TESTING"] = "false"
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.middleware.limiter_storage import create_storage
+from app.middleware.rate_limit import REJECTIONS, RateLimitMiddleware
+
+REQUESTS = 20_000
+LIMITS = dict(requests_per_minute=60, requests_per_hour=1000, burst_limit=10)
+
+
+class BaseHTTPRateLimit(BaseHTTPMiddleware):
+    """The previous implementation, reduced to the request path being measured."""
+
+    def __init__(self, app, requests_per_minute: int, requests_per_hour: int, burst_limit: int):
+        super().__init__(app)
+        self.requests_per_minute = requests_per_minute
+        limits = [("burst", burst_limit, 1), ("minute", requests_per_minute, 60), ("hour", requests_per_hour, 3600)]
+        self.limiter = create_storage(limits, backend="memory")
+
+    async def dispatch(self, request: Request, call_next):
+        direct_ip = request.client.host if request.client else "unknown"
+        client_ip = request.headers.get("X-Forwarded-For", direct_ip).split(",")[0].strip()
+        result = await self.limiter.check(client_ip)
+        if not result.allowed:
+            detail, retry_after = REJECTIONS[result.window.name]
+            return JSONResponse(status_code=429, content={"detail": detail}, headers={"Retry-After": retry_after})
+        response = await call_next(request)
+        response.headers["X-RateLimit-Limit"] = str(self.requests_per_minute)
+        response.headers["X-RateLimit-Remaining"] = str(result.remaining["minute"])
+        return response
+
+
+def build_app(middleware=None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse((b"x" * 1024 for _ in range(16)), media_type="text/plain")
+
+    if middleware:
+        app.add_middleware(middleware, **LIMITS)
+    return app
+
+
+def scope_for(path: str, client_ip: str) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},  # 2.4: responses skip the disconnect listener
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"x-forwarded-for", client_ip.encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def drive(app, path: str, same_client: bool) -> tuple:
+    statuses = {}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses[message["status"]] = statuses.get(message["status"], 0) + 1
+
+    for i in range(200):  # Warm routing and, for rejections, exhaust the burst window
+        await app(scope_for(path, "10.255.0.1"), receive, send)
+    statuses.clear()
+
+    started = time.perf_counter()
+    for i in range(REQUESTS):
+        client_ip = "10.255.0.1" if same_client else f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+        await app(scope_for(path, client_ip), receive, send)
+    return REQUESTS / (time.perf_counter() - started), statuses
+
+
+def main():
+    cases = [("allowed", "/ping", False), ("rejected", "/ping", True), ("streaming", "/stream", False)]
+    apps = [("no limiter", None), ("BaseHTTPMiddleware (old)", BaseHTTPRateLimit), ("ASGI", RateLimitMiddleware)]
+
+    print(f"{REQUESTS} requests per case")
+    print(f"{'middleware':<26} " + " ".join(f"{name + ' req/s':>16}" for name, _, _ in cases))
+    for name, middleware in apps:
+        rates = []
+        for _, path, same_client in cases:
+            rate, statuses = asyncio.run(drive(build_app(middleware), path, same_client))
+            rates.append(rate)
+        print(f"{name:<26} " + " ".join(f"{rate:>16.0f}" for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
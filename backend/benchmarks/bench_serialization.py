@@ -0,0 +1,103 @@
+"""
+Benchmark serializing session events and distance-matrix results.
+
+The previous path (format each field into a dict, then json.dumps, and
+jsonable_encoder plus JSONResponse for the matrix) is kept here as the
+baseline. Events are expanded from weekly series up front, so only
+serialization is timed.
+
+Usage (from backend/):
+    python -m benchmarks.bench_serialization
+"""
+import json
+import os
+import random
+import sys
+import timeit
+from datetime import date, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("HASHID_SALT", "bench")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.api.routes import _session_body
+from app.responses import DistanceMatrix, MsgspecResponse
+from app.travel_estimate import estimate_matrix
+from app.utils import expand_series
+from benchmarks.ics_corpus import BUILDINGS
+
+EVENT_COUNTS = [100, 1000, 5000]
+GRID_SIZES = [5, 25]
+REPEAT = 20
+
+
+def old_session_body(events: list) -> bytes:
+    payload = {"events": [
+        {
+            "title": e["title"],
+            "location": e["location"],
+            "start": e["start_time"].strftime("%H:%M") if e["start_time"] else None,
+            "end": e["end_time"].strftime("%H:%M") if e["end_time"] else None,
+            "start_date": e["start_date"].isoformat() if e["start_date"] else None,
+            "end_date": e["end_date"].isoformat() if e["end_date"] else None,
+            "dayOfWeek": e["day_of_week"],
+            "latitude": e["latitude"],
+            "longitude": e["longitude"],
+        }
+        for e in events
+    ]}
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def weekly_events(count: int) -> list:
+    """Occurrences of MWF series over a 16-week term, as the session route expands them."""
+    rng = random.Random(0)
+    events = []
+    while len(events) < count:
+        hour = rng.randrange(8, 18)
+        series = {
+            "title": f"COURSE {rng.randrange(1000, 5000)}",
+            "location": rng.choice(BUILDINGS),
+            "start_time": time(hour, 0),
+            "end_time": time(hour, 50),
+            "start_date": date(2025, 1, 13),
+            "end_date": date(2025, 5, 2),
+            "day_codes": ["MO", "WE", "FR"],
+            "exdates": [],
+            "latitude": 38.03 + rng.random() / 50,
+            "longitude": -78.51 + rng.random() / 50,
+        }
+        events.extend(expand_series(series))
+    return events[:count]
+
+
+def best(fn) -> float:
+    return min(timeit.repeat(fn, number=REPEAT, repeat=3)) / REPEAT
+
+
+def main():
+    print(f"{'events':>7} {'old us/event':>13} {'new us/event':>13} {'speedup':>8}")
+    for count in EVENT_COUNTS:
+        events = weekly_events(count)
+        assert json.loads(old_session_body(events)) == json.loads(_session_body(events))
+        old = best(lambda: old_session_body(events))
+        new = best(lambda: _session_body(events))
+        print(f"{count:>7} {old / count * 1e6:>13.3f} {new / count * 1e6:>13.3f} {old / new:>7.1f}x")
+
+    print()
+    print(f"{'grid':>9} {'old us/element':>15} {'new us/element':>15} {'speedup':>8}")
+    rng = random.Random(0)
+    for n in GRID_SIZES:
+        points = [(38.03 + rng.random() / 50, -78.51 + rng.random() / 50) for _ in range(n)]
+        results = estimate_matrix(points, points, "walking")
+        content = {"results": results, "errors": [], "engine": "local"}
+        old = best(lambda: JSONResponse(jsonable_encoder(content)))
+        new = best(lambda: MsgspecResponse(DistanceMatrix(results, [], "local")))
+        print(f"{n:>4}x{n:<4} {old / (n * n) * 1e6:>15.3f} {new / (n * n) * 1e6:>15.3f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Benchmark the offline travel-time estimator.
+
+Usage (from backend/):
+    python -m benchmarks.bench_travel_estimate
+"""
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.travel_estimate import estimate_matrix
+
+SIZES = [5, 25, 100]
+REPEAT = 200
+
+
+def main():
+    random.seed(0)
+    print(f"{'grid':>9} {'ms/matrix':>10} {'us/element':>11}")
+    for n in SIZES:
+        points = [(38.03 + random.random() / 50, -78.51 + random.random() / 50) for _ in range(n)]
+        estimate_matrix(points, points, "walking")  # warm formatting caches
+        seconds = min(timeit.repeat(lambda: estimate_matrix(points, points, "walking"), number=REPEAT, repeat=3)) / REPEAT
+        print(f"{n:>4}x{n:<4} {seconds * 1e3:>10.3f} {seconds / (n * n) * 1e6:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
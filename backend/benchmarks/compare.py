@@ -0,0 +1,68 @@
+"""
+Compare two bench_api result files and flag regressions.
+
+A metric regresses when it is worse than the baseline by more than the
+threshold: latency percentiles and peak RSS going up, or throughput going
+down. Exits with status 1 if anything regressed, so it can gate CI.
+Tail percentiles of short runs move by 10-20% between identical runs;
+compare runs of a few hundred requests or more, from the same machine.
+
+Usage (from backend/):
+    python -m benchmarks.compare base.json head.json
+    python -m benchmarks.compare base.json head.json --threshold 0.2
+"""
+import argparse
+import json
+import sys
+
+# metric -> whether higher is better
+METRICS = {"throughput": True, "p50_ms": False, "p95_ms": False, "p99_ms": False, "peak_rss_mb": False}
+
+
+def compare(base: dict, head: dict, threshold: float) -> list:
+    """Rows of (scenario, endpoint, metric, base, head, change, regressed) for phases in both files."""
+    rows = []
+    for scenario, endpoints in head["scenarios"].items():
+        for endpoint, result in endpoints.items():
+            baseline = base["scenarios"].get(scenario, {}).get(endpoint)
+            if baseline is None:
+                continue
+            for metric, higher_is_better in METRICS.items():
+                before, after = baseline[metric], result[metric]
+                change = (after - before) / before if before else 0.0
+                worse = -change if higher_is_better else change
+                rows.append((scenario, endpoint, metric, before, after, change, worse > threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two bench_api result files")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change that counts as a regression")
+    args = parser.parse_args(argv)
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    for name, doc in (("base", base), ("head", head)):
+        meta = doc["meta"]
+        print(f"{name}: {meta['commit'] or 'unknown'}{' (dirty)' if meta['dirty'] else ''} {meta['timestamp']}")
+    if base["meta"]["config"] != head["meta"]["config"]:
+        print("warning: the runs used different settings, so the numbers are not directly comparable")
+
+    rows = compare(base, head, args.threshold)
+    print(f"{'scenario':<9} {'endpoint':<16} {'metric':<12} {'base':>9} {'head':>9} {'change':>8}")
+    for scenario, endpoint, metric, before, after, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{scenario:<9} {endpoint:<16} {metric:<12} {before:>9.1f} {after:>9.1f} {change:>+8.1%}{flag}")
+
+    regressions = sum(row[-1] for row in rows)
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Synthetic registrar-style ICS exports for benchmarks.
+
+These are generated, not real exports. They imitate what student
+information systems produce: a VTIMEZONE block, weekly RRULEs with UNTIL
+and BYDAY, holiday EXDATEs, folded DESCRIPTION lines with escaped commas,
+and a mix of TZID, UTC and all-day (exam) events.
+"""
+import random
+from datetime import date, timedelta
+
+BUILDINGS = [
+    "Rice Hall", "Thornton Hall", "Olsson Hall", "Mechanical Engr Bldg", "Chemistry Bldg",
+    "Physics Bldg", "Clark Hall", "Gilmer Hall", "Nau Hall", "Monroe Hall", "New Cabell Hall",
+    "Wilson Hall", "Maury Hall", "Bryan Hall", "Robertson Hall", "Ruffner Hall",
+]
+SUBJECTS = ["CS", "APMA", "ECE", "MAE", "CHEM", "PHYS", "MATH", "ECON", "HIST", "STAT", "PSYC", "ENWR"]
+PATTERNS = [["MO", "WE", "FR"], ["TU", "TH"], ["MO", "WE"], ["WE"], ["TH"]]
+HOLIDAYS = [date(2025, 3, 10), date(2025, 3, 12), date(2025, 3, 14), date(2025, 4, 18)]
+TERM_START = date(2025, 1, 13)
+
+VTIMEZONE = [
+    "BEGIN:VTIMEZONE",
+    "TZID:America/New_York",
+    "BEGIN:DAYLIGHT",
+    "TZOFFSETFROM:-0500",
+    "TZOFFSETTO:-0400",
+    "DTSTART:19700308T020000",
+    "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=2SU",
+    "END:DAYLIGHT",
+    "BEGIN:STANDARD",
+    "TZOFFSETFROM:-0400",
+    "TZOFFSETTO:-0500",
+    "DTSTART:19701101T020000",
+    "RRULE:FREQ=YEARLY;BYMONTH=11;BYDAY=1SU",
+    "END:STANDARD",
+    "END:VTIMEZONE",
+]
+
+
+def fold(line: str) -> list:
+    """Fold a content line at 75 characters the way exporters do."""
+    parts = [line[:75]]
+    line = line[75:]
+    while line:
+        parts.append(" " + line[:74])
+        line = line[74:]
+    return parts
+
+
+def building_names(count: int) -> list:
+    """count building names: the real-looking BUILDINGS first, then numbered ones."""
+    return BUILDINGS[:count] + [f"Academic Building {i}" for i in range(len(BUILDINGS), count)]
+
+
+def term_end(weeks: int) -> date:
+    """Last day of classes: the Friday before week weeks + 1 starts."""
+    return TERM_START + timedelta(weeks=weeks) - timedelta(days=3)
+
+
+def course_event(rng: random.Random, index: int, buildings: list = BUILDINGS, last_day: date = term_end(16)) -> list:
+    days = rng.choice(PATTERNS)
+    first = TERM_START + timedelta(days=["MO", "TU", "WE", "TH", "FR"].index(days[0]))
+    hour = rng.randint(8, 17)
+    minute = rng.choice([0, 30])
+    length = 75 if days == ["TU", "TH"] else 50
+    end_hour, end_minute = divmod(hour * 60 + minute + length, 60)
+    subject = rng.choice(SUBJECTS)
+    number = rng.randint(1000, 4999)
+    building = rng.choice(buildings)
+    room = rng.randint(100, 350)
+
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{index}-{subject}{number}@registrar.example.edu",
+        "DTSTAMP:20250105T120000Z",
+        f"DTSTART;TZID=America/New_York:{first:%Y%m%d}T{hour:02d}{minute:02d}00",
+        f"DTEND;TZID=America/New_York:{first:%Y%m%d}T{end_hour:02d}{end_minute:02d}00",
+        f"RRULE:FREQ=WEEKLY;UNTIL={last_day:%Y%m%d}T035959Z;BYDAY={','.join(days)}",
+        "EXDATE;TZID=America/New_York:" + ",".join(f"{d:%Y%m%d}T{hour:02d}{minute:02d}00" for d in HOLIDAYS),
+        f"SUMMARY:{subject} {number} - Lecture",
+        f"LOCATION:{building} {room}",
+    ]
+    lines += fold(
+        f"DESCRIPTION:Section {rng.randint(1, 9):03d}\\, Lecture\\nInstructor: Staff\\nClass nbr "
+        f"{rng.randint(10000, 99999)}\\; enrollment {rng.randint(20, 300)}\\, meets in {building} {room}"
+    )
+    lines.append("END:VEVENT")
+    return lines
+
+
+def exam_event(rng: random.Random, index: int, buildings: list = BUILDINGS, last_day: date = term_end(16)) -> list:
+    day = last_day + timedelta(days=3 + rng.randint(0, 8))
+    return [
+        "BEGIN:VEVENT",
+        f"UID:exam-{index}@registrar.example.edu",
+        f"DTSTART;VALUE=DATE:{day:%Y%m%d}",
+        f"DTEND;VALUE=DATE:{day + timedelta(days=1):%Y%m%d}",
+        f"SUMMARY:Final Exam - {rng.choice(SUBJECTS)} {rng.randint(1000, 4999)}",
+        f"LOCATION:{rng.choice(buildings)} {rng.randint(100, 350)}",
+        "END:VEVENT",
+    ]
+
+
+def lab_event(rng: random.Random, index: int, buildings: list = BUILDINGS, last_day: date = term_end(16)) -> list:
+    """A UTC-timed lab, as calendars re-exported through web calendars appear."""
+    hour = rng.randint(13, 21)
+    return [
+        "BEGIN:VEVENT",
+        f"UID:lab-{index}@registrar.example.edu",
+        f"DTSTART:20250114T{hour:02d}0000Z",
+        f"DTEND:20250114T{hour + 2:02d}0000Z",
+        f"RRULE:FREQ=WEEKLY;UNTIL={last_day - timedelta(days=3):%Y%m%d}T235959Z;BYDAY=TU",
+        f"SUMMARY:{rng.choice(SUBJECTS)} {rng.randint(1000, 4999)} - Laboratory",
+        f"LOCATION:{rng.choice(buildings)} B{rng.randint(1, 40):02d}",
+        "END:VEVENT",
+    ]
+
+
+def registrar_calendar(courses: int, seed: int = 0, buildings: int = len(BUILDINGS), weeks: int = 16) -> str:
+    """
+    A calendar with courses lectures plus roughly one lab per four and one exam per course,
+    held in the first buildings of building_names over a weeks-long term.
+    """
+    rng = random.Random(seed)
+    names = building_names(buildings)
+    last_day = term_end(weeks)
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Example University//Student Records//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+    ] + VTIMEZONE
+    for i in range(courses):
+        lines += course_event(rng, i, names, last_day)
+        if i % 4 == 0:
+            lines += lab_event(rng, i, names, last_day)
+        lines += exam_event(rng, i, names, last_day)
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines) + "\r\n"
@@ -0,0 +1,120 @@
+"""
+Local stand-in for the Google Maps geocoding and Distance Matrix APIs.
+
+Answers the two endpoints the backend calls with deterministic results
+after a fixed delay, so load tests exercise the real googlemaps client and
+the shared httpx pool without network access or quota. Geocodes are
+derived from a hash of the address and land near UVA; distance-matrix
+elements are straight-line distances at walking speed. GET /stats reports
+how many calls each endpoint has served.
+
+Usage (from backend/):
+    python -m benchmarks.mock_google --port 8765 --latency-ms 50
+
+or start it from a benchmark with start_server(), which runs it in a
+child process so it does not compete with the app for the GIL.
+"""
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CENTER = (38.0336, -78.5080)
+WALKING_MPS = 1.4
+
+
+def geocode_result(address: str) -> dict:
+    digest = hashlib.blake2b(address.lower().encode(), digest_size=8).digest()
+    lat = CENTER[0] + (digest[0] / 255 - 0.5) / 50
+    lng = CENTER[1] + (digest[1] / 255 - 0.5) / 50
+    return {
+        "geometry": {"location": {"lat": round(lat, 6), "lng": round(lng, 6)}, "location_type": "ROOFTOP"},
+        "types": ["establishment", "point_of_interest"],
+        "formatted_address": f"{address}, Charlottesville, VA 22904, USA",
+        "place_id": digest.hex(),
+    }
+
+
+def matrix_element(origin: str, destination: str) -> dict:
+    (lat1, lng1), (lat2, lng2) = (map(float, p.split(",")) for p in (origin, destination))
+    meters = math.hypot((lat2 - lat1) * 111_000, (lng2 - lng1) * 111_000 * math.cos(math.radians(lat1)))
+    seconds = round(meters / WALKING_MPS)
+    return {
+        "status": "OK",
+        "distance": {"value": round(meters), "text": f"{meters / 1000:.1f} km"},
+        "duration": {"value": seconds, "text": f"{max(1, seconds // 60)} mins"},
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    latency = 0.0
+    calls = {"geocode": 0, "distancematrix": 0}
+    lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/stats":
+            with self.lock:
+                return self.reply(dict(self.calls))
+        if url.path == "/maps/api/geocode/json":
+            kind, body = "geocode", {"status": "OK", "results": [geocode_result(params.get("address", ""))]}
+        elif url.path == "/maps/api/distancematrix/json":
+            origins, destinations = params["origins"].split("|"), params["destinations"].split("|")
+            rows = [{"elements": [matrix_element(o, d) for d in destinations]} for o in origins]
+            kind, body = "distancematrix", {"status": "OK", "rows": rows}
+        else:
+            return self.reply({"status": "NOT_FOUND"}, 404)
+
+        with self.lock:
+            self.calls[kind] += 1
+        time.sleep(self.latency)
+        self.reply(body)
+
+    def reply(self, body: dict, status: int = 200):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int = 0, latency_ms: float = 50, ready=None):
+    Handler.latency = latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    if ready is not None:
+        ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_server(latency_ms: float = 50) -> tuple:
+    """Run the mock in a child process. Returns (base_url, process); terminate the process when done."""
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(0, latency_ms, ready), daemon=True)
+    process.start()
+    return f"http://127.0.0.1:{ready.get(timeout=10)}", process
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+    print(f"Mock Google Maps on http://127.0.0.1:{args.port} ({args.latency_ms:g}ms per call)")
+    serve(args.port, args.latency_ms)
+
+
+if __name__ == "__main__":
+    main()
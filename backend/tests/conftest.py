@@ -8,7 +8,7 @@ including database setup, mock clients, and sample data.
 import sys
 import os
 from pathlib import Path
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
 from contextlib import contextmanager
 
 import pytest
@@ -51,11 +51,25 @@ def test_db_session(test_engine):
 @pytest.fixture
 def mock_db_session(test_engine, monkeypatch):
     """
-    Mock the get_session function to use test database.
+    Point the async session dependency and the sync get_session at the test database.
     """
+    from sqlalchemy.pool import NullPool
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.database import create_async_sessionmaker, get_async_session
+    os.environ.setdefault("TESTING", "true")  # keeps app.main from initializing the real database
+    from app.main import app
     from app.models import SessionModel, EventModel, ContactSubmission
     SQLModel.metadata.create_all(test_engine)
 
+    # Each TestClient runs its own event loop, so connections are not pooled across them
+    async_session = create_async_sessionmaker(
+        create_async_engine(TEST_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+    )
+
+    async def override_get_async_session():
+        async with async_session() as session:
+            yield session
+
     @contextmanager
     def mock_get_session():
         session = Session(test_engine)
@@ -65,11 +79,55 @@ def mock_db_session(test_engine, monkeypatch):
             session.close()
 
     monkeypatch.setattr("app.database.get_session", mock_get_session)
-    monkeypatch.setattr("app.api.routes.get_session", mock_get_session)
+    monkeypatch.setattr("app.database.async_session", async_session)  # background jobs
+    monkeypatch.setitem(app.dependency_overrides, get_async_session, override_get_async_session)
 
     return test_engine
 
 
+@pytest.fixture(autouse=True)
+def fresh_geocode_cache(monkeypatch):
+    """
+    Give each test an empty, memory-only geocode cache so results
+    from one test's mocked client never leak into another.
+    """
+    from app.geocode_cache import GeocodeCache
+
+    cache = GeocodeCache(durable=False)
+    monkeypatch.setattr("app.geocode_cache.cache", cache)
+    return cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_gazetteer(monkeypatch):
+    """Give each test an empty gazetteer so learned buildings never leak between tests."""
+    from app.gazetteer import Gazetteer
+
+    gazetteer = Gazetteer()
+    monkeypatch.setattr("app.gazetteer.index", gazetteer)
+    return gazetteer
+
+
+@pytest.fixture(autouse=True)
+def fresh_response_cache(monkeypatch):
+    """Give each test an empty, memory-only session response cache."""
+    from app.response_cache import ResponseCache
+
+    cache = ResponseCache(directory=None)
+    monkeypatch.setattr("app.response_cache.cache", cache)
+    return cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_distance_cache(monkeypatch):
+    """Give each test an empty distance-matrix element cache."""
+    from app.distance_cache import DistanceCache
+
+    cache = DistanceCache()
+    monkeypatch.setattr("app.distance_cache.cache", cache)
+    return cache
+
+
 @pytest.fixture
 def mock_google_maps():
     """
@@ -187,7 +245,7 @@ END:VCALENDAR"""
 
 @pytest.fixture
 def mock_httpx_client():
-    """Mock httpx.AsyncClient for distance matrix API tests."""
+    """Mock the shared httpx client for distance matrix API tests."""
     mock_response = Mock()
     mock_response.json.return_value = {
         "status": "OK",
@@ -200,8 +258,8 @@ def mock_httpx_client():
         }]
     }
 
-    with patch('httpx.AsyncClient') as mock_client:
-        mock_instance = MagicMock()
-        mock_instance.__aenter__.return_value.get.return_value = mock_response
-        mock_client.return_value = mock_instance
+    mock_client = MagicMock()
+    mock_client.get = AsyncMock(return_value=mock_response)
+
+    with patch('app.http_client.get_client', return_value=mock_client):
         yield mock_client
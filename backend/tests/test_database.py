@@ -0,0 +1,200 @@
+"""
+Tests for database helpers.
+"""
+
+from datetime import date, time
+from sqlmodel import select
+
+
+class TestInsertSessionWithEvents:
+    """Tests for the bulk session write path."""
+
+    def test_inserts_session_and_series(self, test_db_session):
+        """Test the session and every series row are written together."""
+        from app.database import insert_session_with_events
+        from app.models import SessionModel, EventSeriesModel
+
+        series = [
+            {
+                "title": f"Course {i}",
+                "location": "Rice Hall",
+                "start_time": time(9, 0),
+                "end_time": time(10, 0),
+                "start_date": date(2024, 1, 15),
+                "end_date": date(2024, 5, 1),
+                "day_codes": ["TU", "TH"],
+                "exdates": [],
+                "latitude": 38.03,
+                "longitude": -78.51,
+            }
+            for i in range(3)
+        ]
+
+        session_id, session_uuid = insert_session_with_events(test_db_session, series)
+
+        session = test_db_session.get(SessionModel, session_id)
+        assert session.uuid == session_uuid
+        rows = test_db_session.exec(
+            select(EventSeriesModel).where(EventSeriesModel.session_id == session_id)
+        ).all()
+        assert [r.title for r in rows] == ["Course 0", "Course 1", "Course 2"]
+        assert rows[0].day_codes == ["TU", "TH"]
+
+
+class TestAddMissingColumns:
+    """Tests for the add-missing-columns upgrade step."""
+
+    def test_adds_new_columns_to_existing_table(self, tmp_path):
+        """Test columns added to a model are created with defaults for old rows."""
+        from sqlalchemy import create_engine, inspect, text
+        from app.database import add_missing_columns
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE eventseriesmodel (id INTEGER PRIMARY KEY, session_id INTEGER, "
+                "title VARCHAR, location VARCHAR, start_time TIME, end_time TIME, "
+                "start_date DATE, end_date DATE, day_codes JSON, exdates JSON, "
+                "latitude FLOAT, longitude FLOAT)"
+            ))
+            conn.execute(text("INSERT INTO eventseriesmodel (id, title) VALUES (1, 'Old')"))
+
+        added = add_missing_columns(engine)
+
+        assert {"eventseriesmodel.freq", "eventseriesmodel.interval", "eventseriesmodel.rdates"} <= set(added)
+        columns = {c["name"] for c in inspect(engine).get_columns("eventseriesmodel")}
+        assert {"freq", "interval", "count", "rdates"} <= columns
+        with engine.connect() as conn:
+            row = conn.execute(text("SELECT freq, interval, count FROM eventseriesmodel")).one()
+        assert tuple(row) == ("WEEKLY", 1, None)
+
+        assert add_missing_columns(engine) == []
+
+    def test_indexes_new_columns(self, tmp_path):
+        """Test an index declared on an added column is created too."""
+        from sqlalchemy import create_engine, inspect, text
+        from app.database import add_missing_columns
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE sessionmodel (id INTEGER PRIMARY KEY, uuid VARCHAR, created_at DATE)"))
+
+        added = add_missing_columns(engine)
+
+        assert {"sessionmodel.fingerprint", "sessionmodel.shared_from_id"} <= set(added)
+        indexed = {tuple(i["column_names"]) for i in inspect(engine).get_indexes("sessionmodel")}
+        assert ("fingerprint",) in indexed
+
+
+class TestCreateDbEngine:
+    """Tests for engine pool configuration and stats."""
+
+    def test_pool_settings_applied(self, tmp_path):
+        """Test pool size, overflow, recycle and pre-ping come from arguments."""
+        from app.database import TimedQueuePool, create_db_engine
+        engine = create_db_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}",
+            pool_size=3, max_overflow=2, pool_recycle=60, pool_pre_ping=True,
+        )
+
+        assert isinstance(engine.pool, TimedQueuePool)
+        assert engine.pool.size() == 3
+        assert engine.pool._max_overflow == 2
+        assert engine.pool._recycle == 60
+        assert engine.pool._pre_ping is True
+
+    def test_stats_report_waits_and_timeouts(self, tmp_path):
+        """Test checkouts, pool timeouts and connection ages are reported."""
+        import pytest
+        from sqlalchemy import exc
+        from app.database import create_db_engine, pool_stats
+        engine = create_db_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}", pool_size=1, max_overflow=0, pool_timeout=0.05,
+        )
+
+        held = engine.connect()
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+        stats = pool_stats(engine)
+        held.close()
+
+        assert stats["checked_out"] == 1
+        assert stats["checkouts"] == 2
+        assert stats["timeouts"] == 1
+        assert stats["wait_max_ms"] >= 50
+        assert stats["open_connections"] == 1
+        assert stats["connection_age_max_s"] >= 0
+
+    def test_statement_timeout_connect_args(self):
+        """Test statement_timeout is a startup option except behind PgBouncer."""
+        from app.database import _connect_args
+        url = "postgresql://u:p@db/app"
+
+        assert _connect_args(url, 5000, pgbouncer=False) == {"options": "-c statement_timeout=5000"}
+        assert _connect_args(url, 5000, pgbouncer=True) == {}
+        assert _connect_args(url, 0, pgbouncer=False) == {}
+        assert _connect_args("sqlite:///x.db", 5000, pgbouncer=False) == {"check_same_thread": False}
+
+
+class TestCreateAsyncDbEngine:
+    """Tests for the asyncio engine used by request handlers."""
+
+    def test_async_driver_chosen_from_url(self):
+        """Test sync URLs map to aiosqlite and asyncpg."""
+        from app.database import _async_url
+
+        assert _async_url("sqlite:///./app/database.db") == "sqlite+aiosqlite:///./app/database.db"
+        assert _async_url("postgresql://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+        assert _async_url("postgresql+psycopg2://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+        assert _async_url("postgres://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+
+    def test_pgbouncer_disables_statement_caches(self):
+        """Test asyncpg statement caching is off behind PgBouncer and timeouts use server_settings."""
+        from app.database import _async_connect_args
+        url = "postgresql+asyncpg://u:p@db/app"
+
+        bouncer = _async_connect_args(url, 5000, pgbouncer=True)
+        assert bouncer["statement_cache_size"] == 0
+        assert bouncer["prepared_statement_cache_size"] == 0
+        assert bouncer["prepared_statement_name_func"]() != bouncer["prepared_statement_name_func"]()
+        assert _async_connect_args(url, 5000, pgbouncer=False) == {"server_settings": {"statement_timeout": "5000"}}
+        assert _async_connect_args("sqlite+aiosqlite:///x.db", 5000, pgbouncer=False) == {}
+
+    def test_insert_and_read_back(self, tmp_path):
+        """Test the bulk insert runs on an AsyncSession and uses the timed pool."""
+        import asyncio
+        from datetime import date, time
+        from sqlmodel import SQLModel, select
+        from app.database import (
+            TimedAsyncQueuePool,
+            create_async_db_engine,
+            create_async_sessionmaker,
+            create_db_engine,
+            insert_session_with_events_async,
+            pool_stats,
+        )
+        from app.models import EventSeriesModel
+
+        url = f"sqlite:///{tmp_path / 'async.db'}"
+        SQLModel.metadata.create_all(create_db_engine(url))
+        engine = create_async_db_engine(url, pool_size=2)
+        series = [{
+            "title": "CS 2100", "location": "Rice Hall", "start_time": time(9, 0), "end_time": time(9, 50),
+            "start_date": date(2025, 1, 13), "end_date": date(2025, 5, 2), "day_codes": ["MO", "WE"],
+        }]
+
+        async def run():
+            try:
+                async with create_async_sessionmaker(engine)() as db:
+                    session_id, _ = await insert_session_with_events_async(db, series)
+                    rows = (await db.exec(select(EventSeriesModel).where(EventSeriesModel.session_id == session_id))).all()
+                return rows, pool_stats(engine.sync_engine)
+            finally:
+                await engine.dispose()
+
+        rows, stats = asyncio.run(run())
+
+        assert isinstance(engine.pool, TimedAsyncQueuePool)
+        assert [row.title for row in rows] == ["CS 2100"]
+        assert stats["checkouts"] >= 1
+        assert stats["checked_out"] == 0
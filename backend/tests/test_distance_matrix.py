@@ -0,0 +1,268 @@
+"""
+Tests for distance-matrix fetching and the per-pair element cache.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+
+def _element(seconds: int) -> dict:
+    return {
+        "status": "OK",
+        "duration": {"value": seconds, "text": f"{seconds // 60} mins"},
+        "distance": {"value": seconds * 2, "text": "1.0 km"},
+    }
+
+
+@pytest.fixture(autouse=True)
+def unlimited_budget(monkeypatch):
+    """Keep the shared elements-per-second budget from pacing unrelated tests."""
+    from app.distance_matrix import ElementBudget
+    monkeypatch.setattr("app.distance_matrix.budget", ElementBudget(1_000_000))
+
+
+def _code(coord: str) -> int:
+    return round(float(coord.split(",")[0]) * 100) % 100
+
+
+@pytest.fixture
+def fake_upstream():
+    """
+    Shared client stand-in that answers any grid.
+    Each element's duration encodes the origin and destination latitudes,
+    e.g. 38.01 -> 38.03 gives 103.
+    """
+    calls = []
+
+    async def get(url, params):
+        origins = params["origins"].split("|")
+        destinations = params["destinations"].split("|")
+        calls.append((origins, destinations))
+        response = MagicMock()
+        response.json.return_value = {
+            "status": "OK",
+            "rows": [
+                {"elements": [
+                    _element(_code(o) * 100 + _code(d))
+                    for d in destinations
+                ]}
+                for o in origins
+            ],
+        }
+        return response
+
+    client = MagicMock()
+    client.get = AsyncMock(side_effect=get)
+    with patch("app.http_client.get_client", return_value=client):
+        yield calls
+
+
+class TestQuantize:
+    """Tests for coordinate quantization."""
+
+    def test_nearby_points_share_key(self):
+        """Test coordinates within the precision collapse together."""
+        from app.distance_cache import quantize
+        assert quantize(38.03361, -78.50802) == quantize(38.03364, -78.50798)
+
+    def test_precision_is_configurable(self):
+        """Test coarser precision merges more points."""
+        from app.distance_cache import quantize
+        assert quantize(38.031, -78.508, precision=2) == quantize(38.034, -78.511, precision=2)
+
+
+class TestDistanceCache:
+    """Tests for the element cache."""
+
+    def test_mode_ttls(self):
+        """Test transit entries expire sooner than walking entries."""
+        from app.distance_cache import DistanceCache, MISSING
+        cache = DistanceCache(ttls={"walking": 3600, "transit": 60})
+        a, b = (38.0, -78.0), (38.1, -78.1)
+
+        with patch("app.distance_cache.time.time", return_value=1000.0):
+            cache.set(a, b, "walking", {"duration_seconds": 1})
+            cache.set(a, b, "transit", {"duration_seconds": 2})
+        with patch("app.distance_cache.time.time", return_value=1100.0):
+            assert cache.get(a, b, "walking") == {"duration_seconds": 1}
+            assert cache.get(a, b, "transit") is MISSING
+
+    def test_unroutable_pairs_are_cached(self):
+        """Test a None element is a hit, not a miss."""
+        from app.distance_cache import DistanceCache
+        cache = DistanceCache()
+        cache.set((38.0, -78.0), (10.0, 10.0), "driving", None)
+
+        assert cache.get((38.0, -78.0), (10.0, 10.0), "driving") is None
+
+
+class TestGetMatrix:
+    """Tests for cache-aware matrix resolution."""
+
+    def test_second_request_is_fully_cached(self, fake_upstream):
+        """Test a repeated grid makes no upstream call."""
+        from app.distance_matrix import get_matrix
+        origins = [(38.01, -78.0), (38.02, -78.0)]
+        destinations = [(38.03, -78.0)]
+
+        first, _ = asyncio.run(get_matrix(origins, destinations, "walking", "key"))
+        second, _ = asyncio.run(get_matrix(origins, destinations, "walking", "key"))
+
+        assert first == second
+        assert len(fake_upstream) == 1
+
+    def test_partial_hit_requests_only_missing(self, fake_upstream):
+        """Test only the uncached row is sent upstream and merged into place."""
+        from app.distance_matrix import get_matrix
+        a, b, c = (38.01, -78.0), (38.02, -78.0), (38.03, -78.0)
+
+        asyncio.run(get_matrix([a], [b, c], "walking", "key"))
+        results, _ = asyncio.run(get_matrix([a, b], [b, c], "walking", "key"))
+
+        assert fake_upstream[-1] == (["38.02,-78.0"], ["38.02,-78.0", "38.03,-78.0"])
+        assert results[0][1]["duration_seconds"] == 103
+        assert results[1][1]["duration_seconds"] == 203
+
+    def test_upstream_error_status(self):
+        """Test a non-OK top-level status raises MapsAPIError."""
+        from app.distance_matrix import MapsAPIError, get_matrix
+
+        response = MagicMock()
+        response.json.return_value = {"status": "REQUEST_DENIED"}
+        client = MagicMock()
+        client.get = AsyncMock(return_value=response)
+
+        with patch("app.http_client.get_client", return_value=client):
+            with pytest.raises(MapsAPIError):
+                asyncio.run(get_matrix([(38.0, -78.0)], [(38.1, -78.1)], "walking", "key"))
+
+
+class TestElementBudget:
+    """Tests for upstream pacing."""
+
+    def test_waits_when_budget_spent(self):
+        """Test a request beyond the remaining budget waits for refill."""
+        import time as time_module
+        from app.distance_matrix import ElementBudget
+        budget = ElementBudget(100)
+
+        async def run():
+            await budget.acquire(100)
+            started = time_module.perf_counter()
+            await budget.acquire(20)
+            return time_module.perf_counter() - started
+
+        assert asyncio.run(run()) >= 0.15
+
+
+class TestTiling:
+    """Tests for splitting large grids into upstream-legal tiles."""
+
+    @pytest.mark.parametrize("n_origins,n_destinations", [(1, 1), (25, 25), (40, 7), (100, 100), (3, 80)])
+    def test_tiles_cover_grid_within_limits(self, n_origins, n_destinations):
+        """Test every cell is covered exactly once and no tile exceeds upstream limits."""
+        from app.distance_matrix import plan_tiles, MAX_TILE_ELEMENTS, MAX_TILE_ORIGINS, MAX_TILE_DESTINATIONS
+        covered = []
+        for origin_range, dest_range in plan_tiles(n_origins, n_destinations):
+            assert len(origin_range) <= MAX_TILE_ORIGINS
+            assert len(dest_range) <= MAX_TILE_DESTINATIONS
+            assert len(origin_range) * len(dest_range) <= MAX_TILE_ELEMENTS
+            covered.extend((i, j) for i in origin_range for j in dest_range)
+
+        assert sorted(covered) == [(i, j) for i in range(n_origins) for j in range(n_destinations)]
+
+    def test_large_grid_is_stitched(self, fake_upstream):
+        """Test a 30x30 grid is fetched as several tiles and reassembled in order."""
+        from app.distance_matrix import get_matrix
+        origins = [(38.0 + i / 100, -78.0) for i in range(30)]
+        destinations = [(38.0 + j / 100, -78.1) for j in range(30)]
+
+        results, errors = asyncio.run(get_matrix(origins, destinations, "walking", "key"))
+
+        assert errors == []
+        assert len(fake_upstream) > 1
+        assert all(len(o) * len(d) <= 100 for o, d in fake_upstream)
+        assert results[29][3]["duration_seconds"] == 29 * 100 + 3
+        assert results[0][29]["duration_seconds"] == 29
+
+    def test_tiles_run_concurrently(self):
+        """Test total latency stays near one tile rather than the sum."""
+        import time as time_module
+        from app.distance_matrix import get_matrix
+
+        async def slow_get(url, params):
+            await asyncio.sleep(0.1)
+            n_origins = len(params["origins"].split("|"))
+            n_destinations = len(params["destinations"].split("|"))
+            response = MagicMock()
+            response.json.return_value = {
+                "status": "OK",
+                "rows": [{"elements": [_element(60)] * n_destinations}] * n_origins,
+            }
+            return response
+
+        client = MagicMock()
+        client.get = AsyncMock(side_effect=slow_get)
+        origins = [(38.0 + i / 100, -78.0) for i in range(20)]
+
+        with patch("app.http_client.get_client", return_value=client):
+            started = time_module.perf_counter()
+            asyncio.run(get_matrix(origins, origins, "walking", "key"))
+            elapsed = time_module.perf_counter() - started
+
+        assert client.get.await_count == 4
+        assert elapsed < 0.3
+
+    def test_transient_failure_is_retried(self, monkeypatch):
+        """Test a tile that hits OVER_QUERY_LIMIT once succeeds on retry."""
+        from app.distance_matrix import get_matrix
+        monkeypatch.setattr("app.distance_matrix.RETRY_BACKOFF_SECONDS", 0)
+
+        limited = MagicMock()
+        limited.json.return_value = {"status": "OVER_QUERY_LIMIT"}
+        ok = MagicMock()
+        ok.json.return_value = {"status": "OK", "rows": [{"elements": [_element(60)]}]}
+        client = MagicMock()
+        client.get = AsyncMock(side_effect=[limited, ok])
+
+        with patch("app.http_client.get_client", return_value=client):
+            results, errors = asyncio.run(get_matrix([(38.0, -78.0)], [(38.1, -78.1)], "walking", "key"))
+
+        assert errors == []
+        assert results[0][0]["duration_seconds"] == 60
+
+    def test_partial_failure_is_reported(self, monkeypatch):
+        """Test a failing tile leaves None cells and an error entry, not a 5xx."""
+        from app.distance_matrix import get_matrix
+        monkeypatch.setattr("app.distance_matrix.DISTANCE_MATRIX_CONCURRENCY", 1)
+
+        calls = {"n": 0}
+
+        async def flaky_get(url, params):
+            calls["n"] += 1
+            response = MagicMock()
+            if calls["n"] == 1:
+                response.json.return_value = {"status": "INVALID_REQUEST"}
+            else:
+                n_origins = len(params["origins"].split("|"))
+                n_destinations = len(params["destinations"].split("|"))
+                response.json.return_value = {
+                    "status": "OK",
+                    "rows": [{"elements": [_element(60)] * n_destinations}] * n_origins,
+                }
+            return response
+
+        client = MagicMock()
+        client.get = AsyncMock(side_effect=flaky_get)
+        origins = [(38.0 + i / 100, -78.0) for i in range(20)]
+
+        with patch("app.http_client.get_client", return_value=client):
+            results, errors = asyncio.run(get_matrix(origins, origins, "walking", "key"))
+
+        assert len(errors) == 1
+        assert "INVALID_REQUEST" in errors[0]["error"]
+        failed = [(i, j) for i in errors[0]["origins"] for j in errors[0]["destinations"]]
+        assert all(results[i][j] is None for i, j in failed)
+        assert sum(cell is not None for row in results for cell in row) == 400 - len(failed)
@@ -0,0 +1,186 @@
+"""
+Tests for the campus building gazetteer.
+"""
+
+import json
+
+UVA = {"lat": 38.0336, "lng": -78.5080}
+VT = {"lat": 37.2284, "lng": -80.4234}
+
+
+def _campus():
+    from app.gazetteer import Gazetteer
+    gazetteer = Gazetteer()
+    gazetteer.add("Rice Hall", 38.0316, -78.5108, campus="UVA")
+    gazetteer.add("Thornton Hall", 38.0332, -78.5097, campus="UVA", aliases=["Thornton"])
+    gazetteer.add("Olsson Hall", 38.0322, -78.5106, campus="UVA")
+    gazetteer.add("Mechanical Engineering Building", 38.0328, -78.5113, campus="UVA", aliases=["MEC"])
+    gazetteer.add("Chemistry Building", 38.0337, -78.5118, campus="UVA")
+    gazetteer.add("Chemistry Building", 37.2296, -80.4244, campus="VT")
+    return gazetteer
+
+
+class TestLookup:
+    """Tests for Gazetteer.lookup."""
+
+    def test_exact_name_alias_and_abbreviation(self):
+        """Test names, aliases and abbreviated forms resolve without fuzzy matching."""
+        gazetteer = _campus()
+
+        assert gazetteer.lookup("rice hall")["lat"] == 38.0316
+        assert gazetteer.lookup("MEC")["raw"]["gazetteer"] == "Mechanical Engineering Building"
+        result = gazetteer.lookup("Mech Engr Bldg")
+        assert result["raw"]["match"] == "exact"
+        assert result["confidence"] == 1.0
+
+    def test_fuzzy_tokens(self):
+        """Test reordered or partial names match by token overlap."""
+        gazetteer = _campus()
+
+        result = gazetteer.lookup("Hall Olsson")
+        assert result["raw"]["gazetteer"] == "Olsson Hall"
+        assert result["raw"]["match"] == "fuzzy"
+        assert gazetteer.lookup("Hall") is None
+        assert gazetteer.lookup("Student Union") is None
+
+    def test_adding_keeps_unrelated_fuzzy_answers(self):
+        """Test a new entry only invalidates memoized fuzzy answers that share one of its tokens."""
+        gazetteer = _campus()
+        assert gazetteer.lookup("Hall Olsson")["raw"]["gazetteer"] == "Olsson Hall"
+        assert gazetteer.lookup("Building Chemistry", UVA)["raw"]["gazetteer"] == "Chemistry Building"
+
+        gazetteer.add("Olsson Annex", 38.0323, -78.5107, campus="UVA")
+
+        assert "hall olsson" not in gazetteer._fuzzy
+        assert "building chemistry" in gazetteer._fuzzy
+        assert gazetteer.lookup("Hall Olsson")["raw"]["gazetteer"] == "Olsson Hall"
+
+    def test_shared_name_needs_bias(self):
+        """Test a name on two campuses resolves only when a bias point picks one."""
+        gazetteer = _campus()
+
+        assert gazetteer.lookup("Chemistry Building") is None
+        assert gazetteer.lookup("Chem Bldg", VT)["raw"]["campus"] == "VT"
+        assert gazetteer.lookup("Chem Bldg", UVA)["raw"]["campus"] == "UVA"
+        assert gazetteer.lookup("Rice Hall", VT) is None
+        assert gazetteer.stats()["unresolved"] == 2
+
+
+class TestLoading:
+    """Tests for bulk loading."""
+
+    def test_csv_and_geojson(self, tmp_path):
+        """Test CSV rows and GeoJSON points and polygons are indexed with their aliases."""
+        from app.gazetteer import Gazetteer
+        csv_path = tmp_path / "uva.csv"
+        csv_path.write_text("name,lat,lng,campus,aliases\nNew Cabell Hall,38.0329,-78.5050,UVA,NCH|New Cabell\n")
+        geojson_path = tmp_path / "uva.geojson"
+        geojson_path.write_text(json.dumps({"type": "FeatureCollection", "features": [
+            {"type": "Feature", "properties": {"name": "Clark Hall", "aliases": ["Clark"]},
+             "geometry": {"type": "Point", "coordinates": [-78.5079, 38.0331]}},
+            {"type": "Feature", "properties": {"name": "Nau Hall"},
+             "geometry": {"type": "Polygon", "coordinates": [[[-78.51, 38.03], [-78.50, 38.03], [-78.50, 38.04], [-78.51, 38.04], [-78.51, 38.03]]]}},
+        ]}))
+        gazetteer = Gazetteer()
+
+        assert gazetteer.load(csv_path) + gazetteer.load(geojson_path) == 3
+        assert gazetteer.lookup("NCH")["lng"] == -78.5050
+        assert gazetteer.lookup("Clark")["lat"] == 38.0331
+        nau = gazetteer.lookup("Nau Hall")
+        assert (round(nau["lat"], 3), round(nau["lng"], 3)) == (38.035, -78.505)
+
+
+class TestLearning:
+    """Tests for learning from geocoder results."""
+
+    def test_learns_high_confidence_results(self, tmp_path):
+        """Test confident results are indexed and persisted, and weak ones are ignored."""
+        from app.gazetteer import Gazetteer, build_index
+        learned_path = tmp_path / "learned.csv"
+        gazetteer = Gazetteer(learn_confidence=0.9, learned_path=str(learned_path))
+
+        gazetteer.learn("Gilmer Hall", {"lat": 38.0343, "lng": -78.5135, "confidence": 1.0})
+        gazetteer.learn("Some Annex", {"lat": 38.1, "lng": -78.6, "confidence": 0.6})
+
+        assert gazetteer.lookup("Gilmer Hall")["lat"] == 38.0343
+        assert gazetteer.lookup("Some Annex") is None
+        reloaded = build_index(paths="", learned_path=str(learned_path))
+        assert reloaded.lookup("Gilmer Hall")["lng"] == -78.5135
+
+    def test_learning_is_capped(self, tmp_path):
+        """Test nothing more is learned or persisted once max_learned entries are, counting reloaded ones."""
+        from app.gazetteer import Gazetteer
+        learned_path = tmp_path / "learned.csv"
+        gazetteer = Gazetteer(learned_path=str(learned_path), max_learned=2)
+
+        for i in range(4):
+            gazetteer.learn(f"Annex {i}", {"lat": 38 + i, "lng": -78.0, "confidence": 1.0})
+
+        assert len(gazetteer) == 2
+        assert gazetteer.lookup("Annex 2") is None
+        assert len(learned_path.read_text().splitlines()) == 3  # Header and two rows
+
+        reloaded = Gazetteer(learned_path=str(learned_path), max_learned=2)
+        reloaded.load(learned_path, learned=True)
+        reloaded.learn("Annex 5", {"lat": 45.0, "lng": -78.0, "confidence": 1.0})
+        assert len(reloaded) == 2
+
+    def test_learned_entries_expire(self, tmp_path, monkeypatch):
+        """Test learned entries stop resolving after learned_ttl, and expired rows are dropped on reload."""
+        from app import gazetteer as module
+        from app.gazetteer import Gazetteer
+        learned_path = tmp_path / "learned.csv"
+        gazetteer = Gazetteer(learned_path=str(learned_path), learned_ttl=100)
+        gazetteer.add("Rice Hall", 38.0316, -78.5108)
+
+        now = 1_000_000.0
+        monkeypatch.setattr(module.time, "time", lambda: now)
+        gazetteer.learn("Gilmer Hall", {"lat": 38.0343, "lng": -78.5135, "confidence": 1.0})
+        now += 50
+        gazetteer.learn("Some Annex", {"lat": 38.1, "lng": -78.6, "confidence": 1.0})
+        assert gazetteer.lookup("Gilmer Hall") is not None
+
+        now += 60
+        assert gazetteer.lookup("Gilmer Hall") is None
+        assert gazetteer.lookup("Rice Hall") is not None
+        assert len(gazetteer) == 2
+        gazetteer.learn("Gilmer Hall", {"lat": 38.0344, "lng": -78.5136, "confidence": 1.0})
+        assert gazetteer.lookup("Gilmer Hall")["lat"] == 38.0344
+
+        reloaded = Gazetteer(learned_path=str(learned_path), learned_ttl=100)
+        now += 60
+        assert reloaded.load(learned_path, learned=True) == 1
+        assert reloaded.lookup("Some Annex") is None
+        assert reloaded.lookup("Gilmer Hall")["lat"] == 38.0344
+        assert len(learned_path.read_text().splitlines()) == 2  # Header and the unexpired row
+
+    def test_rows_without_learned_at_are_not_reloaded(self, tmp_path):
+        """Test learned rows written before expiry existed are refreshed from the geocoder."""
+        from app.gazetteer import Gazetteer
+        learned_path = tmp_path / "learned.csv"
+        learned_path.write_text("name,lat,lng,campus,aliases\nGilmer Hall,38.0343,-78.5135,,\n")
+
+        assert Gazetteer().load(learned_path, learned=True) == 0
+
+    def test_geocode_location_skips_google_for_known_buildings(self, fresh_gazetteer, mock_google_maps, monkeypatch):
+        """Test known buildings resolve locally and new confident geocodes are learned."""
+        from app.utils import geocode_location
+        monkeypatch.setattr("app.gazetteer.GAZETTEER_LEARN", True)
+        fresh_gazetteer.add("Rice Hall", 38.0316, -78.5108)
+
+        assert geocode_location("Rice Hall")["lat"] == 38.0316
+        assert mock_google_maps.geocode.call_count == 0
+
+        geocode_location("University of Virginia")
+        assert mock_google_maps.geocode.call_count == 1
+        assert fresh_gazetteer.lookup("University of Virginia")["lat"] == 38.0293
+
+    def test_biased_geocodes_are_not_learned(self, fresh_gazetteer, mock_google_maps, monkeypatch):
+        """Test a result found within one campus's bounds is not learned as a name-only entry."""
+        from app.utils import geocode_location
+        monkeypatch.setattr("app.gazetteer.GAZETTEER_LEARN", True)
+
+        geocode_location("University of Virginia", {"lat": 38.03, "lng": -78.5})
+
+        assert mock_google_maps.geocode.call_count == 1
+        assert fresh_gazetteer.lookup("University of Virginia") is None
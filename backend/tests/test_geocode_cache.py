@@ -0,0 +1,162 @@
+"""
+Unit tests for the geocode cache.
+
+Covers the LRU tier, TTL and negative caching, the durable database
+tier, and the integration with geocode_location.
+"""
+
+import pytest
+from contextlib import contextmanager
+from unittest.mock import patch
+from sqlmodel import Session, select
+
+
+HIT = {"lat": 38.0293, "lng": -78.4767, "confidence": 0.9, "raw": {"types": ["university"]}}
+MISS = {"lat": None, "lng": None, "confidence": 0, "raw": None}
+
+
+@pytest.fixture
+def durable_cache(test_engine):
+    """Cache whose durable tier writes to the test database."""
+    from app.geocode_cache import GeocodeCache
+    from app.models import GeocodeCacheEntry
+
+    @contextmanager
+    def session_factory():
+        session = Session(test_engine)
+        try:
+            yield session
+        finally:
+            session.close()
+
+    with session_factory() as db:
+        for entry in db.exec(select(GeocodeCacheEntry)).all():
+            db.delete(entry)
+        db.commit()
+
+    return GeocodeCache(session_factory=session_factory)
+
+
+class TestCacheKey:
+    """Tests for make_cache_key."""
+
+    def test_normalizes_case_and_whitespace(self):
+        """Test equivalent addresses share a key."""
+        from app.geocode_cache import make_cache_key
+        assert make_cache_key("  Rice  Hall ") == make_cache_key("rice hall")
+
+    def test_bias_changes_key(self):
+        """Test biased and unbiased lookups are cached separately."""
+        from app.geocode_cache import make_cache_key
+        bias = {"lat": 38.03, "lng": -78.48}
+        assert make_cache_key("Rice Hall") != make_cache_key("Rice Hall", bias)
+
+
+class TestMemoryTier:
+    """Tests for the in-process LRU tier."""
+
+    def test_hit_after_set(self):
+        """Test a stored result is returned on the next lookup."""
+        from app.geocode_cache import GeocodeCache
+        cache = GeocodeCache(durable=False)
+        cache.set("Rice Hall", None, HIT)
+
+        assert cache.get("Rice Hall")["lat"] == HIT["lat"]
+        assert cache.stats()["memory_hits"] == 1
+
+    def test_miss_counted(self):
+        """Test unknown addresses count as misses."""
+        from app.geocode_cache import GeocodeCache
+        cache = GeocodeCache(durable=False)
+
+        assert cache.get("Nowhere") is None
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["hit_ratio"] == 0.0
+
+    def test_lru_eviction(self):
+        """Test least recently used entries are evicted first."""
+        from app.geocode_cache import GeocodeCache
+        cache = GeocodeCache(max_entries=2, durable=False)
+        cache.set("a", None, HIT)
+        cache.set("b", None, HIT)
+        cache.get("a")
+        cache.set("c", None, HIT)
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        """Test entries expire after the TTL."""
+        from app.geocode_cache import GeocodeCache
+        cache = GeocodeCache(ttl=10, durable=False)
+
+        with patch("app.geocode_cache.time.time", return_value=1000.0):
+            cache.set("Rice Hall", None, HIT)
+        with patch("app.geocode_cache.time.time", return_value=1011.0):
+            assert cache.get("Rice Hall") is None
+
+    def test_negative_result_uses_negative_ttl(self):
+        """Test failed geocodes are cached with the shorter TTL."""
+        from app.geocode_cache import GeocodeCache
+        cache = GeocodeCache(ttl=100, negative_ttl=5, durable=False)
+
+        with patch("app.geocode_cache.time.time", return_value=1000.0):
+            cache.set("Nowhere", None, MISS)
+        with patch("app.geocode_cache.time.time", return_value=1003.0):
+            assert cache.get("Nowhere")["lat"] is None
+        with patch("app.geocode_cache.time.time", return_value=1006.0):
+            assert cache.get("Nowhere") is None
+
+        assert cache.stats()["negative_hits"] == 1
+
+
+class TestDurableTier:
+    """Tests for the database-backed tier."""
+
+    def test_survives_memory_clear(self, durable_cache):
+        """Test results are reloaded from the database after a restart."""
+        durable_cache.set("Rice Hall", None, HIT)
+        durable_cache.clear()
+
+        result = durable_cache.get("Rice Hall")
+        assert result["lat"] == HIT["lat"]
+        assert result["raw"] == HIT["raw"]
+        assert durable_cache.stats()["durable_hits"] == 1
+
+    def test_overwrites_existing_key(self, durable_cache):
+        """Test a second write replaces the stored row."""
+        durable_cache.set("Rice Hall", None, MISS)
+        durable_cache.set("Rice Hall", None, HIT)
+        durable_cache.clear()
+
+        assert durable_cache.get("Rice Hall")["lat"] == HIT["lat"]
+
+
+class TestGeocodeLocationCaching:
+    """Tests for geocode_location going through the cache."""
+
+    def test_repeat_lookup_skips_client(self, mock_google_maps):
+        """Test the second lookup is served from the cache."""
+        from app.utils import geocode_location
+        geocode_location("Rice Hall")
+        geocode_location("rice hall")
+
+        assert mock_google_maps.geocode.call_count == 1
+
+    def test_empty_result_is_cached(self, mock_google_maps_empty):
+        """Test a no-results response is remembered."""
+        from app.utils import geocode_location
+        geocode_location("Nowhere")
+        result = geocode_location("Nowhere")
+
+        assert result["lat"] is None
+        assert mock_google_maps_empty.geocode.call_count == 1
+
+    def test_errors_are_not_cached(self, mock_google_maps_error):
+        """Test transient failures are retried on the next lookup."""
+        from app.utils import geocode_location
+        geocode_location("Rice Hall")
+        geocode_location("Rice Hall")
+
+        assert mock_google_maps_error.geocode.call_count == 2
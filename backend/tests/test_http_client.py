@@ -0,0 +1,52 @@
+"""
+Tests for the shared upstream HTTP client.
+"""
+
+import asyncio
+
+import httpx
+
+
+class TestPooledAsyncClient:
+    """Tests for request tracking on the pooled client."""
+
+    def test_tracks_requests_and_errors(self):
+        """Test completed and failed requests are counted and in-flight returns to zero."""
+        from app.http_client import PooledAsyncClient
+
+        def handler(request):
+            if request.url.path == "/fail":
+                raise httpx.ConnectError("boom", request=request)
+            return httpx.Response(200, json={"status": "OK"})
+
+        async def run():
+            async with PooledAsyncClient(transport=httpx.MockTransport(handler)) as client:
+                await client.get("https://maps.example/ok")
+                try:
+                    await client.get("https://maps.example/fail")
+                except httpx.ConnectError:
+                    pass
+                return dict(client.stats)
+
+        stats = asyncio.run(run())
+
+        assert stats["requests"] == 2
+        assert stats["errors"] == 1
+        assert stats["in_flight"] == 0
+        assert stats["peak_in_flight"] == 1
+
+    def test_lifespan_helpers_reuse_client(self):
+        """Test get_client returns the same pooled client until closed."""
+        from app import http_client
+
+        async def run():
+            await http_client.start()
+            first = http_client.get_client()
+            second = http_client.get_client()
+            await http_client.close()
+            return first, second
+
+        first, second = asyncio.run(run())
+
+        assert first is second
+        assert first.is_closed
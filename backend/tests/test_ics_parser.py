@@ -0,0 +1,170 @@
+"""
+Tests for the native iCalendar parser.
+"""
+
+from datetime import date, time
+
+import pytest
+
+
+REGISTRAR_ICS = "\r\n".join([
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "PRODID:-//Example University//Student Records//EN",
+    "BEGIN:VTIMEZONE",
+    "TZID:America/New_York",
+    "BEGIN:STANDARD",
+    "TZOFFSETFROM:-0400",
+    "TZOFFSETTO:-0500",
+    "DTSTART:19701101T020000",
+    "END:STANDARD",
+    "END:VTIMEZONE",
+    "BEGIN:VEVENT",
+    "DTSTART;TZID=America/New_York:20250113T090000",
+    "DTEND;TZID=America/New_York:20250113T095000",
+    "RRULE:FREQ=WEEKLY;UNTIL=20250502T035959Z;BYDAY=MO,WE,FR",
+    "EXDATE;TZID=America/New_York:20250310T090000,20250312T090000",
+    "EXDATE:20250418T090000",
+    "RDATE;VALUE=PERIOD:20250503T090000/PT2H",
+    "SUMMARY:CS 2100 - Data Structures\\, Lecture",
+    "LOCATION;ALTREP=\"http://maps.example.edu:80/rice\":Rice Hall 130",
+    "DESCRIPTION:Section 001\\nInstructor: Staff\\; ",
+    " enrollment 300",
+    "END:VEVENT",
+    "BEGIN:VEVENT",
+    "DTSTART:20250114T180000Z",
+    "DURATION:PT1H50M",
+    "RRULE:FREQ=WEEKLY;UNTIL=20250429T235959Z;BYDAY=TU",
+    "SUMMARY:PHYS 1429 - Laboratory",
+    "LOCATION:Physics Bldg B04",
+    "END:VEVENT",
+    "BEGIN:VEVENT",
+    "DTSTART;VALUE=DATE:20250507",
+    "DTEND;VALUE=DATE:20250508",
+    "SUMMARY:Final Exam",
+    "END:VEVENT",
+    "END:VCALENDAR",
+]) + "\r\n"
+
+
+def _sorted(records):
+    return sorted(records, key=lambda r: (r["name"], r["start_date"]))
+
+
+class TestParseCalendar:
+    """Tests for parse_calendar."""
+
+    def test_matches_ics(self, sample_ics_content):
+        """Test the native parser produces the same records as the ics path."""
+        from ics import Calendar
+        from app.ics_parser import parse_calendar
+        from app.utils import event_record
+
+        for text in (REGISTRAR_ICS, sample_ics_content):
+            expected = [event_record(event) for event in Calendar(text).events]
+            assert _sorted(parse_calendar(text)) == _sorted(expected)
+
+    def test_registrar_fields(self):
+        """Test TZID, UTC, all-day, recurrence and escaped values are read."""
+        from app.ics_parser import parse_calendar
+        lecture, exam, lab = _sorted(parse_calendar(REGISTRAR_ICS))
+
+        assert lecture["name"] == "CS 2100 - Data Structures, Lecture"
+        assert lecture["original_location"] == "Rice Hall 130"
+        assert lecture["start_time"] == time(9, 0)
+        assert lecture["end_time"] == time(9, 50)
+        assert lecture["end_date"] == date(2025, 5, 2)
+        assert lecture["day_codes"] == ["MO", "WE", "FR"]
+        assert lecture["exdates"] == [date(2025, 3, 10), date(2025, 3, 12), date(2025, 4, 18)]
+        assert lecture["rdates"] == [date(2025, 5, 3)]
+
+        assert lab["start_time"] == time(18, 0)
+        assert lab["end_time"] == time(19, 50)
+
+        assert exam["name"] == "Final Exam"
+        assert exam["day_codes"] == ["WE"]
+        assert exam["start_time"] == time(0, 0)
+
+    def test_nested_alarm_ignored(self):
+        """Test VALARM properties do not leak into the event."""
+        from app.ics_parser import parse_calendar
+        text = (
+            "BEGIN:VCALENDAR\nBEGIN:VEVENT\nDTSTART:20250113T090000\nSUMMARY:Class\n"
+            "BEGIN:VALARM\nTRIGGER:-PT15M\nSUMMARY:Reminder\nEND:VALARM\nEND:VEVENT\nEND:VCALENDAR\n"
+        )
+
+        [record] = parse_calendar(text)
+
+        assert record["name"] == "Class"
+
+    def test_falls_back_to_ics(self, monkeypatch):
+        """Test events the native parser rejects are parsed with ics."""
+        import app.ics_parser as ics_parser
+
+        def unsupported(lines):
+            raise ics_parser.UnsupportedEvent("test")
+
+        monkeypatch.setattr(ics_parser, "parse_event", unsupported)
+        records = ics_parser.parse_calendar(REGISTRAR_ICS)
+
+        assert len(records) == 3
+        assert {r["name"] for r in records} >= {"Final Exam"}
+
+    def test_rejects_bad_dates(self):
+        """Test malformed DTSTART values are reported as unsupported."""
+        from app.ics_parser import UnsupportedEvent, parse_event
+
+        with pytest.raises(UnsupportedEvent):
+            parse_event(["BEGIN:VEVENT", "DTSTART:2025011", "END:VEVENT"])
+
+
+class TestUnescape:
+    """Tests for unescape."""
+
+    def test_text_escapes(self):
+        """Test commas, semicolons, backslashes and newlines are unescaped."""
+        from app.ics_parser import unescape
+        assert unescape("a\\, b\\; c\\nd\\\\e\\Nf") == "a, b; c\nd\\e\nf"
+
+
+class TestComponentTokenizer:
+    """Tests for ComponentTokenizer."""
+
+    def test_unfolds_across_chunk_boundaries(self):
+        """Test folded lines and CRLFs split between chunks are joined."""
+        from app.ics_parser import ComponentTokenizer
+        text = (
+            "BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nSUMMARY:Intro to\r\n  Algorithms\r\n"
+            "LOCATION:Rice\r\n\tHall\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n"
+        )
+        tokenizer = ComponentTokenizer()
+        components = []
+        for char in text:
+            components.extend(tokenizer.feed(char))
+        components.extend(tokenizer.close())
+
+        assert components == [(
+            "VEVENT",
+            ["BEGIN:VEVENT", "SUMMARY:Intro to Algorithms", "LOCATION:RiceHall", "END:VEVENT"],
+        )]
+
+    def test_nested_components_stay_in_parent(self):
+        """Test VALARM lines stay inside their VEVENT and VTIMEZONE is kept."""
+        from app.ics_parser import ComponentTokenizer
+        tokenizer = ComponentTokenizer()
+        components = tokenizer.feed(
+            "BEGIN:VCALENDAR\nBEGIN:VTIMEZONE\nTZID:X\nBEGIN:STANDARD\nEND:STANDARD\nEND:VTIMEZONE\n"
+            "BEGIN:VEVENT\nBEGIN:VALARM\nEND:VALARM\nEND:VEVENT\nBEGIN:VTODO\nEND:VTODO\nEND:VCALENDAR"
+        ) + tokenizer.close()
+
+        assert [name for name, _ in components] == ["VTIMEZONE", "VEVENT"]
+        assert components[1][1] == ["BEGIN:VEVENT", "BEGIN:VALARM", "END:VALARM", "END:VEVENT"]
+
+    def test_rejects_non_calendar(self):
+        """Test text without a VCALENDAR is an error, not an empty calendar."""
+        from app.ics_parser import ComponentTokenizer
+        tokenizer = ComponentTokenizer()
+        tokenizer.feed("not a calendar")
+
+        with pytest.raises(ValueError):
+            tokenizer.close()
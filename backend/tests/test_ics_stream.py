@@ -0,0 +1,146 @@
+"""
+Tests for streaming ICS ingestion.
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+
+class FakeUpload:
+    """Stand-in for UploadFile that records how much was read."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.position = 0
+
+    async def read(self, size: int = -1) -> bytes:
+        chunk = self.data[self.position:self.position + size]
+        self.position += len(chunk)
+        return chunk
+
+
+async def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def _collect(agen) -> list:
+    return [item async for item in agen]
+
+
+class TestReadChunks:
+    """Tests for read_chunks."""
+
+    def test_rejects_while_reading(self):
+        """Test an oversized upload is rejected without reading all of it."""
+        from app.ics_stream import UploadTooLarge, read_chunks
+        upload = FakeUpload(b"X" * 1000)
+
+        with pytest.raises(UploadTooLarge):
+            asyncio.run(_collect(read_chunks(upload, max_size=250, chunk_size=100)))
+
+        assert upload.position == 300
+
+    def test_reads_everything_under_limit(self):
+        """Test uploads within the limit are passed through unchanged."""
+        from app.ics_stream import read_chunks
+        upload = FakeUpload(b"abcdefghij")
+
+        chunks = asyncio.run(_collect(read_chunks(upload, max_size=10, chunk_size=4)))
+
+        assert chunks == [b"abcd", b"efgh", b"ij"]
+
+
+class TestParseIcsStream:
+    """Tests for parse_ics_stream."""
+
+    @patch('app.utils.gmaps')
+    def test_matches_whole_file_parse(self, mock_gmaps, sample_ics_content):
+        """Test streaming in tiny chunks gives the same series as parsing the whole file."""
+        mock_gmaps.geocode.return_value = [{
+            'geometry': {'location': {'lat': 38.03, 'lng': -78.48}, 'location_type': 'ROOFTOP'},
+            'types': ['establishment'],
+            'formatted_address': 'Test Building',
+        }]
+        from app.ics_stream import parse_ics_stream
+        from app.utils import parse_ics_series
+
+        streamed = asyncio.run(parse_ics_stream(_chunks(sample_ics_content.encode(), 7)))
+        whole = asyncio.run(parse_ics_series(sample_ics_content))
+
+        key = lambda s: (s["title"], s["start_date"])
+        assert sorted(streamed, key=key) == sorted(whole, key=key)
+
+    @patch('app.utils.gmaps')
+    def test_multibyte_split_between_chunks(self, mock_gmaps):
+        """Test a UTF-8 character split across chunks decodes correctly."""
+        mock_gmaps.geocode.return_value = []
+        from app.ics_stream import parse_ics_stream
+        content = (
+            "BEGIN:VCALENDAR\nVERSION:2.0\nPRODID:test\nBEGIN:VEVENT\n"
+            "DTSTART:20250113T090000\nDTEND:20250113T100000\nSUMMARY:Café Hour\n"
+            "END:VEVENT\nEND:VCALENDAR\n"
+        ).encode()
+
+        series = asyncio.run(parse_ics_stream(_chunks(content, 1)))
+
+        assert series[0]["title"] == "Café Hour"
+
+    @patch('app.utils.gmaps')
+    def test_geocodes_each_location_once(self, mock_gmaps, sample_ics_content):
+        """Test repeated locations start a single first-pass geocode."""
+        mock_gmaps.geocode.return_value = []
+        from app.ics_stream import parse_ics_stream
+
+        asyncio.run(parse_ics_stream(_chunks(sample_ics_content.encode(), 64)))
+
+        addresses = [call.kwargs["address"] for call in mock_gmaps.geocode.call_args_list]
+        assert len(addresses) == len(set(addresses))
+
+    @patch('app.utils.gmaps')
+    def test_retries_transient_geocode_failures(self, mock_gmaps):
+        """Test a location whose geocode failed transiently is tried again."""
+        result = [{
+            'geometry': {'location': {'lat': 38.03, 'lng': -78.48}, 'location_type': 'ROOFTOP'},
+            'types': ['establishment'],
+            'formatted_address': 'Rice Hall',
+        }]
+        mock_gmaps.geocode.side_effect = [Exception("timeout"), result, result]
+        from app.ics_stream import read_ics_stream
+        content = (
+            "BEGIN:VCALENDAR\nVERSION:2.0\nPRODID:test\nBEGIN:VEVENT\n"
+            "DTSTART:20250113T090000\nDTEND:20250113T100000\nSUMMARY:CS\nLOCATION:Rice Hall\n"
+            "END:VEVENT\nEND:VCALENDAR\n"
+        ).encode()
+
+        async def run():
+            upload = await read_ics_stream(_chunks(content, 64))
+            return await upload.series(attempts=2, backoff=0)
+
+        series = asyncio.run(run())
+
+        assert series[0]["latitude"] == 38.03
+
+
+class TestScheduleFingerprint:
+    """Tests for schedule_fingerprint."""
+
+    def test_ignores_order_and_export_metadata(self, sample_ics_content):
+        """Test reordered events and new DTSTAMP/UID/DESCRIPTION lines keep the fingerprint."""
+        from app.ics_parser import parse_calendar
+        from app.ics_stream import schedule_fingerprint
+        reexported = sample_ics_content.replace("UID:test-event-", "DTSTAMP:20250101T000000Z\nDESCRIPTION:x\nUID:new-")
+
+        original = parse_calendar(sample_ics_content)
+        assert schedule_fingerprint(original) == schedule_fingerprint(parse_calendar(reexported))
+        assert schedule_fingerprint(original) == schedule_fingerprint(list(reversed(original)))
+
+    def test_changes_with_schedule(self, sample_ics_content):
+        """Test a moved class gets a different fingerprint."""
+        from app.ics_parser import parse_calendar
+        from app.ics_stream import schedule_fingerprint
+        moved = sample_ics_content.replace("DTSTART:20240115T100000", "DTSTART:20240115T110000")
+
+        assert schedule_fingerprint(parse_calendar(sample_ics_content)) != schedule_fingerprint(parse_calendar(moved))
@@ -0,0 +1,69 @@
+"""
+Tests for upload pipeline instrumentation.
+"""
+
+from io import BytesIO
+
+import pytest
+
+
+def _sample(name: str, **labels) -> float:
+    from prometheus_client import REGISTRY
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestStage:
+    """Tests for the stage timer."""
+
+    def test_records_histogram(self):
+        """Test each stage block adds one observation under its label."""
+        from app import instrumentation
+
+        before = _sample("routify_upload_stage_seconds_count", stage="unit_test")
+        with instrumentation.stage("unit_test"):
+            pass
+        instrumentation.observe_stage("unit_test", 0.5)
+
+        assert _sample("routify_upload_stage_seconds_count", stage="unit_test") == before + 2
+
+    def test_records_span_when_tracing(self, monkeypatch):
+        """Test stages become spans with their attributes when a tracer is configured."""
+        pytest.importorskip("opentelemetry.sdk")
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+        from app import instrumentation
+
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        monkeypatch.setattr(instrumentation, "tracer", provider.get_tracer("test"))
+
+        with pytest.raises(ValueError):
+            with instrumentation.stage("parse", locations=3):
+                raise ValueError("bad calendar")
+
+        (span,) = exporter.get_finished_spans()
+        assert span.name == "upload.parse"
+        assert span.attributes["locations"] == 3
+        assert not span.status.is_ok
+
+
+class TestUploadInstrumentation:
+    """Tests for the stages and counts recorded by an upload."""
+
+    def test_upload_records_stages_and_counts(self, test_client, sample_ics_content):
+        """Test a fresh upload times every stage and counts geocodes by source."""
+        import uuid
+        content = sample_ics_content.replace("Math 101", f"Math {uuid.uuid4().hex}")  # Never a dedup hit
+        stages = ["read", "parse", "fingerprint", "geocode", "refine", "build_series", "db_lookup", "db_insert", "expand"]
+        before = {s: _sample("routify_upload_stage_seconds_count", stage=s) for s in stages}
+        google_before = _sample("routify_geocode_lookups_total", source="google")
+        series_before = _sample("routify_upload_items_sum", kind="series")
+
+        files = {"file": ("test.ics", BytesIO(content.encode()), "text/calendar")}
+        assert test_client.post("/api/sessions", files=files).status_code == 200
+
+        assert all(_sample("routify_upload_stage_seconds_count", stage=s) == before[s] + 1 for s in stages)
+        assert _sample("routify_geocode_lookups_total", source="google") == google_before + 2
+        assert _sample("routify_upload_items_sum", kind="series") == series_before + 3
@@ -0,0 +1,82 @@
+"""
+Tests for the background upload job queue.
+"""
+
+import asyncio
+
+import pytest
+
+
+class TestJobQueue:
+    """Tests for JobQueue."""
+
+    def test_rejects_when_full(self):
+        """Test submissions past the queue depth raise QueueFull."""
+        from app.jobs import Job, JobQueue
+
+        async def run():
+            queue = JobQueue(handler=None, workers=0, max_depth=2)
+            queue.submit(Job(1, b""))
+            queue.submit(Job(2, b""))
+            assert queue.full()
+            with pytest.raises(asyncio.QueueFull):
+                queue.submit(Job(3, b""))
+            return queue.status(1)
+
+        assert asyncio.run(run()) == {"status": "pending", "stage": "queued", "error": None}
+
+    def test_watch_follows_progress(self):
+        """Test watchers see each stage until the job is ready."""
+        from app.jobs import Job, JobQueue
+
+        async def handler(job, update):
+            await asyncio.sleep(0.01)
+            update(stage="geocoding")
+            await asyncio.sleep(0.01)
+            update(status="ready", stage="done")
+
+        async def run():
+            queue = JobQueue(handler, workers=1, max_depth=5)
+            await queue.start()
+            queue.submit(Job(7, b""))
+            states = [state async for state in queue.watch(7)]
+            await queue.stop()
+            return states
+
+        stages = [(s["status"], s["stage"]) for s in asyncio.run(run())]
+        assert stages == [("pending", "queued"), ("pending", "geocoding"), ("ready", "done")]
+
+    def test_failure_is_recorded(self, mock_db_session):
+        """Test a JobFailed message becomes the job's error."""
+        from app.jobs import Job, JobFailed, JobQueue
+
+        async def handler(job, update):
+            raise JobFailed("No events found in file")
+
+        async def run():
+            queue = JobQueue(handler, workers=1, max_depth=5)
+            await queue.start()
+            queue.submit(Job(8, b""))
+            await queue.stop()
+            return queue.status(8)
+
+        state = asyncio.run(run())
+        assert state["status"] == "failed"
+        assert state["error"] == "No events found in file"
+
+    def test_stop_reports_unfinished(self):
+        """Test jobs still running or queued at shutdown are returned."""
+        from app.jobs import Job, JobQueue
+
+        async def handler(job, update):
+            await asyncio.Event().wait()
+
+        async def run():
+            queue = JobQueue(handler, workers=1, max_depth=5)
+            await queue.start()
+            queue.submit(Job(1, b""))
+            queue.submit(Job(2, b""))
+            await asyncio.sleep(0.01)
+            return await queue.stop(timeout=0.05)
+
+        assert sorted(asyncio.run(run())) == [1, 2]
@@ -0,0 +1,69 @@
+"""
+Tests for location normalization.
+"""
+
+import re
+
+
+def _reference_expand(text: str) -> str:
+    """The previous implementation: one re.sub per abbreviation."""
+    from app.locations import LOCATION_ABBREVIATIONS
+    result = text
+    for abbrev, full in LOCATION_ABBREVIATIONS.items():
+        result = re.sub(rf"\b{abbrev}\b", full, result, flags=re.IGNORECASE)
+    return result
+
+
+SAMPLES = [
+    "Mech Engr Bldg 205",
+    "MECH ENGR BLDG",
+    "mech engr bldg",
+    "Chem Bldg, Rm 101",
+    "Phys/Chem Lab",
+    "Sci-Tech Ctr",
+    "Bldg.A Rm.3",
+    "Univ Lib Aud",
+    "Svcs Svc SvcS",
+    "Engineering Building",
+    "Bldgs Engrs Labs",
+    "Stat & Econ (Hum) Res Dev",
+    "Comp Info Tech Mgmt Bus Ed Med Hlth Arts Soc Psych Math",
+    "Main St & 5th Ave, Dr King Dr",
+    "Café Bio Ctr",
+    "Éng Bldg",
+    "_Lab_ Lab_1 Lab1 1Lab",
+    "",
+    "   ",
+]
+
+
+class TestExpandAbbreviations:
+    """Tests for the single-pass expander."""
+
+    def test_matches_previous_implementation(self):
+        """Test output is identical to applying each pattern in turn."""
+        from app.locations import expand_abbreviations
+        for text in SAMPLES:
+            assert expand_abbreviations(text) == _reference_expand(text), text
+
+    def test_every_abbreviation_in_any_case(self):
+        """Test each table entry expands regardless of case."""
+        from app.locations import LOCATION_ABBREVIATIONS, expand_abbreviations
+        for abbrev, full in LOCATION_ABBREVIATIONS.items():
+            for variant in (abbrev, abbrev.upper(), abbrev.lower()):
+                assert expand_abbreviations(f"x {variant} y") == f"x {full} y"
+
+
+class TestLocationKey:
+    """Tests for location_key."""
+
+    def test_equivalent_spellings_share_a_key(self):
+        """Test abbreviation, case and spacing differences give one key."""
+        from app.locations import location_key
+        assert location_key("Mech Engr  Bldg") == location_key("mechanical engineering building")
+        assert location_key(" Rice Hall ") == "rice hall"
+
+    def test_geocode_cache_uses_canonical_key(self):
+        """Test the geocode cache treats abbreviated and expanded names alike."""
+        from app.geocode_cache import make_cache_key
+        assert make_cache_key("Chem Bldg") == make_cache_key("Chemistry  Building")
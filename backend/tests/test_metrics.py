@@ -0,0 +1,134 @@
+"""
+Tests for the Prometheus metrics endpoint.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+
+def _sample(name: str, **labels) -> float:
+    from prometheus_client import REGISTRY
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestMetricsEndpoint:
+    """Tests for /metrics."""
+
+    def test_exposes_route_latency_and_gauges(self, test_client):
+        """Test requests are labelled by route template and pool and cache gauges are filled."""
+        labels = {"route": "/api/sessions/{short_id}", "method": "GET", "status": "400"}
+        before = _sample("routify_http_request_duration_seconds_count", **labels)
+
+        test_client.get("/api/sessions/not-a-link")
+        response = test_client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert _sample("routify_http_request_duration_seconds_count", **labels) == before + 1
+        assert 'routify_cache_hit_ratio{cache="response"}' in response.text
+        assert 'routify_cache_lookups{cache="gazetteer",result="miss"}' in response.text
+        assert "# TYPE routify_upload_stage_seconds histogram" in response.text
+
+    def test_unrouted_requests(self):
+        """Test requests answered before routing are matched to their route, and unknown paths are grouped."""
+        from fastapi import FastAPI
+        from fastapi.responses import JSONResponse
+        from fastapi.testclient import TestClient
+        from app.middleware.metrics import MetricsMiddleware
+
+        app = FastAPI()
+
+        @app.get("/items/{item_id}")
+        def item(item_id: int):
+            return {"id": item_id}
+
+        @app.middleware("http")
+        async def reject(request, call_next):
+            return JSONResponse({"detail": "no"}, status_code=429)
+
+        app.add_middleware(MetricsMiddleware)
+        before = {
+            route: _sample("routify_http_request_duration_seconds_count", route=route, method="GET", status="429")
+            for route in ("/items/{item_id}", "unmatched")
+        }
+
+        client = TestClient(app)
+        client.get("/items/1")
+        client.get("/nowhere")
+
+        for route, count in before.items():
+            assert _sample("routify_http_request_duration_seconds_count", route=route, method="GET", status="429") == count + 1
+
+
+class TestRecordedMetrics:
+    """Tests for metrics recorded outside the endpoint."""
+
+    def test_rate_limit_rejections_by_window(self, monkeypatch):
+        """Test each rejection is counted under the window that was exceeded."""
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from app.middleware.rate_limit import RateLimitMiddleware
+
+        monkeypatch.setenv("TESTING", "false")
+        app = FastAPI()
+        app.add_middleware(RateLimitMiddleware, requests_per_minute=5, requests_per_hour=100, burst_limit=2)
+
+        @app.get("/ping")
+        def ping():
+            return {"ok": True}
+
+        before = _sample("routify_rate_limit_rejections_total", window="burst")
+        client = TestClient(app)
+        statuses = [client.get("/ping").status_code for _ in range(4)]
+
+        assert statuses == [200, 200, 429, 429]
+        assert _sample("routify_rate_limit_rejections_total", window="burst") == before + 2
+
+    def test_google_calls_by_status(self, mock_google_maps_error):
+        """Test geocode calls are counted with their outcome and timed."""
+        from app.utils import geocode_location
+
+        before = _sample("routify_google_requests_total", api="geocode", status="ERROR")
+        timed = _sample("routify_google_request_duration_seconds_count", api="geocode")
+
+        geocode_location("Rice Hall")
+
+        assert _sample("routify_google_requests_total", api="geocode", status="ERROR") == before + 1
+        assert _sample("routify_google_request_duration_seconds_count", api="geocode") == timed + 1
+
+
+INCREMENT = """
+from app import metrics
+metrics.google_requests.labels(api="geocode", status="OK").inc()
+metrics.db_pool_connections.labels(engine="async", state="checked_out").set(2)
+"""
+
+RENDER = """
+import sys
+from app import metrics
+metrics.refresh = lambda: None
+sys.stdout.write(metrics.render()[0].decode())
+"""
+
+
+class TestMultiprocess:
+    """Tests for aggregation across workers sharing PROMETHEUS_MULTIPROC_DIR."""
+
+    def test_scrape_sums_workers(self, tmp_path):
+        """Test a scrape from one process reports counters and live gauges from all of them."""
+        backend = Path(__file__).parent.parent
+        env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path), "TESTING": "true", "HASHID_SALT": "x"}
+
+        def run(code: str) -> str:
+            return subprocess.run(
+                [sys.executable, "-c", code], cwd=backend, env=env, capture_output=True, text=True, check=True
+            ).stdout
+
+        run(INCREMENT)
+        run(INCREMENT)
+        output = run(RENDER)
+
+        assert 'routify_google_requests_total{api="geocode",status="OK"} 2.0' in output
+        assert 'routify_db_pool_connections{engine="async",state="checked_out"} 4.0' in output
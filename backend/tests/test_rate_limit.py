@@ -0,0 +1,188 @@
+"""
+Tests for the rate limiting engine and middleware.
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+LIMITS = [("burst", 10, 1), ("minute", 60, 60), ("hour", 1000, 3600)]
+
+
+@pytest.fixture
+def limited_app(monkeypatch):
+    """Small app behind RateLimitMiddleware with rate limiting enabled."""
+    from app.middleware.rate_limit import RateLimitMiddleware
+
+    monkeypatch.setenv("TESTING", "false")
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, requests_per_minute=5, requests_per_hour=100, burst_limit=3)
+
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    return app
+
+
+class TestSlidingWindowLimiter:
+    """Tests for SlidingWindowLimiter."""
+
+    def test_burst_limit(self):
+        """Test the burst window rejects the 11th request in a second."""
+        from app.middleware.limiter import SlidingWindowLimiter
+        limiter = SlidingWindowLimiter(LIMITS)
+
+        results = [limiter.hit("1.2.3.4", now=1000.0 + i * 0.01) for i in range(11)]
+
+        assert all(r.allowed for r in results[:10])
+        assert not results[10].allowed
+        assert results[10].window.name == "burst"
+
+    def test_minute_limit(self):
+        """Test steady traffic under the burst limit still hits the minute limit."""
+        from app.middleware.limiter import SlidingWindowLimiter
+        limiter = SlidingWindowLimiter(LIMITS)
+
+        results = [limiter.hit("1.2.3.4", now=1200.0 + i * 0.5) for i in range(61)]
+
+        assert all(r.allowed for r in results[:60])
+        assert results[60].window.name == "minute"
+
+    def test_rejected_requests_are_not_counted(self):
+        """Test a rejected request does not use up quota."""
+        from app.middleware.limiter import SlidingWindowLimiter
+        limiter = SlidingWindowLimiter([("burst", 2, 1)])
+
+        for _ in range(5):
+            limiter.hit("a", now=10.1)
+
+        assert limiter.hit("a", now=12.0).allowed
+
+    def test_previous_bucket_is_weighted(self):
+        """Test the previous bucket's count decays across the current bucket."""
+        from app.middleware.limiter import SlidingWindowLimiter
+        limiter = SlidingWindowLimiter([("minute", 10, 60)])
+
+        for i in range(10):
+            assert limiter.hit("a", now=60.0 + i).allowed
+
+        # 30s into the next bucket, half of the previous 10 still count
+        allowed = sum(limiter.hit("a", now=150.0).allowed for _ in range(10))
+        assert allowed == 5
+
+    def test_clients_are_independent(self):
+        """Test one client's traffic does not affect another."""
+        from app.middleware.limiter import SlidingWindowLimiter
+        limiter = SlidingWindowLimiter(LIMITS)
+
+        for _ in range(10):
+            limiter.hit("a", now=1000.0)
+
+        assert not limiter.hit("a", now=1000.0).allowed
+        assert limiter.hit("b", now=1000.0).allowed
+
+    def test_remaining(self):
+        """Test remaining counts are reported per window."""
+        from app.middleware.limiter import SlidingWindowLimiter
+        limiter = SlidingWindowLimiter(LIMITS)
+
+        result = limiter.hit("a", now=1000.0)
+
+        assert result.remaining == {"burst": 9, "minute": 59, "hour": 999}
+
+    def test_stale_clients_are_cleaned_up(self):
+        """Test idle clients are dropped once every window has aged out."""
+        from app.middleware.limiter import SlidingWindowLimiter
+        limiter = SlidingWindowLimiter(LIMITS, shards=1, cleanup_interval=300)
+        limiter._shards[0][2] = 0.0
+
+        for i in range(100):
+            limiter.hit(f"10.0.0.{i}", now=100.0)
+        assert len(limiter) == 100
+
+        limiter.hit("fresh", now=100.0 + 3 * 3600)
+        assert len(limiter) == 1
+
+
+class TestRateLimitMiddleware:
+    """Tests for RateLimitMiddleware responses."""
+
+    def test_rejects_with_429(self, limited_app):
+        """Test an over-limit client gets 429 with Retry-After."""
+        client = TestClient(limited_app)
+        statuses = [client.get("/ping").status_code for _ in range(4)]
+
+        assert statuses[:3] == [200, 200, 200]
+        response = client.get("/ping")
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+        assert "slow down" in response.json()["detail"]
+
+    def test_health_probes_are_exempt(self, limited_app):
+        """Test health and pool probes never count against or hit the limit."""
+        @limited_app.get("/health/pools")
+        def pools():
+            return {}
+
+        client = TestClient(limited_app)
+        statuses = [client.get("/health/pools").status_code for _ in range(10)]
+
+        assert statuses == [200] * 10
+        assert client.get("/ping").status_code == 200
+
+    def test_rate_limit_headers(self, limited_app):
+        """Test allowed responses carry X-RateLimit headers."""
+        client = TestClient(limited_app)
+        response = client.get("/ping")
+
+        assert response.headers["X-RateLimit-Limit"] == "5"
+        assert response.headers["X-RateLimit-Remaining"] == "4"
+
+    def test_uses_given_storage(self, monkeypatch, tmp_path):
+        """Test the middleware counts against an injected shared backend."""
+        from app.middleware.limiter_storage import SharedMemoryStorage
+        from app.middleware.rate_limit import RateLimitMiddleware
+
+        monkeypatch.setenv("TESTING", "false")
+        storage = SharedMemoryStorage([("burst", 10, 1), ("minute", 2, 60), ("hour", 100, 3600)], path=str(tmp_path / "rl"))
+        app = FastAPI()
+        app.add_middleware(RateLimitMiddleware, storage=storage)
+
+        @app.get("/ping")
+        def ping():
+            return {"ok": True}
+
+        client = TestClient(app)
+        statuses = [client.get("/ping").status_code for _ in range(3)]
+        assert statuses == [200, 200, 429]
+
+    def test_streaming_response_passes_through(self, limited_app):
+        """Test streamed bodies arrive chunk by chunk with the rate limit headers added."""
+        from fastapi.responses import StreamingResponse
+
+        @limited_app.get("/stream")
+        def stream():
+            return StreamingResponse(iter([b"a", b"b", b"c"]), media_type="text/plain")
+
+        client = TestClient(limited_app)
+        with client.stream("GET", "/stream") as response:
+            chunks = list(response.iter_raw())
+
+        assert b"".join(chunks) == b"abc"
+        assert response.headers["X-RateLimit-Remaining"] == "4"
+
+    def test_forwarded_for_only_from_trusted_proxies(self, limited_app, monkeypatch):
+        """Test X-Forwarded-For and X-Real-IP pick the client only behind a trusted proxy."""
+        from app.middleware import rate_limit
+
+        client = TestClient(limited_app)  # Connects as "testclient"
+        spoofed = [client.get("/ping", headers={"X-Forwarded-For": f"10.0.0.{i}"}).status_code for i in range(4)]
+        assert spoofed == [200, 200, 200, 429]
+
+        monkeypatch.setattr(rate_limit, "TRUSTED_PROXIES", {"testclient"})
+        forwarded = [client.get("/ping", headers={"X-Forwarded-For": f"10.0.1.{i}, 10.9.9.9"}).status_code for i in range(4)]
+        real_ip = client.get("/ping", headers={"X-Forwarded-For": "not-an-ip", "X-Real-IP": "10.0.2.1"})
+        assert forwarded == [200, 200, 200, 200]
+        assert real_ip.headers["X-RateLimit-Remaining"] == "4"
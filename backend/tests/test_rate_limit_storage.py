@@ -0,0 +1,339 @@
+"""
+Tests for the shared rate limit backends.
+"""
+
+import asyncio
+import hashlib
+import math
+import multiprocessing
+import threading
+
+import pytest
+
+
+LIMITS = [("burst", 10, 1), ("minute", 60, 60), ("hour", 1000, 3600)]
+
+
+class StandInRedis:
+    """Tiny server speaking enough of the Redis protocol for the limiter."""
+
+    def __init__(self, password=None):
+        self.password = password
+        self.data = {}
+        self.commands = []
+        self.scripts = set()
+        self.connections = 0
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(asyncio.start_server(self.handle, "127.0.0.1", 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    @staticmethod
+    def encode(value) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(StandInRedis.encode(v) for v in value)
+        if isinstance(value, Exception):
+            return f"-{value}\r\n".encode()
+        value = str(value).encode()
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def apply(self, name, args):
+        if name == "GET":
+            return self.data.get(args[0])
+        if name == "SCRIPT" and args[0].upper() == "LOAD":
+            sha = hashlib.sha1(args[1].encode()).hexdigest()
+            self.scripts.add(sha)
+            return sha
+        if name in ("EVAL", "EVALSHA"):
+            if name == "EVAL":
+                self.scripts.add(hashlib.sha1(args[0].encode()).hexdigest())
+            elif args[0] not in self.scripts:
+                return Exception("NOSCRIPT No matching script")
+            numkeys = int(args[1])
+            return self.check_script(args[2:2 + numkeys], args[2 + numkeys:])
+        return Exception(f"ERR unknown command {name}")
+
+    def check_script(self, keys, args):
+        """The limiter's CHECK_SCRIPT in Python, since this stand-in cannot run Lua."""
+        n = len(keys) // 2
+        result = [1]
+        for i in range(n):
+            current, previous = int(self.data.get(keys[i], 0)), int(self.data.get(keys[n + i], 0))
+            limit, elapsed = int(args[3 * i]), float(args[3 * i + 1])
+            estimate = previous * (1 - elapsed) + current
+            if estimate >= limit:
+                return [0, i + 1]
+            result.append(max(0, math.floor(limit - estimate - 1)))
+        for key in keys[:n]:
+            self.data[key] = int(self.data.get(key, 0)) + 1
+        return result
+
+    async def handle(self, reader, writer):
+        authed = self.password is None
+        self.connections += 1
+        while True:
+            header = await reader.readline()
+            if not header:
+                break
+            parts = []
+            for _ in range(int(header[1:])):
+                length = int((await reader.readline())[1:])
+                parts.append((await reader.readexactly(length + 2))[:-2].decode())
+            name, args = parts[0].upper(), parts[1:]
+            self.commands.append(name)
+
+            if name == "AUTH":
+                authed = args[0] == self.password
+                writer.write(b"+OK\r\n" if authed else b"-ERR invalid password\r\n")
+            elif not authed:
+                writer.write(b"-NOAUTH Authentication required\r\n")
+            elif name in ("PING", "SELECT"):
+                writer.write(b"+OK\r\n")
+            else:
+                writer.write(self.encode(self.apply(name, args)))
+            await writer.drain()
+        writer.close()
+
+
+@pytest.fixture
+def redis_server():
+    server = StandInRedis(password="secret")
+    yield server
+    server.stop()
+
+
+def _hit_shared(path, count, queue):
+    """Child process body: hit one key count times and report how many were allowed."""
+    from app.middleware.limiter_storage import SharedMemoryStorage
+    storage = SharedMemoryStorage([("minute", 50, 60)], path=path, slots=256, stripes=4)
+    queue.put(sum(storage.hit("1.2.3.4", now=120.0).allowed for _ in range(count)))
+
+
+class TestSharedMemoryStorage:
+    """Tests for SharedMemoryStorage."""
+
+    def test_matches_in_process_limiter(self, tmp_path):
+        """Test the shared backend makes the same decisions as the in-process one."""
+        from app.middleware.limiter import SlidingWindowLimiter
+        from app.middleware.limiter_storage import SharedMemoryStorage
+        shared = SharedMemoryStorage(LIMITS, path=str(tmp_path / "rl"), slots=256, stripes=4)
+        local = SlidingWindowLimiter(LIMITS)
+
+        times = [1000.0 + i * 0.3 for i in range(120)]
+        assert [shared.hit("a", now=t) for t in times] == [local.hit("a", now=t) for t in times]
+
+    def test_state_visible_to_second_instance(self, tmp_path):
+        """Test two storages on one file share counters."""
+        from app.middleware.limiter_storage import SharedMemoryStorage
+        path = str(tmp_path / "rl")
+        first = SharedMemoryStorage([("minute", 3, 60)], path=path, slots=256, stripes=4)
+        second = SharedMemoryStorage([("minute", 3, 60)], path=path, slots=256, stripes=4)
+
+        assert first.hit("a", now=60.0).allowed
+        assert second.hit("a", now=60.0).allowed
+        assert first.hit("a", now=60.0).allowed
+        assert not second.hit("a", now=60.0).allowed
+
+    def test_limit_holds_across_processes(self, tmp_path):
+        """Test concurrent worker processes never exceed the shared limit together."""
+        path = str(tmp_path / "rl")
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue()
+        workers = [context.Process(target=_hit_shared, args=(path, 40, queue)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        allowed = sum(queue.get(timeout=30) for _ in workers)
+        for worker in workers:
+            worker.join()
+
+        assert allowed == 50
+
+    def test_table_is_fixed_size(self, tmp_path):
+        """Test many clients reuse stale slots instead of growing the file."""
+        import os
+        from app.middleware.limiter_storage import SharedMemoryStorage
+        path = str(tmp_path / "rl")
+        storage = SharedMemoryStorage([("minute", 5, 60)], path=path, slots=64, stripes=4)
+        size = os.path.getsize(path)
+
+        for i in range(1000):
+            assert storage.hit(f"10.0.{i // 256}.{i % 256}", now=60.0 + i).allowed
+
+        assert os.path.getsize(path) == size
+
+
+class TestRedisStorage:
+    """Tests for RedisStorage against a local stand-in server."""
+
+    def test_enforces_limit(self, redis_server):
+        """Test requests over the limit are rejected without being counted."""
+        from app.middleware.limiter_storage import RedisStorage
+        storage = RedisStorage([("minute", 3, 60)], url=f"redis://:secret@127.0.0.1:{redis_server.port}/2")
+
+        async def run():
+            results = [await storage.check("a", now=60.0) for _ in range(5)]
+            await storage.close()
+            return results
+
+        results = asyncio.run(run())
+        assert [r.allowed for r in results] == [True, True, True, False, False]
+        assert results[0].remaining == {"minute": 2}
+        assert results[3].window.name == "minute"
+        assert redis_server.data["rl:minute:a:1"] == 3
+
+    def test_one_round_trip_per_check(self, redis_server):
+        """Test allowed and rejected checks are each a single script call."""
+        from app.middleware.limiter_storage import RedisStorage
+        storage = RedisStorage([("burst", 1, 1)], url=f"redis://:secret@127.0.0.1:{redis_server.port}/0")
+
+        async def run():
+            results = [await storage.check("a", now=1000.0), await storage.check("a", now=1000.5)]
+            await storage.close()
+            return results
+
+        assert [r.allowed for r in asyncio.run(run())] == [True, False]
+        assert redis_server.commands == ["AUTH", "SCRIPT", "EVALSHA", "EVALSHA"]
+
+    def test_concurrent_checks_share_pool(self, redis_server):
+        """Test concurrent checks run over at most pool_size connections and all count."""
+        from app.middleware.limiter_storage import RedisStorage
+        storage = RedisStorage(LIMITS, url=f"redis://:secret@127.0.0.1:{redis_server.port}/0", pool_size=2)
+
+        async def run():
+            results = await asyncio.gather(*(storage.check("a", now=1000.0) for _ in range(8)))
+            await storage.close()
+            return results
+
+        assert all(r.allowed for r in asyncio.run(run()))
+        assert redis_server.connections == 2
+        assert redis_server.data["rl:burst:a:1000"] == 8
+
+    def test_reloads_flushed_script(self, redis_server):
+        """Test a check still works after the server forgets the script."""
+        from app.middleware.limiter_storage import RedisStorage
+        storage = RedisStorage([("minute", 5, 60)], url=f"redis://:secret@127.0.0.1:{redis_server.port}/0")
+
+        async def run():
+            await storage.check("a", now=60.0)
+            redis_server.scripts.clear()
+            result = await storage.check("a", now=60.0)
+            await storage.close()
+            return result
+
+        assert asyncio.run(run()).remaining == {"minute": 3}
+        assert redis_server.commands[-2:] == ["EVALSHA", "EVAL"]
+
+    def test_previous_bucket_counts(self, redis_server):
+        """Test the previous bucket is weighted into the sliding estimate."""
+        from app.middleware.limiter_storage import RedisStorage
+        storage = RedisStorage([("minute", 10, 60)], url=f"redis://:secret@127.0.0.1:{redis_server.port}/0")
+        redis_server.data["rl:minute:a:1"] = 10
+
+        async def run():
+            # A quarter into the next bucket, about 7.5 of the previous 10 still count
+            results = [await storage.check("a", now=135.0) for _ in range(4)]
+            await storage.close()
+            return results
+
+        assert [r.allowed for r in asyncio.run(run())] == [True, True, True, False]
+
+    def test_fails_open_when_unreachable(self):
+        """Test requests are allowed when the store cannot be reached."""
+        import socket
+        from app.middleware.limiter_storage import RedisStorage
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        storage = RedisStorage([("minute", 1, 60)], url=f"redis://127.0.0.1:{port}/0")
+
+        async def run():
+            return [await storage.check("a", now=60.0) for _ in range(3)]
+
+        assert all(r.allowed for r in asyncio.run(run()))
+
+
+class TestCheckScript:
+    """Tests for the Lua script itself, run with lupa when it is installed."""
+
+    def test_matches_in_process_limiter(self):
+        """Test the script allows, rejects and reports remaining like SlidingWindowLimiter."""
+        lupa = pytest.importorskip("lupa")
+        from app.middleware.limiter import SlidingWindowLimiter
+        from app.middleware.limiter_storage import CHECK_SCRIPT, RedisStorage
+
+        data = {}
+
+        def call(name, key, *args):
+            if name == "GET":
+                return data.get(key)
+            if name == "INCR":
+                data[key] = data.get(key, 0) + 1
+            return 1
+
+        lua = lupa.LuaRuntime()
+        lua.globals().redis = lua.table(call=call)
+        storage = RedisStorage(LIMITS)
+        reference = SlidingWindowLimiter(LIMITS)
+
+        for step in range(300):
+            now = 1000.0 + step * 0.13
+            keys, args = storage.script_args("a", now)
+            lua.globals().KEYS = lua.table(*keys)
+            lua.globals().ARGV = lua.table(*(str(arg) for arg in args))
+            reply = [int(value) for value in lua.execute(CHECK_SCRIPT).values()]
+            expected = reference.hit("a", now)
+
+            assert bool(reply[0]) == expected.allowed, step
+            if expected.allowed:
+                assert dict(zip(("burst", "minute", "hour"), reply[1:])) == expected.remaining
+            else:
+                assert storage.limits[reply[1] - 1] == expected.window
+
+
+class TestCreateStorage:
+    """Tests for backend selection."""
+
+    def test_backends(self, tmp_path, monkeypatch):
+        """Test each backend name builds its storage."""
+        from app.middleware.limiter import SlidingWindowLimiter
+        from app.middleware.limiter_storage import (
+            RedisStorage,
+            SharedMemoryStorage,
+            create_storage,
+        )
+        assert isinstance(create_storage(LIMITS, "memory"), SlidingWindowLimiter)
+        assert isinstance(create_storage(LIMITS, "redis"), RedisStorage)
+
+        monkeypatch.setattr("app.middleware.limiter_storage.RATE_LIMIT_SHM_PATH", str(tmp_path / "rl"))
+        assert isinstance(create_storage(LIMITS, "shm"), SharedMemoryStorage)
+
+        with pytest.raises(ValueError):
+            create_storage(LIMITS, "memcached")
+
+    def test_default_is_shared_under_several_workers(self, tmp_path, monkeypatch):
+        """Test an unset backend is per-process alone and shm when one of several workers."""
+        import os
+        from app.middleware import limiter_storage
+        from app.middleware.limiter import SlidingWindowLimiter
+        monkeypatch.setattr(limiter_storage, "RATE_LIMIT_BACKEND", None)
+        monkeypatch.setattr(limiter_storage, "RATE_LIMIT_SHM_PATH", str(tmp_path / "rl"))
+        monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+
+        assert isinstance(limiter_storage.create_storage(LIMITS), SlidingWindowLimiter)
+
+        monkeypatch.setenv("WEB_CONCURRENCY", "2")
+        expected = limiter_storage.SharedMemoryStorage if os.name == "posix" else SlidingWindowLimiter
+        assert isinstance(limiter_storage.create_storage(LIMITS), expected)
+
+        monkeypatch.setenv("WEB_CONCURRENCY", "1")
+        monkeypatch.setattr(limiter_storage.multiprocessing, "parent_process", lambda: object())
+        assert isinstance(limiter_storage.create_storage(LIMITS), expected)
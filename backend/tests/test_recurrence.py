@@ -0,0 +1,167 @@
+"""
+Tests for the recurrence engine.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+
+def _naive(start, last, day_codes, interval=1, exdates=()):
+    """Reference expansion: test every day, as the old implementation did."""
+    codes = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+    week_start = start - timedelta(days=start.weekday())
+    current = start
+    while current <= last:
+        weeks = (current - week_start).days // 7
+        if codes[current.weekday()] in day_codes and weeks % interval == 0 and current not in exdates:
+            yield current
+        current += timedelta(days=1)
+
+
+class TestOccurrences:
+    """Tests for occurrences."""
+
+    def test_matches_day_by_day_expansion(self):
+        """Test weekly rules give the same dates as checking every day."""
+        from app.recurrence import occurrences
+        start, until = date(2025, 1, 15), date(2025, 5, 2)
+        exdates = {date(2025, 3, 10), date(2025, 3, 12)}
+
+        for codes in (["MO", "WE", "FR"], ["TU", "TH"], ["SU"], ["WE", "MO"]):
+            for interval in (1, 2, 3):
+                expected = list(_naive(start, until, codes, interval, exdates))
+                actual = list(occurrences(start, until, freq="WEEKLY", interval=interval, day_codes=codes, exdates=exdates))
+                assert actual == expected, (codes, interval)
+
+    def test_count(self):
+        """Test COUNT stops after that many generated dates, even with exclusions."""
+        from app.recurrence import occurrences
+        dates = list(occurrences(
+            date(2025, 1, 13), count=5, day_codes=["MO", "WE"], exdates={date(2025, 1, 15)}
+        ))
+
+        assert dates == [date(2025, 1, 13), date(2025, 1, 20), date(2025, 1, 22), date(2025, 1, 27)]
+
+    def test_biweekly_interval(self):
+        """Test INTERVAL=2 skips alternate weeks."""
+        from app.recurrence import occurrences
+        dates = list(occurrences(date(2025, 1, 14), date(2025, 2, 28), interval=2, day_codes=["TU"]))
+
+        assert dates == [date(2025, 1, 14), date(2025, 1, 28), date(2025, 2, 11), date(2025, 2, 25)]
+
+    def test_daily(self):
+        """Test daily rules with an interval and with a BYDAY filter."""
+        from app.recurrence import occurrences
+        every_other = list(occurrences(date(2025, 1, 1), count=3, freq="DAILY", interval=2))
+        assert every_other == [date(2025, 1, 1), date(2025, 1, 3), date(2025, 1, 5)]
+
+        weekdays = list(occurrences(
+            date(2025, 1, 3), count=3, freq="DAILY", interval=2, day_codes=["MO", "TU", "WE", "TH", "FR"]
+        ))
+        assert weekdays == [date(2025, 1, 3), date(2025, 1, 7), date(2025, 1, 9)]
+
+    def test_rdates_merged_and_deduplicated(self):
+        """Test RDATEs add dates in order and never duplicate rule dates."""
+        from app.recurrence import occurrences
+        dates = list(occurrences(
+            date(2025, 1, 13), date(2025, 1, 20), day_codes=["MO"],
+            rdates=[date(2025, 1, 16), date(2025, 1, 20), date(2025, 2, 1)],
+            exdates=[date(2025, 2, 1)],
+        ))
+
+        assert dates == [date(2025, 1, 13), date(2025, 1, 16), date(2025, 1, 20)]
+
+    def test_window_skips_ahead_with_count(self):
+        """Test a window late in a COUNT rule still counts earlier occurrences."""
+        from app.recurrence import occurrences
+        start = date(2025, 1, 13)
+        full = list(occurrences(start, count=40, day_codes=["MO", "WE", "FR"]))
+        window = list(occurrences(
+            start, count=40, day_codes=["MO", "WE", "FR"],
+            window_start=date(2025, 3, 5), window_end=date(2025, 12, 1),
+        ))
+
+        assert window == [d for d in full if d >= date(2025, 3, 5)]
+        assert window[-1] == full[-1]
+
+    def test_window_cost_tracks_output(self):
+        """Test a narrow window on a long series does not walk the whole series."""
+        from app import recurrence
+        calls = []
+        original = recurrence._weekly
+
+        def counting(*args):
+            for item in original(*args):
+                calls.append(item)
+                yield item
+
+        recurrence._weekly = counting
+        try:
+            dates = list(recurrence.occurrences(
+                date(2020, 1, 6), date(2030, 12, 31), day_codes=["MO", "WE"],
+                window_start=date(2029, 6, 1), window_end=date(2029, 6, 15),
+            ))
+        finally:
+            recurrence._weekly = original
+
+        assert len(dates) == 4
+        assert len(calls) <= 8
+
+    def test_unsupported_freq_occurs_once(self):
+        """Test frequencies the engine does not expand yield only the start date, as uploads store them."""
+        from app.recurrence import occurrences
+        start = date(2025, 1, 14)
+
+        assert list(occurrences(start, count=6, freq="MONTHLY", day_codes=["TU"])) == [start]
+        assert list(occurrences(start, freq="YEARLY", window_start=date(2025, 2, 1), window_end=date(2026, 2, 1))) == []
+
+    def test_unbounded_rule_needs_window(self):
+        """Test a rule with no UNTIL, COUNT or window end is refused."""
+        from app.recurrence import occurrences
+        with pytest.raises(ValueError):
+            list(occurrences(date(2025, 1, 1)))
+
+        assert len(list(occurrences(date(2025, 1, 1), window_end=date(2025, 1, 29)))) == 4
+
+
+class TestRecurrenceFields:
+    """Tests for reading RRULEs into series fields."""
+
+    def test_count_sets_end_date(self):
+        """Test a COUNT rule gets an end date at its final occurrence."""
+        from app.utils import recurrence_fields
+        fields = recurrence_fields(["FREQ=WEEKLY;COUNT=4;INTERVAL=2;BYDAY=TU,TH"], date(2025, 1, 14))
+
+        assert fields == {
+            "end_date": date(2025, 1, 30),
+            "day_codes": ["TU", "TH"],
+            "freq": "WEEKLY",
+            "interval": 2,
+            "count": 4,
+        }
+
+    def test_huge_count_is_capped(self):
+        """Test a COUNT far beyond any term is capped and stays within the supported years."""
+        from app.utils import MAX_DATE_YEAR, MAX_RRULE_COUNT, recurrence_fields
+        fields = recurrence_fields(["FREQ=DAILY;COUNT=1000000"], date(2025, 1, 14))
+
+        assert fields["count"] == MAX_RRULE_COUNT
+        assert fields["end_date"].year <= MAX_DATE_YEAR
+
+    def test_unsupported_freq_is_single_day(self):
+        """Test a MONTHLY rule is not expanded as weekly."""
+        from app.utils import recurrence_fields
+        fields = recurrence_fields(["FREQ=MONTHLY;COUNT=6"], date(2025, 1, 14))
+
+        assert fields["end_date"] == date(2025, 1, 14)
+        assert fields["day_codes"] == ["TU"]
+        assert fields["count"] is None
+
+    def test_no_rule_is_single_day(self):
+        """Test an event without RRULE occurs once on its start weekday."""
+        from app.utils import recurrence_fields
+        fields = recurrence_fields([], date(2025, 1, 14))
+
+        assert fields["end_date"] == date(2025, 1, 14)
+        assert fields["day_codes"] == ["TU"]
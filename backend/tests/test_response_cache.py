@@ -0,0 +1,81 @@
+"""
+Unit tests for the session response cache.
+"""
+
+
+class TestEtags:
+    """Tests for ETag helpers."""
+
+    def test_etag_is_stable(self):
+        """Test identical bodies get identical ETags across workers."""
+        from app.response_cache import make_etag
+        assert make_etag(b'{"events":[]}') == make_etag(b'{"events":[]}')
+        assert make_etag(b'{"events":[]}') != make_etag(b'{"events":[1]}')
+
+    def test_if_none_match_variants(self):
+        """Test lists, weak tags and wildcards all match."""
+        from app.response_cache import etag_matches
+        etag = '"abc"'
+        assert etag_matches('"abc"', etag)
+        assert etag_matches('"xyz", W/"abc"', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches('"xyz"', etag)
+        assert not etag_matches(None, etag)
+
+
+class TestResponseCache:
+    """Tests for the memory and disk tiers."""
+
+    def test_evicts_by_size(self):
+        """Test the memory tier stays under its byte budget."""
+        from app.response_cache import ResponseCache
+        cache = ResponseCache(max_bytes=10, directory=None)
+        cache.put("a", b"12345")
+        cache.put("b", b"12345")
+        cache.put("c", b"12345")
+
+        assert cache.get("a") is None
+        assert cache.get("c")[0] == b"12345"
+        assert cache.stats()["bytes"] <= 10
+
+    def test_disk_tier_survives_memory_clear(self, tmp_path):
+        """Test bodies written by one worker are readable after a restart."""
+        from app.response_cache import ResponseCache
+        writer = ResponseCache(directory=str(tmp_path))
+        etag = writer.put("abc123", b'{"events":[]}')
+
+        reader = ResponseCache(directory=str(tmp_path))
+        body, reader_etag = reader.get("abc123")
+
+        assert body == b'{"events":[]}'
+        assert reader_etag == etag
+        assert reader.stats()["disk_hits"] == 1
+
+    def test_disk_tier_evicts_least_recently_used(self, tmp_path):
+        """Test a sweep brings the directory under its budget, keeping files read recently."""
+        import os
+        from app.response_cache import ResponseCache
+        writer = ResponseCache(directory=str(tmp_path))
+        for i, key in enumerate(["a", "b", "c"]):
+            writer.put(key, b"x" * 4000)
+            os.utime(writer._path_for(key), (i, i))  # Written in order a, b, c
+        ResponseCache(directory=str(tmp_path)).get("a")  # Read from disk, which marks it used
+
+        swept = ResponseCache(directory=str(tmp_path), disk_max_bytes=10_000)
+
+        assert {p.name for p in tmp_path.glob("*.json")} == {swept._path_for(key).name for key in ["a", "c"]}
+        assert swept.stats()["disk_evictions"] == 1
+
+    def test_writes_past_a_tenth_of_the_budget_sweep(self, tmp_path):
+        """Test a worker that keeps writing sweeps the directory in the background."""
+        import time
+        from app.response_cache import ResponseCache
+        cache = ResponseCache(max_bytes=0, directory=str(tmp_path), disk_max_bytes=10_000)
+        for key in range(10):
+            cache.put(str(key), b"x" * 4000)  # Each write is past a tenth of the budget
+            deadline = time.monotonic() + 5
+            while cache._sweeping and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        assert sum(p.stat().st_size for p in tmp_path.glob("*.json")) <= 10_000
+        assert cache.stats()["disk_evictions"] == 8
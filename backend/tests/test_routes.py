@@ -67,6 +67,16 @@ class TestSessionEndpoints:
         assert response.status_code == 400
         assert "too large" in response.json()["detail"]
 
+    def test_create_session_not_a_calendar(self, test_client):
+        """Test session creation rejects text that is not iCalendar."""
+        files = {
+            "file": ("notes.ics", BytesIO(b"just some notes"), "text/calendar")
+        }
+        response = test_client.post("/api/sessions", files=files)
+
+        assert response.status_code == 400
+        assert "Invalid calendar format" in response.json()["detail"]
+
     def test_get_session_success(self, test_client, sample_ics_single_event):
         """Test successful session retrieval."""
         # First create a session
@@ -85,6 +95,204 @@ class TestSessionEndpoints:
         assert len(data["events"]) > 0
         assert data["events"][0]["title"] == "Single Event"
 
+    def test_create_session_stores_one_row_per_event(self, test_client, mock_db_session, sample_ics_content):
+        """Test recurring events are stored as a single series row."""
+        from sqlmodel import Session, select
+        from app.api.routes import hashids
+        from app.models import EventSeriesModel, SessionModel
+
+        files = {
+            "file": ("test.ics", BytesIO(sample_ics_content.encode()), "text/calendar")
+        }
+        short_id = test_client.post("/api/sessions", files=files).json()["short_id"]
+        session_id = hashids.decode(short_id)[0]
+
+        with Session(mock_db_session) as db:
+            session = db.get(SessionModel, session_id)
+            owner_id = session.shared_from_id or session.id
+            rows = db.exec(select(EventSeriesModel).where(EventSeriesModel.session_id == owner_id)).all()
+        assert len(rows) == 3
+
+        response = test_client.get(f"/api/sessions/{short_id}")
+        math_events = [e for e in response.json()["events"] if e["title"] == "Math 101"]
+        assert len(math_events) > 1
+
+    def test_identical_upload_shares_series(self, test_client, mock_db_session, sample_ics_content, fresh_response_cache):
+        """Test a repeated upload gets its own session but reuses the first one's series rows."""
+        import uuid
+        from sqlmodel import Session, select
+        from app.api.routes import hashids
+        from app.models import EventSeriesModel, SessionModel
+        content = sample_ics_content.replace("Math 101", f"Math {uuid.uuid4().hex}").encode()
+
+        first = test_client.post("/api/sessions", files={"file": ("a.ics", BytesIO(content), "text/calendar")}).json()
+        fresh_response_cache.clear()
+        second = test_client.post("/api/sessions", files={"file": ("b.ics", BytesIO(content), "text/calendar")}).json()
+
+        assert second["short_id"] != first["short_id"]
+        first_id, second_id = hashids.decode(first["short_id"])[0], hashids.decode(second["short_id"])[0]
+        with Session(mock_db_session) as db:
+            assert db.get(SessionModel, second_id).shared_from_id == first_id
+            assert db.exec(select(EventSeriesModel).where(EventSeriesModel.session_id == second_id)).all() == []
+
+        fresh_response_cache.clear()
+        first_events = test_client.get(f"/api/sessions/{first['short_id']}").json()["events"]
+        assert test_client.get(f"/api/sessions/{second['short_id']}").json()["events"] == first_events
+
+    def test_get_session_date_window(self, test_client, sample_ics_content):
+        """Test events can be limited to a [from, to) date window."""
+        files = {
+            "file": ("test.ics", BytesIO(sample_ics_content.encode()), "text/calendar")
+        }
+        short_id = test_client.post("/api/sessions", files=files).json()["short_id"]
+
+        response = test_client.get(f"/api/sessions/{short_id}?from=2024-01-15&to=2024-01-17")
+
+        assert response.status_code == 200
+        dates = sorted(e["start_date"] for e in response.json()["events"])
+        assert dates == ["2024-01-15", "2024-01-16"]
+
+    def test_get_session_window_not_cached(self, test_client, sample_ics_content, fresh_response_cache):
+        """Test windowed views are not cached, so clients cannot crowd out default bodies."""
+        files = {
+            "file": ("test.ics", BytesIO(sample_ics_content.encode()), "text/calendar")
+        }
+        short_id = test_client.post("/api/sessions", files=files).json()["short_id"]
+        entries = fresh_response_cache.stats()["entries"]
+
+        for day in range(10, 20):
+            response = test_client.get(f"/api/sessions/{short_id}?from=2024-01-{day}")
+            assert response.status_code == 200
+            assert response.headers["ETag"]
+
+        assert fresh_response_cache.stats()["entries"] == entries
+
+    def test_get_session_invalid_window(self, test_client, sample_ics_single_event):
+        """Test an empty or inverted window is rejected."""
+        files = {
+            "file": ("test.ics", BytesIO(sample_ics_single_event.encode()), "text/calendar")
+        }
+        short_id = test_client.post("/api/sessions", files=files).json()["short_id"]
+
+        response = test_client.get(f"/api/sessions/{short_id}?from=2024-02-01&to=2024-01-01")
+
+        assert response.status_code == 400
+
+    def test_get_session_etag_revalidation(self, test_client, sample_ics_single_event, monkeypatch):
+        """Test a matching If-None-Match returns 304 without touching the database."""
+        files = {
+            "file": ("test.ics", BytesIO(sample_ics_single_event.encode()), "text/calendar")
+        }
+        short_id = test_client.post("/api/sessions", files=files).json()["short_id"]
+
+        first = test_client.get(f"/api/sessions/{short_id}")
+        etag = first.headers["ETag"]
+
+        from app.database import get_async_session
+        from app.main import app
+
+        class NoDatabase:
+            def __getattr__(self, name):
+                raise AssertionError("database should not be used")
+
+        async def no_database():
+            yield NoDatabase()
+
+        monkeypatch.setitem(app.dependency_overrides, get_async_session, no_database)
+        response = test_client.get(f"/api/sessions/{short_id}", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+
+    def test_get_session_cache_filled_on_create(self, test_client, sample_ics_single_event, fresh_response_cache):
+        """Test session creation pre-serializes the default response."""
+        files = {
+            "file": ("test.ics", BytesIO(sample_ics_single_event.encode()), "text/calendar")
+        }
+        short_id = test_client.post("/api/sessions", files=files).json()["short_id"]
+
+        body, etag = fresh_response_cache.get(short_id)
+        response = test_client.get(f"/api/sessions/{short_id}")
+
+        assert response.content == body
+        assert response.headers["ETag"] == etag
+
+    def test_no_transaction_held_while_geocoding(self, test_client, sample_ics_single_event, monkeypatch):
+        """Test the dedup lookup's transaction ends before geocoding waits on Google."""
+        import uuid
+        from app import ics_stream
+        from app.api import routes
+
+        sessions, in_transaction = [], []
+        lookup, series = ics_stream.find_shared_session, ics_stream.ParsedUpload.series
+
+        async def recording_lookup(db, fingerprint):
+            sessions.append(db)
+            return await lookup(db, fingerprint)
+
+        async def checking_series(self, *args, **kwargs):
+            in_transaction.append(sessions[0].in_transaction())
+            return await series(self, *args, **kwargs)
+
+        monkeypatch.setattr(ics_stream, "find_shared_session", recording_lookup)
+        monkeypatch.setattr(ics_stream.ParsedUpload, "series", checking_series)
+        content = sample_ics_single_event.replace("Single Event", f"Event {uuid.uuid4().hex}")  # Miss the dedup lookup
+        files = {"file": ("test.ics", BytesIO(content.encode()), "text/calendar")}
+
+        assert test_client.post("/api/sessions", files=files).status_code == 200
+        assert in_transaction == [False]
+
+    def test_geocodes_cancelled_when_storing_fails(self, test_client, sample_ics_content, monkeypatch):
+        """Test a failure after parsing stops the geocodes started while streaming."""
+        import asyncio
+        from app import ics_stream
+        from app.api import routes
+
+        uploads = []
+        read = routes.read_ics_stream
+
+        async def never_answers(location, bias, semaphore):
+            await asyncio.Event().wait()
+
+        async def recording_read(chunks):
+            uploads.append(await read(chunks))
+            return uploads[-1]
+
+        async def failing_lookup(db, fingerprint):
+            raise RuntimeError("database unavailable")
+
+        monkeypatch.setattr(ics_stream, "geocode_limited", never_answers)
+        monkeypatch.setattr(routes, "read_ics_stream", recording_read)
+        monkeypatch.setattr(ics_stream, "find_shared_session", failing_lookup)
+        files = {"file": ("test.ics", BytesIO(sample_ics_content.encode()), "text/calendar")}
+
+        with pytest.raises(RuntimeError):
+            test_client.post("/api/sessions", files=files)
+
+        tasks = list(uploads[0].first_pass.values())
+        assert tasks and all(task.cancelled() or task.cancelling() for task in tasks)
+
+    def test_session_body_format(self):
+        """Test events serialize with "HH:MM" times, ISO dates and the dayOfWeek key."""
+        import json
+        from datetime import date, time
+        from app.api.routes import _session_body
+
+        event = {
+            "title": "Café", "location": None,
+            "start_time": time(9, 5, 30), "end_time": None,
+            "start_date": date(2025, 1, 13), "end_date": date(2025, 1, 13),
+            "day_of_week": ["Monday"], "latitude": 38.03, "longitude": -78.51,
+        }
+        body = _session_body([event])
+
+        assert json.loads(body) == {"events": [{
+            "title": "Café", "location": None, "start": "09:05", "end": None,
+            "start_date": "2025-01-13", "end_date": "2025-01-13",
+            "dayOfWeek": ["Monday"], "latitude": 38.03, "longitude": -78.51,
+        }]}
+        assert "Café".encode() in body  # Not \u-escaped
+
     def test_get_session_invalid_id(self, test_client):
         """Test retrieval with invalid session ID."""
         response = test_client.get("/api/sessions/invalid123")
@@ -181,6 +389,20 @@ class TestDistanceMatrixEndpoint:
         assert response.status_code == 400
         assert "Maximum 25" in response.json()["detail"]
 
+    def test_distance_matrix_larger_grids_are_opt_in(self, test_client, monkeypatch):
+        """Test a raised DISTANCE_MATRIX_MAX_LOCATIONS accepts grids past the default cap."""
+        monkeypatch.setattr("app.api.routes.DISTANCE_MATRIX_MAX_LOCATIONS", 100)
+        data = {
+            "origins": [{"lat": 38.0 + i * 0.001, "lng": -78.0} for i in range(100)],
+            "destinations": [{"lat": 38.1, "lng": -78.1}],
+            "mode": "walking",
+            "engine": "local",
+        }
+        response = test_client.post("/api/distance-matrix", json=data)
+
+        assert response.status_code == 200
+        assert len(response.json()["results"]) == 100
+
     @patch('app.api.routes.GOOGLE_MAPS_KEY', 'fake-key')
     def test_distance_matrix_success(self, test_client, mock_httpx_client):
         """Test successful distance matrix calculation."""
@@ -190,23 +412,198 @@ class TestDistanceMatrixEndpoint:
             "mode": "walking"
         }
 
-        with patch('app.api.routes.httpx.AsyncClient') as mock_client:
-            mock_response = MagicMock()
-            mock_response.json.return_value = {
-                "status": "OK",
-                "rows": [{
-                    "elements": [{
-                        "status": "OK",
-                        "duration": {"value": 600, "text": "10 mins"},
-                        "distance": {"value": 1000, "text": "1.0 km"}
-                    }]
-                }]
-            }
-            mock_instance = MagicMock()
-            mock_instance.__aenter__.return_value.get.return_value = mock_response
-            mock_client.return_value = mock_instance
+        response = test_client.post("/api/distance-matrix", json=data)
+
+        assert response.status_code == 200
+        assert response.json()["results"][0][0]["duration_seconds"] == 600
+        mock_httpx_client.get.assert_awaited_once()
+
+
+    def test_distance_matrix_local_engine(self, test_client, mock_httpx_client):
+        """Test engine=local answers without calling Google."""
+        data = {
+            "origins": [{"lat": 38.0, "lng": -78.0}],
+            "destinations": [{"lat": 38.01, "lng": -78.0}],
+            "mode": "walking",
+            "engine": "local",
+        }
+        response = test_client.post("/api/distance-matrix", json=data)
+
+        assert response.status_code == 200
+        assert response.json()["engine"] == "local"
+        assert response.json()["results"][0][0]["duration_seconds"] > 0
+        mock_httpx_client.get.assert_not_called()
+
+    @patch('app.api.routes.GOOGLE_MAPS_KEY', None)
+    def test_distance_matrix_auto_without_key(self, test_client):
+        """Test auto falls back to estimates when no API key is configured."""
+        data = {
+            "origins": [{"lat": 38.0, "lng": -78.0}],
+            "destinations": [{"lat": 38.01, "lng": -78.0}],
+        }
+        response = test_client.post("/api/distance-matrix", json=data)
+
+        assert response.status_code == 200
+        assert response.json()["engine"] == "local"
+
+    @patch('app.api.routes.GOOGLE_MAPS_KEY', 'fake-key')
+    def test_distance_matrix_auto_on_upstream_timeout(self, test_client, mock_httpx_client):
+        """Test auto falls back to estimates when Google times out."""
+        import httpx
+        mock_httpx_client.get.side_effect = httpx.ReadTimeout("slow")
+        data = {
+            "origins": [{"lat": 38.0, "lng": -78.0}],
+            "destinations": [{"lat": 38.01, "lng": -78.0}],
+        }
+
+        with patch('app.distance_matrix.DISTANCE_MATRIX_TILE_RETRIES', 0):
+            response = test_client.post("/api/distance-matrix", json=data)
+
+        assert response.status_code == 200
+        assert response.json()["engine"] == "local"
+
+    @patch('app.api.routes.GOOGLE_MAPS_KEY', 'fake-key')
+    def test_distance_matrix_google_engine_does_not_fall_back(self, test_client, mock_httpx_client):
+        """Test engine=google still reports upstream timeouts."""
+        import httpx
+        mock_httpx_client.get.side_effect = httpx.ReadTimeout("slow")
+        data = {
+            "origins": [{"lat": 38.0, "lng": -78.0}],
+            "destinations": [{"lat": 38.01, "lng": -78.0}],
+            "engine": "google",
+        }
 
+        with patch('app.distance_matrix.DISTANCE_MATRIX_TILE_RETRIES', 0):
             response = test_client.post("/api/distance-matrix", json=data)
 
-            # May succeed or fail depending on API key setup
-            assert response.status_code in [200, 500]
+        assert response.status_code == 504
+
+    def test_distance_matrix_local_transit_rejected(self, test_client):
+        """Test transit cannot be estimated locally."""
+        data = {
+            "origins": [{"lat": 38.0, "lng": -78.0}],
+            "destinations": [{"lat": 38.01, "lng": -78.0}],
+            "mode": "transit",
+            "engine": "local",
+        }
+        response = test_client.post("/api/distance-matrix", json=data)
+
+        assert response.status_code == 400
+
+
+class TestBackgroundUploads:
+    """Tests for uploads processed by the background job queue."""
+
+    def _wait_until_done(self, test_client, short_id: str) -> dict:
+        import time
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            state = test_client.get(f"/api/sessions/{short_id}/status").json()
+            if state["status"] != "pending":
+                return state
+            time.sleep(0.02)
+        raise AssertionError("job did not finish")
+
+    def test_respond_async_returns_pending(self, test_client, sample_ics_single_event):
+        """Test Prefer: respond-async returns 202 and the session becomes readable once ready."""
+        files = {"file": ("test.ics", BytesIO(sample_ics_single_event.encode()), "text/calendar")}
+        response = test_client.post("/api/sessions", files=files, headers={"Prefer": "respond-async"})
+
+        assert response.status_code == 202
+        data = response.json()
+        assert data["status"] == "pending"
+
+        assert self._wait_until_done(test_client, data["short_id"])["status"] == "ready"
+        events = test_client.get(f"/api/sessions/{data['short_id']}").json()["events"]
+        assert events[0]["title"] == "Single Event"
+
+    def test_job_shares_identical_upload(self, test_client, sample_ics_single_event, mock_db_session):
+        """Test a background upload identical to an earlier one reuses its series, like a direct upload."""
+        import uuid
+        from sqlmodel import Session
+        from app.api.routes import hashids
+        from app.models import SessionModel
+        content = sample_ics_single_event.replace("Single Event", f"Event {uuid.uuid4().hex}")
+
+        def post(**headers):
+            files = {"file": ("test.ics", BytesIO(content.encode()), "text/calendar")}
+            return test_client.post("/api/sessions", files=files, headers=headers).json()["short_id"]
+
+        first = post()
+        second = post(Prefer="respond-async")
+
+        assert self._wait_until_done(test_client, second)["status"] == "ready"
+        with Session(mock_db_session) as db:
+            assert db.get(SessionModel, hashids.decode(second)[0]).shared_from_id == hashids.decode(first)[0]
+        assert test_client.get(f"/api/sessions/{second}").content == test_client.get(f"/api/sessions/{first}").content
+
+    def test_failed_job_reports_error(self, test_client):
+        """Test a calendar that cannot be parsed ends in a failed status with the reason."""
+        files = {"file": ("test.ics", BytesIO(b"not a calendar"), "text/calendar")}
+        short_id = test_client.post("/api/sessions", files=files, headers={"Prefer": "respond-async"}).json()["short_id"]
+
+        state = self._wait_until_done(test_client, short_id)
+
+        assert state["status"] == "failed"
+        assert state["error"] == "Invalid calendar format"
+        assert test_client.get(f"/api/sessions/{short_id}").status_code == 409
+
+    def test_status_stream(self, test_client, sample_ics_single_event):
+        """Test the SSE stream ends with the ready state."""
+        import json
+        files = {"file": ("test.ics", BytesIO(sample_ics_single_event.encode()), "text/calendar")}
+        short_id = test_client.post("/api/sessions", files=files, headers={"Prefer": "respond-async"}).json()["short_id"]
+
+        response = test_client.get(f"/api/sessions/{short_id}/status/stream")
+
+        assert response.headers["content-type"].startswith("text/event-stream")
+        states = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+        assert states[-1]["status"] == "ready"
+
+    def test_status_falls_back_to_database(self, test_client, mock_db_session):
+        """Test a session this process is not tracking reports its stored status."""
+        from sqlmodel import Session
+        from app.api.routes import hashids
+        from app.models import SessionModel
+
+        with Session(mock_db_session) as db:
+            session = SessionModel(status="pending")
+            db.add(session)
+            db.commit()
+            short_id = hashids.encode(session.id)
+
+        assert test_client.get(f"/api/sessions/{short_id}/status").json() == {"status": "pending"}
+        assert test_client.get(f"/api/sessions/{short_id}").status_code == 409
+
+    def test_full_queue_returns_503(self, test_client, sample_ics_single_event, monkeypatch):
+        """Test uploads are turned away with Retry-After while the queue is full."""
+        from app.jobs import JobQueue
+        monkeypatch.setattr(JobQueue, "full", lambda self: True)
+        files = {"file": ("test.ics", BytesIO(sample_ics_single_event.encode()), "text/calendar")}
+
+        response = test_client.post("/api/sessions", files=files, headers={"Prefer": "respond-async"})
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "5"
+
+
+class TestPoolHealthEndpoint:
+    """Tests for the connection pool stats endpoint."""
+
+    def test_http_pool_started_by_lifespan(self, test_client):
+        """Test the shared HTTP client is open while the app runs."""
+        response = test_client.get("/health/pools")
+
+        assert response.status_code == 200
+        stats = response.json()["http"]
+        assert stats["started"] is True
+        assert stats["in_flight"] == 0
+
+    def test_database_pool_reported(self, test_client):
+        """Test the database pool appears alongside the HTTP pool."""
+        response = test_client.get("/health/pools")
+
+        stats = response.json()["database"]
+        assert stats["pool"] == "TimedAsyncQueuePool"
+        assert stats["checked_out"] == 0
+        assert "wait_max_ms" in stats
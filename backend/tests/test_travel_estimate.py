@@ -0,0 +1,77 @@
+"""
+Tests for the offline travel-time estimator.
+"""
+
+import pytest
+
+
+class TestHaversineMatrix:
+    """Tests for the vectorized haversine."""
+
+    def test_matches_scalar_haversine(self):
+        """Test every cell equals haversine_distance for that pair."""
+        import numpy as np
+        from app.utils import haversine_distance, haversine_matrix
+
+        origins = [(38.0336, -78.5080), (40.7128, -74.0060)]
+        destinations = [(38.0293, -78.4767), (34.0522, -118.2437), (38.0336, -78.5080)]
+        km = haversine_matrix(np.array(origins), np.array(destinations))
+
+        assert km.shape == (2, 3)
+        for i, o in enumerate(origins):
+            for j, d in enumerate(destinations):
+                assert km[i, j] == pytest.approx(haversine_distance(*o, *d))
+
+
+class TestFormatting:
+    """Tests for Maps-style text formatting."""
+
+    @pytest.mark.parametrize("seconds,text", [
+        (0, "1 min"), (60, "1 min"), (600, "10 mins"), (3600, "1 hour"), (3900, "1 hour 5 mins"), (7260, "2 hours 1 min"),
+    ])
+    def test_format_duration(self, seconds, text):
+        from app.travel_estimate import format_duration
+        assert format_duration(seconds) == text
+
+    @pytest.mark.parametrize("meters,text", [(850, "850 m"), (1000, "1.0 km"), (12345, "12.3 km")])
+    def test_format_distance(self, meters, text):
+        from app.travel_estimate import format_distance
+        assert format_distance(meters) == text
+
+
+class TestEstimateMatrix:
+    """Tests for estimate_matrix."""
+
+    def test_walking_estimate(self):
+        """Test a ~1km hop is estimated with the walking speed and detour factor."""
+        from app.travel_estimate import estimate_matrix, TRAVEL_MODELS
+        from app.utils import haversine_distance
+
+        a, b = (38.0, -78.0), (38.009, -78.0)
+        result = estimate_matrix([a], [b], "walking")[0][0]
+
+        km = haversine_distance(*a, *b) * TRAVEL_MODELS["walking"]["detour"]
+        assert result["distance_meters"] == round(km * 1000)
+        assert result["duration_seconds"] == round(km / TRAVEL_MODELS["walking"]["speed_kmh"] * 3600)
+
+    def test_faster_modes_take_less_time(self):
+        """Test driving < bicycling < walking for the same trip."""
+        from app.travel_estimate import estimate_matrix
+        trip = ([(38.0, -78.0)], [(38.05, -78.05)])
+        durations = {
+            mode: estimate_matrix(*trip, mode)[0][0]["duration_seconds"]
+            for mode in ("walking", "bicycling", "driving")
+        }
+
+        assert durations["driving"] < durations["bicycling"] < durations["walking"]
+
+    def test_grid_shape(self):
+        """Test the result grid is origins x destinations."""
+        from app.travel_estimate import estimate_matrix
+        origins = [(38.0 + i / 100, -78.0) for i in range(3)]
+        destinations = [(38.0, -78.0 + j / 100) for j in range(5)]
+
+        results = estimate_matrix(origins, destinations, "walking")
+
+        assert len(results) == 3
+        assert all(len(row) == 5 for row in results)
@@ -247,3 +247,200 @@ class TestParseIcs:
         # Should still parse events, just without coordinates
         assert len(events) > 0
         assert events[0]['latitude'] is None
+
+
+class TestIsTransientError:
+    """Tests for classifying geocoder failures."""
+
+    def test_classification(self):
+        """Test quota and unknown errors are retried but denied requests are not."""
+        import googlemaps
+        from app.utils import is_transient_error
+
+        assert is_transient_error(googlemaps.exceptions.ApiError("OVER_QUERY_LIMIT"))
+        assert is_transient_error(googlemaps.exceptions.Timeout())
+        assert not is_transient_error(googlemaps.exceptions.ApiError("REQUEST_DENIED"))
+
+
+class TestGeocodeConcurrently:
+    """Tests for the concurrent geocoding stage."""
+
+    def test_calls_overlap(self, mock_google_maps):
+        """Test geocodes run concurrently rather than one after another."""
+        import asyncio
+        import time as time_module
+        from app.utils import geocode_concurrently
+
+        def slow_geocode(**kwargs):
+            time_module.sleep(0.2)
+            return mock_google_maps.geocode.return_value
+
+        mock_google_maps.geocode.side_effect = slow_geocode
+        addresses = [f"Building {c}" for c in "ABCD"]
+
+        started = time_module.perf_counter()
+        results = asyncio.run(geocode_concurrently(addresses))
+        elapsed = time_module.perf_counter() - started
+
+        assert set(results) == set(addresses)
+        assert all(r["lat"] is not None for r in results.values())
+        assert elapsed < 0.6
+
+    def test_concurrency_is_bounded(self, mock_google_maps):
+        """Test no more than GEOCODE_CONCURRENCY calls are in flight."""
+        import asyncio
+        import threading
+        import time as time_module
+        from app.utils import geocode_concurrently
+
+        lock = threading.Lock()
+        in_flight = {"now": 0, "peak": 0}
+
+        def tracked_geocode(**kwargs):
+            with lock:
+                in_flight["now"] += 1
+                in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            time_module.sleep(0.05)
+            with lock:
+                in_flight["now"] -= 1
+            return mock_google_maps.geocode.return_value
+
+        mock_google_maps.geocode.side_effect = tracked_geocode
+
+        with patch('app.utils.GEOCODE_CONCURRENCY', 2):
+            asyncio.run(geocode_concurrently([f"Hall {i}" for i in range(6)]))
+
+        assert in_flight["peak"] <= 2
+
+    def test_timeout_counts_as_failure(self, mock_google_maps):
+        """Test a slow geocode is abandoned after GEOCODE_TIMEOUT."""
+        import asyncio
+        import time as time_module
+        from app.utils import geocode_concurrently
+
+        mock_google_maps.geocode.side_effect = lambda **kwargs: time_module.sleep(0.5)
+
+        with patch('app.utils.GEOCODE_TIMEOUT', 0.05):
+            results = asyncio.run(geocode_concurrently(["Slow Hall"]))
+
+        assert results["Slow Hall"]["lat"] is None
+
+    def test_concurrency_bounded_after_timeouts(self, mock_google_maps):
+        """Test timed-out calls keep their slot until their thread finishes."""
+        import asyncio
+        import threading
+        import time as time_module
+        from app.utils import geocode_concurrently
+
+        lock = threading.Lock()
+        in_flight = {"now": 0, "peak": 0}
+
+        def slow_geocode(**kwargs):
+            with lock:
+                in_flight["now"] += 1
+                in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            time_module.sleep(0.1)
+            with lock:
+                in_flight["now"] -= 1
+
+        mock_google_maps.geocode.side_effect = slow_geocode
+
+        with patch('app.utils.GEOCODE_CONCURRENCY', 2), patch('app.utils.GEOCODE_TIMEOUT', 0.02):
+            results = asyncio.run(geocode_concurrently([f"Hall {i}" for i in range(6)]))
+
+        assert all(r["lat"] is None for r in results.values())
+        assert in_flight["peak"] <= 2
+
+
+class TestExpandSeries:
+    """Tests for lazy expansion of recurring event series."""
+
+    @staticmethod
+    def _series(**overrides):
+        series = {
+            "title": "Math 101",
+            "location": "Room 101",
+            "start_time": time(10, 0),
+            "end_time": time(11, 0),
+            "start_date": date(2024, 1, 15),
+            "end_date": date(2024, 1, 28),
+            "day_codes": ["MO", "WE"],
+            "exdates": [],
+            "latitude": 38.0,
+            "longitude": -78.0,
+        }
+        series.update(overrides)
+        return series
+
+    def test_expands_matching_days(self):
+        """Test each matching weekday in the range yields one event."""
+        from app.utils import expand_series
+        events = list(expand_series(self._series()))
+
+        assert [e["start_date"] for e in events] == [
+            date(2024, 1, 15), date(2024, 1, 17), date(2024, 1, 22), date(2024, 1, 24)
+        ]
+        assert events[0]["day_of_week"] == ["Monday"]
+
+    def test_skips_exdates(self):
+        """Test excluded dates are not produced."""
+        from app.utils import expand_series
+        events = list(expand_series(self._series(exdates=["2024-01-17"])))
+
+        assert date(2024, 1, 17) not in [e["start_date"] for e in events]
+        assert len(events) == 3
+
+    def test_window_is_half_open(self):
+        """Test only days in [window_start, window_end) are produced."""
+        from app.utils import expand_series
+        events = list(expand_series(self._series(), date(2024, 1, 17), date(2024, 1, 22)))
+
+        assert [e["start_date"] for e in events] == [date(2024, 1, 17)]
+
+    @patch('app.utils.gmaps')
+    def test_parse_reads_exdate(self, mock_gmaps):
+        """Test EXDATE lines from the ICS file remove occurrences."""
+        mock_gmaps.geocode.return_value = []
+        content = """BEGIN:VCALENDAR
+VERSION:2.0
+PRODID:-//Test//Test//EN
+BEGIN:VEVENT
+DTSTART:20240115T100000
+DTEND:20240115T110000
+SUMMARY:Math 101
+RRULE:FREQ=WEEKLY;BYDAY=MO;UNTIL=20240205T235959
+EXDATE:20240122T100000
+UID:test-exdate
+END:VEVENT
+END:VCALENDAR"""
+
+        from app.utils import parse_ics
+        events = parse_ics(content)
+
+        assert [e["start_date"] for e in events] == [
+            date(2024, 1, 15), date(2024, 1, 29), date(2024, 2, 5)
+        ]
+
+    @patch('app.utils.gmaps')
+    def test_parse_reads_count_interval_rdate(self, mock_gmaps):
+        """Test COUNT, INTERVAL and RDATE from the ICS file shape the occurrences."""
+        mock_gmaps.geocode.return_value = []
+        content = """BEGIN:VCALENDAR
+VERSION:2.0
+PRODID:-//Test//Test//EN
+BEGIN:VEVENT
+DTSTART:20240116T140000
+DTEND:20240116T160000
+SUMMARY:Biweekly Lab
+RRULE:FREQ=WEEKLY;INTERVAL=2;COUNT=3;BYDAY=TU
+RDATE:20240222T140000
+UID:test-lab
+END:VEVENT
+END:VCALENDAR"""
+
+        from app.utils import parse_ics
+        events = parse_ics(content)
+
+        assert [e["start_date"] for e in events] == [
+            date(2024, 1, 16), date(2024, 1, 30), date(2024, 2, 13), date(2024, 2, 22)
+        ]